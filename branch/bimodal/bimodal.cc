@@ -1,5 +1,6 @@
 #include <map>
 
+#include "checkpoint.h"
 #include "msl/fwcounter.h"
 #include "ooo_cpu.h"
 
@@ -12,7 +13,7 @@ constexpr std::size_t COUNTER_BITS = 2;
 std::map<O3_CPU*, std::array<champsim::msl::fwcounter<COUNTER_BITS>, BIMODAL_TABLE_SIZE>> bimodal_table;
 } // namespace
 
-void O3_CPU::initialize_branch_predictor() {}
+void O3_CPU::initialize_branch_predictor() { champsim::checkpoint::keep(this, "bimodal.table", ::bimodal_table[this]); }
 
 uint8_t O3_CPU::predict_branch(uint64_t ip)
 {
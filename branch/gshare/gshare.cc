@@ -3,6 +3,7 @@
 #include <bitset>
 #include <map>
 
+#include "checkpoint.h"
 #include "msl/fwcounter.h"
 #include "ooo_cpu.h"
 
@@ -26,7 +27,11 @@ std::size_t gs_table_hash(uint64_t ip, std::bitset<GLOBAL_HISTORY_LENGTH> bh_vec
 }
 } // namespace
 
-void O3_CPU::initialize_branch_predictor() {}
+void O3_CPU::initialize_branch_predictor()
+{
+  champsim::checkpoint::keep(this, "gshare.history", ::branch_history_vector[this]);
+  champsim::checkpoint::keep(this, "gshare.table", ::gs_history_table[this]);
+}
 
 uint8_t O3_CPU::predict_branch(uint64_t ip)
 {
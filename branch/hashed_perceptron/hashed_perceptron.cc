@@ -50,6 +50,7 @@ sources for you to plagiarize.
 #include <stdlib.h>
 #include <string.h>
 
+#include "checkpoint.h"
 #include "ooo_cpu.h"
 
 // this many tables
@@ -119,6 +120,11 @@ void O3_CPU::initialize_branch_predictor()
 
   for (unsigned i = 0; i < NUM_CPUS; i++)
     ::theta[i] = 10;
+
+  champsim::checkpoint::keep(this, "hashed_perceptron.tables", ::tables[cpu]);
+  champsim::checkpoint::keep(this, "hashed_perceptron.history", ::ghist_words[cpu]);
+  champsim::checkpoint::keep(this, "hashed_perceptron.theta", ::theta[cpu]);
+  champsim::checkpoint::keep(this, "hashed_perceptron.tc", ::tc[cpu]);
 }
 
 uint8_t O3_CPU::predict_branch(uint64_t pc)
@@ -43,6 +43,7 @@
 #include <deque>
 #include <map>
 
+#include "checkpoint.h"
 #include "msl/fwcounter.h"
 #include "ooo_cpu.h"
 
@@ -109,7 +110,13 @@ std::map<O3_CPU*, std::bitset<PERCEPTRON_HISTORY>> global_history;      // real
                                                                         // updated
 } // namespace
 
-void O3_CPU::initialize_branch_predictor() {}
+// the predictions in flight are not kept
+void O3_CPU::initialize_branch_predictor()
+{
+  champsim::checkpoint::keep(this, "perceptron.perceptrons", ::perceptrons[this]);
+  champsim::checkpoint::keep(this, "perceptron.history", ::global_history[this]);
+  champsim::checkpoint::keep(this, "perceptron.spec_history", ::spec_global_history[this]);
+}
 
 uint8_t O3_CPU::predict_branch(uint64_t ip)
 {
@@ -11,6 +11,7 @@
 #include <deque>
 #include <map>
 
+#include "checkpoint.h"
 #include "msl/lru_table.h"
 #include "ooo_cpu.h"
 
@@ -55,6 +56,15 @@ void O3_CPU::initialize_btb()
   std::fill(std::begin(::INDIRECT_BTB[this]), std::end(::INDIRECT_BTB[this]), 0);
   std::fill(std::begin(::CALL_SIZE[this]), std::end(::CALL_SIZE[this]), 4);
   ::CONDITIONAL_HISTORY[this] = 0;
+
+  // the return address stack is not kept
+  ::BTB.at(this).visit_state([this](auto& blocks, auto& access_count) {
+    champsim::checkpoint::keep(this, "basic_btb.blocks", blocks);
+    champsim::checkpoint::keep(this, "basic_btb.access_count", access_count);
+  });
+  champsim::checkpoint::keep(this, "basic_btb.indirect", ::INDIRECT_BTB[this]);
+  champsim::checkpoint::keep(this, "basic_btb.conditional_history", ::CONDITIONAL_HISTORY[this]);
+  champsim::checkpoint::keep(this, "basic_btb.call_size", ::CALL_SIZE[this]);
 }
 
 std::pair<uint64_t, uint8_t> O3_CPU::btb_prediction(uint64_t ip)
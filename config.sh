@@ -16,12 +16,17 @@
 
 import json
 import sys,os
-import itertools
 import argparse
+import itertools
 
 import config.filewrite
+import config.makefile
+import config.modules
 import config.parse
+import config.sweep
+import config.telemetry
 import config.util
+import config.watch
 
 # Read the config file
 def parse_file(fname):
@@ -56,6 +61,45 @@ if __name__ == '__main__':
     parser.add_argument('--compile-all-modules', action='store_true',
             help='Compile all modules in the search path')
 
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+            help='Parse and generate configurations in N parallel processes. The outputs are identical to a serial run.')
+
+    parser.add_argument('--generator', choices=('make', 'ninja'), default='make',
+            help='The build system to generate files for. With `ninja`, a build.ninja is written instead of the makefile configuration; run `ninja` instead of `make`. Ninja files list the sources found when configuring, so reconfigure after adding source files.')
+
+    parser.add_argument('--precompiled-headers', action='store_true',
+            help='Precompile the headers that most sources include. Sources that include the same headers with the same generated contents and flags share a precompiled header, even between configurations.')
+
+    parser.add_argument('--runtime-parameters', action='store_true',
+            help='Read the sizes, widths, latencies, and frequencies of the cores, caches, and memory from a file when the simulator starts, rather than compiling them in. Configurations that differ only in these share one binary, and each executable is a link to it with its parameters written beside it, as `<executable>.json`. The module choices and the parameters in the generated constants headers, such as the number of cores and the DRAM geometry, are still compiled in.')
+
+    parser.add_argument('--plugins', action='store_true',
+            help='Build every module in the search paths as a plug-in, a shared object that the simulator loads when it starts, rather than compiling the modules into each configuration. Configurations that differ only in their modules share their objects, and a changed module only relinks its plug-in. A plug-in is loaded from `<module name>.so` in the directories of the `CHAMPSIM_PLUGIN_PATH` environment variable, if it is found there, and otherwise from where it was built.')
+
+    pgo_group = parser.add_argument_group(title='Profile-Guided Optimization', description='Options that build the executables with a profile of a training run. The training run is made by make, with an instrumented build of the first configuration that compiles the same sources with the same flags.')
+
+    pgo_group.add_argument('--pgo-trace', action='append', default=[], metavar='TRACE',
+            help='A trace to train on. If fewer traces than cores are given, they are repeated. Giving any trace enables profile-guided optimization, which requires GCC.')
+    pgo_group.add_argument('--pgo-warmup-instructions', type=int, default=1000000, metavar='N',
+            help='The number of warmup instructions in the training run')
+    pgo_group.add_argument('--pgo-simulation-instructions', type=int, default=10000000, metavar='N',
+            help='The number of simulation instructions in the training run')
+
+    telemetry_group = parser.add_argument_group(title='Build Telemetry', description='Options that measure how long the configured builds take to compile and link')
+
+    telemetry_group.add_argument('--telemetry', action='store_true',
+            help='Record the wall time of each compile and link made by the build, along with the module and the builds that each object belongs to')
+    telemetry_group.add_argument('--telemetry-report', nargs='?', type=int, const=10, metavar='N',
+            help='Instead of configuring, summarize the recorded times, listing the N slowest targets, modules, and builds')
+
+    parser.add_argument('--watch', action='store_true',
+            help='After configuring, keep running and reconfigure whenever the configuration files or module directories change. Only the generated files whose inputs changed are rewritten.')
+    parser.add_argument('--watch-interval', type=float, default=1.0, metavar='SECONDS',
+            help='How often to check for changes in watch mode')
+
+    parser.add_argument('--test', action='store_true',
+            help='Generate only the configuration for the test executable. This is run by make when a test target is requested.')
+
     parser.add_argument('files', nargs='*',
             help='A sequence of JSON files describing the configuration. The last file specified has the highest priority.')
 
@@ -64,19 +108,79 @@ if __name__ == '__main__':
     bindir_name = os.path.expanduser(args.bindir or os.path.join(args.prefix, 'bin'))
     objdir_name = os.path.expanduser(os.path.join(args.prefix, '.csconfig'))
 
-    if not args.files:
-        print("No configuration specified. Building default ChampSim with no prefetching.")
-    config_files = itertools.product(*(config.util.wrap_list(parse_file(f)) for f in reversed(args.files)), ({},))
+    if args.telemetry_report is not None:
+        for line in config.telemetry.get_report_lines(objdir_name, args.telemetry_report):
+            print(line)
+        sys.exit(0)
+
+    # Module directories are listed once and shared by every configuration
+    registry_file_name = os.path.join(objdir_name, 'module_registry.json')
+    config.modules.default_registry.load(registry_file_name)
 
-    parsed_test = config.parse.parse_config({'executable_name': '000-test-main'}, module_dir=[os.path.join(test_root, 'cpp', 'modules')], compile_all_modules=True)
+    # The test configuration is kept in its own makefile, which is only generated when the tests are built
+    if args.test:
+        parsed_test = config.parse.parse_config({'executable_name': '000-test-main'}, module_dir=[os.path.join(test_root, 'cpp', 'modules')], compile_all_modules=True)
+        with config.filewrite.writer(os.path.join(test_root, 'bin'), os.path.join(objdir_name, 'test'), streaming=True, makefile_name=config.filewrite.test_makefile_file_name) as wr:
+            wr.write_files(parsed_test, srcdir_names=[os.path.join(test_root, 'cpp', 'src')])
+        config.modules.default_registry.save(registry_file_name)
+        sys.exit(0)
 
-    parsed_configs = (
-            config.parse.parse_config(*c, module_dir=args.module_dir, branch_dir=args.branch_dir, btb_dir=args.btb_dir, pref_dir=args.prefetcher_dir, repl_dir=args.replacement_dir, compile_all_modules=args.compile_all_modules)
-        for c in config_files)
+    if not args.files:
+        print("No configuration specified. Building default ChampSim with no prefetching.")
 
-    with config.filewrite.writer(bindir_name, objdir_name) as wr:
-        for c in parsed_configs:
-            wr.write_files(c)
-        wr.write_files(parsed_test, bindir_name=os.path.join(test_root, 'bin'), srcdir_names=[os.path.join(test_root, 'cpp', 'src')], objdir_name=os.path.join(objdir_name, 'test'))
+    search_kwargs = dict(module_dir=args.module_dir, branch_dir=args.branch_dir, btb_dir=args.btb_dir, pref_dir=args.prefetcher_dir, repl_dir=args.replacement_dir)
+    parse_kwargs = dict(**search_kwargs, compile_all_modules=args.compile_all_modules)
+
+    # Scan the search paths before any worker processes are started, so that they inherit the listings
+    search_contexts = config.parse.get_search_contexts(**search_kwargs).values()
+
+    profile = None
+    if args.pgo_trace:
+        profile = {'traces': [os.path.abspath(os.path.expanduser(t)) for t in args.pgo_trace], 'warmup_instructions': args.pgo_warmup_instructions, 'simulation_instructions': args.pgo_simulation_instructions}
+
+    session = config.watch.ConfigureSession(jobs=args.jobs, keep_state=args.watch)
+
+    # make runs this command again if the includes of the sources change, but it must not wait for changes itself
+    configure_command = [os.path.abspath(sys.argv[0])]
+    argv = iter(sys.argv[1:])
+    for arg in argv:
+        if arg == '--watch-interval':
+            next(argv, None)
+        elif arg != '--watch' and not arg.startswith('--watch-interval='):
+            configure_command.append(arg)
+
+    def configure():
+        config_files = config.sweep.expand_product(*(config.util.wrap_list(parse_file(f)) for f in reversed(args.files)), ({},))
+        with config.filewrite.writer(bindir_name, objdir_name, streaming=True, generator=args.generator, precompiled_headers=args.precompiled_headers, profile=profile, telemetry=args.telemetry, runtime_parameters=args.runtime_parameters, plugins=args.plugins, configure_inputs=True) as wr:
+            wr.write_fileparts([(config.filewrite.makefile_file_name, config.makefile.get_configure_lines(os.path.expanduser(args.prefix), configure_command))])
+            for rendered in session.render_all(wr, config_files, parse_kwargs):
+                wr.write_build(*rendered)
+        session.prune()
+        config.modules.default_registry.save(registry_file_name)
+
+    configure()
+
+    if args.watch:
+        module_dirs = sorted(set(itertools.chain.from_iterable(c.paths for c in search_contexts)))
+
+        # The sources and headers decide how the builds are grouped, so they are watched along with the configurations
+        def watched_paths():
+            module_sources = sorted(set(m['fname'] for c in search_contexts for m in c.find_all()))
+            return [*args.files, *module_dirs, *config.watch.tree([os.path.join(champsim_root, 'src'), os.path.join(champsim_root, 'inc'), *module_sources])]
+
+        print('Watching for changes. Press Ctrl-C to stop.')
+        try:
+            for changed in config.watch.watch(watched_paths, interval=args.watch_interval):
+                print('Changed:', *changed)
+                if any(c in module_dirs for c in changed):
+                    config.modules.default_registry.invalidate()
+                if any(c not in args.files for c in changed):
+                    session.clear()
+                try:
+                    configure()
+                except Exception as e:
+                    print('Configuration failed:', e)
+        except KeyboardInterrupt:
+            pass
 
 # vim: set filetype=python:
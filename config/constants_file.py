@@ -12,27 +12,51 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-def get_constants_file(env, pmem):
-    yield from (
-        '#ifndef CHAMPSIM_CONSTANTS_H',
-        '#define CHAMPSIM_CONSTANTS_H',
-        '#include <cstdlib>',
+def include_guarded(guard, *lines):
+    yield '#ifndef ' + guard
+    yield '#define ' + guard
+    yield from lines
+    yield '#endif'
+
+def get_address_constants_file(env):
+    yield from include_guarded('CHAMPSIM_ADDRESS_CONSTANTS_H',
         '#include "util/bits.h"',
         'constexpr unsigned BLOCK_SIZE = {block_size};'.format(**env),
         'constexpr unsigned PAGE_SIZE = {page_size};'.format(**env),
-        'constexpr uint64_t STAT_PRINTING_PERIOD = {heartbeat_frequency};'.format(**env),
-        'constexpr std::size_t NUM_CPUS = {num_cores};'.format(**env),
         'constexpr auto LOG2_BLOCK_SIZE = champsim::lg2(BLOCK_SIZE);',
-        'constexpr auto LOG2_PAGE_SIZE = champsim::lg2(PAGE_SIZE);',
+        'constexpr auto LOG2_PAGE_SIZE = champsim::lg2(PAGE_SIZE);')
 
-        'constexpr uint64_t DRAM_IO_FREQ = {io_freq};'.format(**pmem),
+def get_cpu_constants_file(env):
+    yield from include_guarded('CHAMPSIM_CPU_CONSTANTS_H',
+        '#include <cstdlib>',
+        'constexpr std::size_t NUM_CPUS = {num_cores};'.format(**env))
+
+def get_stat_constants_file(env):
+    yield from include_guarded('CHAMPSIM_STAT_CONSTANTS_H',
+        '#include <cstdint>',
+        'constexpr uint64_t STAT_PRINTING_PERIOD = {heartbeat_frequency};'.format(**env))
+
+# The DRAM parameters that determine the layout of the memory controller
+def get_dram_constants_file(pmem):
+    yield from include_guarded('CHAMPSIM_DRAM_CONSTANTS_H',
+        '#include <cstdlib>',
         'constexpr std::size_t DRAM_CHANNELS = {channels};'.format(**pmem),
         'constexpr std::size_t DRAM_RANKS = {ranks};'.format(**pmem),
         'constexpr std::size_t DRAM_BANKS = {banks};'.format(**pmem),
+        'constexpr std::size_t DRAM_WQ_SIZE = {wq_size};'.format(**pmem),
+        'constexpr std::size_t DRAM_RQ_SIZE = {rq_size};'.format(**pmem))
+
+# The DRAM parameters that are only used in the implementation of the memory controller
+def get_dram_controller_constants_file(pmem):
+    yield from include_guarded('CHAMPSIM_DRAM_CONTROLLER_CONSTANTS_H',
+        '#include <cstdint>',
+        '#include <cstdlib>',
+        'constexpr uint64_t DRAM_IO_FREQ = {io_freq};'.format(**pmem),
         'constexpr std::size_t DRAM_ROWS = {rows};'.format(**pmem),
         'constexpr std::size_t DRAM_COLUMNS = {columns};'.format(**pmem),
-        'constexpr std::size_t DRAM_CHANNEL_WIDTH = {channel_width};'.format(**pmem),
-        'constexpr std::size_t DRAM_WQ_SIZE = {wq_size};'.format(**pmem),
-        'constexpr std::size_t DRAM_RQ_SIZE = {rq_size};'.format(**pmem),
-        '#endif')
+        'constexpr std::size_t DRAM_CHANNEL_WIDTH = {channel_width};'.format(**pmem))
 
+# Includes each of the narrower constants headers.
+# Sources should prefer to include only the headers they use, so that they are not rebuilt when unrelated constants change.
+def get_constants_file(header_names):
+    yield from include_guarded('CHAMPSIM_CONSTANTS_H', *('#include "{}"'.format(h) for h in header_names))
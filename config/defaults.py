@@ -36,20 +36,21 @@ def ul_dependent_defaults(*uls, set_factor=512, queue_factor=32, mshr_factor=32,
         'max_fill': math.ceil(bandwidth_factor*len(uls))
     }
 
-def defaulter(cores, cache_list, factor_list, key):
-    head = lambda n: util.upper_levels_for(cores, n, key=key)
-    tail = lambda n: util.upper_levels_for(cache_list, n)
+def defaulter(index, factor_list, key):
+    head = lambda n: index.upper_levels_for(n, key=key)
+    tail = lambda n: index.upper_levels_for(n)
 
     for ulf, fac in zip(itertools.chain((head,), itertools.repeat(tail)), factor_list):
         yield lambda name: { 'name': name, **ul_dependent_defaults(*ulf(name), **fac) }
 
-def default_path(cores, caches, factor_list, member_list, name):
-    for p in (util.iter_system(caches, cpu[name]) for cpu in cores):
+def default_path(cores, caches, factor_list, member_list, name, index=None):
+    index = index or util.SystemIndex(cores, caches.values(), keys=util.topology_keys)
+    for p in (index.iter_system(caches, cpu[name]) for cpu in cores):
         fixed_defaults = itertools.starmap(util.chain, itertools.zip_longest(({'_first_level': True},), member_list, fillvalue={}))
-        defaults = defaulter(cores, list(caches.values()), factor_list, name)
+        defaults = defaulter(index, factor_list, name)
         yield from (util.chain(f(c['name']), x) for f,c,x in zip(defaults, p, fixed_defaults))
 
-def l1i_path(cores, caches):
+def l1i_path(cores, caches, index=None):
     l1i_factors = (
         { 'set_factor': 64, 'mshr_factor': 32, 'bandwidth_factor': 1 },
         { 'set_factor': 512, 'mshr_factor': 32, 'bandwidth_factor': 0.5 },
@@ -60,10 +61,10 @@ def l1i_path(cores, caches):
         { '_defaults': 'champsim::defaults::default_l2c' },
         { '_defaults': 'champsim::defaults::default_llc' }
     )
-    p = list(default_path(cores, caches, l1i_factors, l1i_members, 'L1I'))
+    p = list(default_path(cores, caches, l1i_factors, l1i_members, 'L1I', index))
     yield from p
 
-def l1d_path(cores, caches):
+def l1d_path(cores, caches, index=None):
     l1d_factors = (
         { 'set_factor': 64, 'mshr_factor': 32, 'bandwidth_factor': 1 },
         { 'set_factor': 512, 'mshr_factor': 32, 'bandwidth_factor': 0.5 },
@@ -74,9 +75,9 @@ def l1d_path(cores, caches):
         { '_defaults': 'champsim::defaults::default_l2c' },
         { '_defaults': 'champsim::defaults::default_llc' }
     )
-    yield from default_path(cores, caches, l1d_factors, l1d_members, 'L1D')
+    yield from default_path(cores, caches, l1d_factors, l1d_members, 'L1D', index)
 
-def itlb_path(cores, caches):
+def itlb_path(cores, caches, index=None):
     itlb_factors = (
         { 'set_factor': 16, 'queue_factor': 16, 'mshr_factor': 8, 'bandwidth_factor': 1 },
         { 'set_factor': 64, 'mshr_factor': 8, 'bandwidth_factor': 0.5 }
@@ -85,9 +86,9 @@ def itlb_path(cores, caches):
         { '_defaults': 'champsim::defaults::default_itlb' },
         { '_defaults': 'champsim::defaults::default_stlb' }
     )
-    yield from default_path(cores, caches, itlb_factors, itlb_members, 'ITLB')
+    yield from default_path(cores, caches, itlb_factors, itlb_members, 'ITLB', index)
 
-def dtlb_path(cores, caches):
+def dtlb_path(cores, caches, index=None):
     dtlb_factors = (
         { 'set_factor': 16, 'queue_factor': 16, 'mshr_factor': 8, 'bandwidth_factor': 1 },
         { 'set_factor': 64, 'mshr_factor': 8, 'bandwidth_factor': 0.5 }
@@ -96,21 +97,22 @@ def dtlb_path(cores, caches):
         { '_defaults': 'champsim::defaults::default_dtlb' },
         { '_defaults': 'champsim::defaults::default_stlb' }
     )
-    yield from default_path(cores, caches, dtlb_factors, dtlb_members, 'DTLB')
+    yield from default_path(cores, caches, dtlb_factors, dtlb_members, 'DTLB', index)
 
-def list_defaults(cores, caches):
-    l1i = list(l1i_path(cores, caches))
+def list_defaults(cores, caches, index=None):
+    index = index or util.SystemIndex(cores, caches.values(), keys=util.topology_keys)
+    l1i = list(l1i_path(cores, caches, index))
     #print(l1i)
     yield from l1i
-    yield from l1d_path(cores, caches)
-    yield from itlb_path(cores, caches)
-    yield from dtlb_path(cores, caches)
+    yield from l1d_path(cores, caches, index)
+    yield from itlb_path(cores, caches, index)
+    yield from dtlb_path(cores, caches, index)
 
     for cpu in cores:
-        icache_path = util.iter_system(caches, cpu['L1I'])
-        dcache_path = util.iter_system(caches, cpu['L1D'])
-        itransl_path = util.iter_system(caches, cpu['ITLB'])
-        dtransl_path = util.iter_system(caches, cpu['DTLB'])
+        icache_path = index.iter_system(caches, cpu['L1I'])
+        dcache_path = index.iter_system(caches, cpu['L1D'])
+        itransl_path = index.iter_system(caches, cpu['ITLB'])
+        dtransl_path = index.iter_system(caches, cpu['DTLB'])
 
         yield from ({'name': c['name'], 'lower_translate': tlb['name']} for c,tlb in zip(icache_path, itransl_path))
         yield from ({'name': c['name'], 'lower_translate': tlb['name']} for c,tlb in zip(dcache_path, dtransl_path))
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import difflib
 import hashlib
 import itertools
 import operator
@@ -21,100 +20,621 @@ import json
 import contextlib
 
 from . import makefile
+from . import ninja
 from . import instantiation_file
 from . import constants_file
 from . import modules
 from . import util
+from . import includes
+from . import telemetry
 
 constants_file_name = 'champsim_constants.h'
+address_constants_file_name = 'address_constants.h'
+cpu_constants_file_name = 'cpu_constants.h'
+stat_constants_file_name = 'stat_constants.h'
+dram_constants_file_name = 'dram_constants.h'
+dram_controller_constants_file_name = 'dram_controller_constants.h'
 instantiation_file_name = 'core_inst.inc'
 core_module_declaration_file_name = 'ooo_cpu_module_decl.inc'
 core_module_definition_file_name = 'ooo_cpu_module_def.inc'
 cache_module_declaration_file_name = 'cache_module_decl.inc'
 cache_module_definition_file_name = 'cache_module_def.inc'
+precompiled_header_file_name = 'champsim_pch.h'
 makefile_file_name = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '_configuration.mk')
+test_makefile_file_name = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '_test_configuration.mk')
+ninja_file_name = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'build.ninja')
+
+manifest_file_name = 'manifest.json'
+shared_dir_name = 'shared'
+profile_dir_name = 'pgo'
+inputs_dir_name = 'inputs'
+profile_stamp_file_name = 'profile.stamp'
+binary_file_name = 'champsim'
+parameters_file_suffix = '.json'
+build_info_file_suffix = '.build.json'
+executable_unit_name = 'executable'
+
+# Headers that are included by many sources. When precompiled headers are enabled, each source is given a precompiled header of those it includes.
+precompiled_header_candidates = ('fmt/core.h', 'fmt/ranges.h', 'channel.h', 'cache.h', 'ooo_cpu.h')
+
+# The flags for each stage of profile-guided optimization. They are added to the flags of the configuration, so they take part in the keys of the shared units.
+# Objects that were not covered by the training run are optimized as they would be without a profile.
+# Builds that share a profile may differ in generated code, so mismatched profiles are reported but not fatal.
+profile_flags = {
+    'generate': {'CXXFLAGS': ('-fprofile-generate',), 'LDFLAGS': ('-fprofile-generate',)},
+    'use': {'CXXFLAGS': ('-fprofile-use', '-fprofile-partial-training', '-Wno-error=coverage-mismatch')}
+}
+
+# With plug-ins, the executable exports its symbols, so that the modules may call the members of the classes they extend.
+# The objects of a plug-in are position independent, so they are not shared with builds that compile the module in.
+plugin_flags = {
+    'executable': {'LDFLAGS': ('-rdynamic',)},
+    'module': {'CXXFLAGS': ('-fPIC',)}
+}
+
+# The source of the entry point of each kind of plug-in, in the plugin directory
+plugin_entry_names = {'pref': 'prefetcher', 'repl': 'replacement', 'branch': 'branch_predictor', 'btb': 'btb'}
+
+# Files that accumulate parts from every build
+shared_file_names = (makefile_file_name, test_makefile_file_name, ninja_file_name)
 
 cxx_generated_warning = ('/***', ' * THIS FILE IS AUTOMATICALLY GENERATED', ' * Do not edit this file. It will be overwritten when the configure script is run.', ' ***/', '')
 make_generated_warning = ('###', '# THIS FILE IS AUTOMATICALLY GENERATED', '# Do not edit this file. It will be overwritten when the configure script is run.', '###', '')
 
+# Digest of the file contents, insensitive to leading and trailing whitespace on each line
+def content_digest(lines):
+    digest = hashlib.sha256()
+    for l in lines:
+        digest.update(l.strip().encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
 def files_are_different(rfp, new_rfp):
-    old_file_lines = list(l.strip() for l in rfp)
-    new_file_lines = list(l.strip() for l in new_rfp)
-    return difflib.SequenceMatcher(a=old_file_lines, b=new_file_lines).ratio() < 1
+    return content_digest(rfp) != content_digest(new_rfp)
+
+# Records the digest of each file written, along with the size and modification time the file had afterward.
+# If a file still has the same size and modification time, its contents are assumed to match the digest, and it need not be read.
+class Manifest:
+    def __init__(self, fname=None):
+        self.fname = fname
+        self.entries = {}
+        self.touched = set()
+        if fname is not None and os.path.exists(fname):
+            try:
+                with open(fname, 'rt') as rfp:
+                    self.entries = json.load(rfp)
+            except ValueError:
+                pass # A corrupt manifest only costs us some reads
 
-def write_if_different(fname, new_file_string):
-    should_write = True
-    if os.path.exists(fname):
-        with open(fname, 'rt') as rfp:
-            should_write = files_are_different(rfp, new_file_string.splitlines())
+    def stat_of(self, fname):
+        st = os.stat(fname)
+        return [st.st_mtime_ns, st.st_size]
 
-    if should_write:
+    def is_current(self, fname, digest):
+        entry = self.entries.get(os.path.abspath(fname))
+        return entry is not None and entry[0] == digest and os.path.exists(fname) and entry[1:] == self.stat_of(fname)
+
+    def update(self, fname, digest):
+        self.entries[os.path.abspath(fname)] = [digest, *self.stat_of(fname)]
+        self.touched.add(os.path.abspath(fname))
+
+    # Only files produced by this run are retained
+    def save(self):
+        if self.fname is not None:
+            os.makedirs(os.path.abspath(os.path.dirname(self.fname)), exist_ok=True)
+            with open(self.fname, 'wt') as wfp:
+                json.dump(util.subdict(self.entries, self.touched), wfp, indent=0, sort_keys=True)
+
+def should_write(fname, digest, manifest):
+    if manifest.is_current(fname, digest):
+        return False
+    if not os.path.exists(fname):
+        return True
+    with open(fname, 'rt') as rfp:
+        return content_digest(rfp) != digest
+
+def write_if_different(fname, new_file_string, manifest=None):
+    manifest = manifest or Manifest()
+    digest = content_digest(new_file_string.splitlines())
+    if should_write(fname, digest, manifest):
         with open(fname, 'wt') as wfp:
             wfp.write(new_file_string)
+    manifest.update(fname, digest)
+
+# Replace the file with a completed spool file, unless their contents match the given digest
+def replace_if_different(fname, new_fname, digest, manifest=None):
+    manifest = manifest or Manifest()
+    if should_write(fname, digest, manifest):
+        os.replace(new_fname, fname)
+    else:
+        os.remove(new_fname)
+    manifest.update(fname, digest)
+
+def generated_warning(fname):
+    if os.path.splitext(fname)[1] in ('.cc', '.h', '.inc'):
+        return cxx_generated_warning
+    if os.path.splitext(fname)[1] in ('.mk', '.ninja'):
+        return make_generated_warning
+    return tuple() # no header
+
+def write_file(fname, fcontents, manifest=None):
+    os.makedirs(os.path.abspath(os.path.dirname(fname)), exist_ok=True)
+    write_if_different(fname, '\n'.join(itertools.chain(generated_warning(fname), *fcontents)), manifest)
+
+# Make module source paths independent of the working directory
+def canonicalize(val):
+    if isinstance(val, dict):
+        return {k: (os.path.abspath(v) if k == 'fname' else canonicalize(v)) for k,v in val.items()}
+    if isinstance(val, (list, tuple)):
+        return [canonicalize(v) for v in val]
+    return val
+
+# The build ID is a hash of only the parts of the parsed configuration that affect the build, ignoring key order.
+# Configurations that differ only in their executable name share a build.
+# With runtime parameters, configurations that also differ only in the parameters read at run time share a build.
+# With plug-ins, no modules are compiled into the build.
+def get_build_id(parsed_config, runtime_parameters=False, plugins=False):
+    executable, elements, modules_to_compile, module_info, config_file, env = parsed_config
+    if runtime_parameters:
+        elements = instantiation_file.get_parameter_references(**elements)
+    build_relevant = canonicalize({
+        'elements': elements,
+        'modules_to_compile': modules_to_compile,
+        'module_info': module_info,
+        'config_file': config_file,
+        'env': env
+    })
+    if plugins:
+        build_relevant['modules_to_compile'] = None
+        build_relevant['plugins'] = True
+    return hashlib.shake_128(json.dumps(build_relevant, sort_keys=True).encode('utf-8')).hexdigest(4)
+
+# The profile ID is like the build ID, but ignores the parameters of the elements.
+# Builds in a sweep that compile the same sources with the same flags share a profile, which is trained with the first of them.
+def get_profile_id(parsed_config, profile):
+    executable, elements, modules_to_compile, module_info, config_file, env = parsed_config
+    profile_relevant = canonicalize({
+        'modules_to_compile': modules_to_compile,
+        'module_info': module_info,
+        'num_cores': config_file.get('num_cores'),
+        'env': env,
+        'profile': profile
+    })
+    return hashlib.shake_128(json.dumps(profile_relevant, sort_keys=True).encode('utf-8')).hexdigest(4)
+
+def add_flags(env, flags):
+    return {**env, **{k: [*util.wrap_list(env.get(k, [])), *v] for k,v in flags.items()}}
+
+def get_profile_env(env, stage):
+    return add_flags(env, profile_flags[stage])
+
+# The name of the profile data for a source. The instrumented and optimized objects of a source are in different places, so the name is given explicitly.
+def get_profile_data_name(fname):
+    return os.path.splitext(os.path.abspath(fname))[0].lstrip(os.sep).replace(os.sep, '.')
+
+# A simulator built with runtime parameters reads them from a file named after the executable
+def get_parameters_file_name(executable):
+    return executable + parameters_file_suffix
+
+def get_parameters_lines(elements):
+    return json.dumps(instantiation_file.get_runtime_parameters(**elements), indent=2, sort_keys=True).splitlines()
+
+# The parameters of a configuration, each named by its element and key, as in "LLC.sets" or "cpu0.rob_size".
+# The memory's parameters are under its name, the virtual memory's under "virtual_memory", and those of the whole system have no prefix.
+def get_flat_parameters(elements, config_file):
+    def flatten(prefix, val):
+        if isinstance(val, dict):
+            for k,v in val.items():
+                if not k.startswith('_') and k != 'name':
+                    yield from flatten(prefix + '.' + k, v)
+        elif isinstance(val, (bool, int, float, str)):
+            yield prefix, val
+
+    named_elements = (*elements['cores'], *elements['caches'], *elements['ptws'], elements['pmem'])
+    return dict(itertools.chain(
+        ((k,v) for k,v in config_file.items() if isinstance(v, (bool, int, float, str))),
+        *(flatten(e['name'], e) for e in named_elements if 'name' in e),
+        flatten('virtual_memory', elements['vmem'])
+    ))
+
+# The build and parameters of an executable are written beside it, so that its results may be found by them
+def get_build_info_file_name(executable):
+    return executable + build_info_file_suffix
+
+def get_build_info_lines(build_id, elements, config_file):
+    return json.dumps({'build_id': build_id, 'parameters': get_flat_parameters(elements, config_file)}, indent=2, sort_keys=True).splitlines()
 
 def get_map_lines(fname_map):
     yield from ('#define {} {}'.format(*x) for x in fname_map.items())
 
+def get_module_headers(module_info):
+    core_declarations, core_definitions = modules.get_ooo_cpu_module_lines(module_info.get('branch', {}), module_info.get('btb', {}))
+    cache_declarations, cache_definitions = modules.get_cache_module_lines(module_info.get('pref', {}), module_info.get('repl', {}))
+    return {
+        core_module_declaration_file_name: list(core_declarations),
+        core_module_definition_file_name: list(core_definitions),
+        cache_module_declaration_file_name: list(cache_declarations),
+        cache_module_definition_file_name: list(cache_definitions)
+    }
+
 class FileWriter:
-    def __init__(self, bindir_name=None, objdir_name=None):
+    # The generator selects whether the build is described by a makefile or a ninja file. The makefile name is the name of either.
+    # The profile, if given, enables profile-guided optimization. It holds the traces and the instruction counts for the training run.
+    # With telemetry, the build records the wall time of each compile and link, and the files that attribute them to modules and builds are written.
+    # With runtime parameters, each build is linked once, and each executable is a link to it that reads its parameters from a file beside it.
+    # With plug-ins, every module that is found is built as a shared object, and the executables load the modules they are configured with when they start.
+    # With configure inputs, the makefile lists the sources that were scanned for includes, with the digests of their includes, so that make can tell when the grouping is out of date.
+    def __init__(self, bindir_name=None, objdir_name=None, streaming=False, makefile_name=None, generator='make', precompiled_headers=False, profile=None, telemetry=False, runtime_parameters=False, plugins=False, configure_inputs=False):
         champsim_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         core_sources = os.path.join(champsim_root, 'src')
 
         self.fileparts = []
+        self.streaming = streaming
+        self.spool_files = {}
+        self.written_builds = set()
+        self.manifest = Manifest(objdir_name and os.path.join(objdir_name, manifest_file_name))
+        self.generator = generator
+        self.precompiled_headers = precompiled_headers
+        self.profile = profile
+        self.telemetry = telemetry
+        self.runtime_parameters = runtime_parameters
+        self.plugins = plugins
+        self.configure_inputs = configure_inputs and generator == 'make'
+        self.makefile_name = makefile_name or {'make': makefile_file_name, 'ninja': ninja_file_name}[generator]
         self.bindir_name = bindir_name
         self.core_sources = core_sources
+        self.core_includes = os.path.join(champsim_root, 'inc')
+        self.plugin_sources = os.path.join(champsim_root, 'plugin')
         self.objdir_name = objdir_name
+        self.scanners = {}
+        self.include_digests = {}
 
-    def write_files(self, parsed_config, bindir_name=None, srcdir_names=None, objdir_name=None):
-        local_bindir_name = bindir_name or self.bindir_name
+    # Only the settings are sent to worker processes, not the file parts and builds collected so far, the open spool files, or the manifest
+    def __getstate__(self):
+        return {**self.__dict__, 'fileparts': [], 'spool_files': {}, 'written_builds': set(), 'manifest': Manifest()}
+
+    # Return the file parts for the configuration, grouped into units. Each unit is a key and the file parts in the unit.
+    # A unit's file parts only need to be written once, no matter how many executables share it. Units with no key are always written.
+    # The unit of an executable is keyed by its path, and no two configurations may produce the same executable.
+    def get_fileparts(self, parsed_config, bindir_name=None, srcdir_names=None, objdir_name=None):
+        local_objdir_name = os.path.abspath(objdir_name or self.objdir_name)
         local_srcdir_names = (*(srcdir_names or []), self.core_sources)
-        local_objdir_name = objdir_name or self.objdir_name
+        executable, elements, modules_to_compile, module_info, config_file, env = parsed_config
+        build_id = get_build_id(parsed_config, self.runtime_parameters, self.plugins)
+
+        plugins = []
+        if self.plugins:
+            plugins = list(self.get_plugins(self.get_constants_headers(parsed_config), module_info, env, local_objdir_name))
+            joined_module_info = {}
+            env = add_flags(env, plugin_flags['executable'])
+        else:
+            joined_module_info = util.subdict(util.chain(*module_info.values()), modules_to_compile) # remove module type tag
 
-        build_id = hashlib.shake_128(json.dumps(parsed_config).encode('utf-8')).hexdigest(4)
+        headers = {
+            **self.get_generated_headers(parsed_config, {p['module_name']: p['path'] for p in plugins} if self.plugins else None),
+            **{m['name'] + '.inc': list(get_map_lines(util.chain(m['func_map'], m.get('deprecated_func_map', {})))) for m in joined_module_info.values()}
+        }
 
-        inc_dir = os.path.join(os.path.abspath(local_objdir_name), build_id, 'inc')
+        profile_units = []
+        profile_fileparts = []
+        if self.profile is not None:
+            profile_id = get_profile_id(parsed_config, self.profile)
+            profile_dir = os.path.join(local_objdir_name, profile_dir_name, profile_id)
+            profile_stamp = os.path.join(profile_dir, profile_stamp_file_name)
+            profile_units = list(self.get_shared_units(headers, local_srcdir_names, joined_module_info, get_profile_env(env, 'generate'), {'dir': profile_dir, 'stamp': None}))
+            profile_fileparts = [((local_objdir_name, profile_dir_name, profile_id), self.get_profile_fileparts(profile_id, profile_dir, profile_stamp, profile_units, parsed_config, local_objdir_name))]
+            env = get_profile_env(env, 'use')
+            shared_units = list(self.get_shared_units(headers, local_srcdir_names, joined_module_info, env, {'dir': profile_dir, 'stamp': profile_stamp}))
+        else:
+            shared_units = list(self.get_shared_units(headers, local_srcdir_names, joined_module_info, env))
 
+        precompiled_headers = {u['pch']['key']: u['pch'] for u in (*profile_units, *shared_units) if u['pch'] is not None}
+        scanned_dirs = []
+        if self.configure_inputs:
+            plugin_dirs = (self.plugin_sources, *(m['fname'] for infos in module_info.values() for m in infos.values())) if self.plugins else ()
+            scanned_dirs = sorted({os.path.abspath(d) for d in (*local_srcdir_names, self.core_includes, *(m['fname'] for m in joined_module_info.values()), *plugin_dirs)})
+        return (
+            *((((self.makefile_name,), ((self.makefile_name, self.get_prelude_lines(local_objdir_name)),)),) if self.generator == 'ninja' or self.telemetry else ()),
+            *(((local_objdir_name, shared_dir_name, p['key']), self.get_precompiled_header_fileparts(p, headers, local_objdir_name)) for p in precompiled_headers.values()),
+            *(((local_objdir_name, shared_dir_name, u['key']), self.get_shared_fileparts(u, headers, local_objdir_name)) for u in profile_units),
+            *profile_fileparts,
+            *(((local_objdir_name, shared_dir_name, u['key']), self.get_shared_fileparts(u, headers, local_objdir_name)) for u in shared_units),
+            *(((local_objdir_name, shared_dir_name, u['key']), self.get_shared_fileparts(u, p['headers'], local_objdir_name)) for p in plugins for u in p['units']),
+            *(((local_objdir_name, shared_dir_name, p['key']), self.get_plugin_fileparts(p, env, local_objdir_name)) for p in plugins),
+            *(((local_objdir_name, inputs_dir_name, d), self.get_input_fileparts(d, local_objdir_name)) for d in scanned_dirs),
+            ((local_objdir_name, build_id), self.get_build_fileparts(build_id, headers, joined_module_info, env, shared_units, local_srcdir_names, local_objdir_name, plugins)),
+            ((executable_unit_name, self.get_executable_path(parsed_config, bindir_name)), self.get_executable_fileparts(parsed_config, build_id, bindir_name, shared_units, local_objdir_name, env, plugins))
+        )
+
+    # The digests of the includes in a scanned directory are written beside the builds, and the makefile lists the directory and its sources
+    def get_input_fileparts(self, dirname, objdir_name):
+        if dirname not in self.include_digests:
+            self.include_digests[dirname] = includes.include_digests(dirname)
+        digest_file = os.path.join(objdir_name, inputs_dir_name, hashlib.shake_128(dirname.encode('utf-8')).hexdigest(4) + '.json')
+        yield digest_file, [json.dumps({'dir': dirname, 'digests': self.include_digests[dirname]}, sort_keys=True)]
+        yield self.makefile_name, makefile.get_configure_input_lines(digest_file, [*(base for base,_,_ in os.walk(dirname)), *includes.source_files(dirname)])
+
+    # The lines that begin the build file, once for all builds
+    def get_prelude_lines(self, objdir_name):
+        telemetry_log = os.path.join(objdir_name, telemetry.log_file_name) if self.telemetry else None
+        if self.generator == 'ninja':
+            yield from ninja.get_prelude_lines(objdir_name, telemetry_log=telemetry_log)
+        elif telemetry_log is not None:
+            yield from makefile.get_telemetry_lines(telemetry_log)
+
+    # The generated headers that may be included by the core sources, rendered in advance so that sources may be grouped by their contents.
+    # With plug-ins, the paths of the plug-ins are given by the names of their modules.
+    def get_generated_headers(self, parsed_config, plugin_paths=None):
+        executable, elements, modules_to_compile, module_info, config_file, env = parsed_config
+        return {
+            instantiation_file_name: list(instantiation_file.get_instantiation_lines(**elements, runtime_parameters=self.runtime_parameters, plugins=plugin_paths)),
+            **self.get_constants_headers(parsed_config),
+            **get_module_headers(module_info)
+        }
+
+    def get_constants_headers(self, parsed_config):
         executable, elements, modules_to_compile, module_info, config_file, env = parsed_config
+        constants_files = {
+            address_constants_file_name: list(constants_file.get_address_constants_file(config_file)),
+            cpu_constants_file_name: list(constants_file.get_cpu_constants_file(config_file)),
+            stat_constants_file_name: list(constants_file.get_stat_constants_file(config_file)),
+            dram_constants_file_name: list(constants_file.get_dram_constants_file(elements['pmem'])),
+            dram_controller_constants_file_name: list(constants_file.get_dram_controller_constants_file(elements['pmem']))
+        }
 
-        self.fileparts.append((os.path.join(inc_dir, instantiation_file_name), instantiation_file.get_instantiation_lines(**elements))) # Instantiation file
-        self.fileparts.append((os.path.join(inc_dir, constants_file_name), constants_file.get_constants_file(config_file, elements['pmem']))) # Constants header
+        return {
+            constants_file_name: list(constants_file.get_constants_file(constants_files.keys())),
+            **constants_files
+        }
 
-        # Core modules file
-        core_declarations, core_definitions = modules.get_ooo_cpu_module_lines(module_info['branch'], module_info['btb'])
+    # Each plug-in holds one module and the entry point for its kind, which are compiled with headers that declare only that module.
+    # It is keyed by the keys of its units and the link flags, so identical plug-ins in different builds are linked once.
+    def get_plugins(self, constants_headers, module_info, env, objdir_name):
+        flags = util.subdict(env, ('CXX', 'CPPFLAGS', 'CXXFLAGS'))
+        for kind, infos in module_info.items():
+            for name, m in infos.items():
+                headers = {
+                    **constants_headers,
+                    **get_module_headers({kind: {name: m}}),
+                    name + '.inc': list(get_map_lines(util.chain(m['func_map'], m.get('deprecated_func_map', {}))))
+                }
+                header_digests = {k: content_digest(v) for k,v in headers.items()}
+                header_includes = {k: list(includes.included_names(v)) for k,v in headers.items()}
+                opts = {**m['opts'], **{k: (*m['opts'].get(k, ()), *v) for k,v in plugin_flags['module'].items()}}
+                units = [
+                    *self.get_source_units(m['fname'], header_digests, header_includes, flags, module_name=name, opts=opts),
+                    *self.get_source_units(self.plugin_sources, header_digests, header_includes, flags, module_name=name, opts=opts, selected=(plugin_entry_names[kind],))
+                ]
+                plugin_relevant = {
+                    'units': sorted(u['key'] for u in units),
+                    'link': util.subdict(env, ('CXX', 'LDFLAGS', 'LDLIBS'))
+                }
+                key = hashlib.shake_128(json.dumps(plugin_relevant, sort_keys=True).encode('utf-8')).hexdigest(4)
+                yield { 'key': key, 'module_name': name, 'path': os.path.join(objdir_name, shared_dir_name, key, name + '.so'), 'units': units, 'headers': headers }
 
-        self.fileparts.extend((
-            (os.path.join(inc_dir, core_module_declaration_file_name), core_declarations),
-            (os.path.join(inc_dir, core_module_definition_file_name), core_definitions)
-        ))
+    # Group the core sources and the sources of each module by the generated headers they depend on.
+    # If a profile is given, the objects are compiled to produce or to use the profile data in its directory.
+    def get_shared_units(self, headers, source_dirs, module_info, env, profile=None):
+        header_digests = {k: content_digest(v) for k,v in headers.items()}
+        header_includes = {k: list(includes.included_names(v)) for k,v in headers.items()}
+        flags = util.subdict(env, ('CXX', 'CPPFLAGS', 'CXXFLAGS'))
+        for src_dir in source_dirs:
+            yield from self.get_source_units(src_dir, header_digests, header_includes, flags, profile=profile)
+        for name, m in module_info.items():
+            yield from self.get_source_units(m['fname'], header_digests, header_includes, flags, module_name=name, opts=m['opts'], profile=profile)
+
+    # Each group is keyed by the contents of the headers it depends on and the compiler flags, so identical groups in different builds have the same key.
+    # Module sources also depend on the module's own header, which is force-included.
+    # If names are selected, only the sources of those names are grouped.
+    def get_source_units(self, src_dir, header_digests, header_includes, flags, module_name=None, opts={}, profile=None, selected=None):
+        scanner = self.scanners.setdefault(os.path.abspath(src_dir), includes.IncludeScanner((self.core_includes, src_dir)))
+        for base, _, files in os.walk(src_dir):
+            groups = {}
+            precompiled_headers = {}
+            for f in sorted(files):
+                if os.path.splitext(f)[1] == '.cc' and (selected is None or os.path.splitext(f)[0] in selected):
+                    dependencies = scanner.generated_dependencies(os.path.join(base, f), header_includes)
+                    pch = self.get_precompiled_header(scanner, os.path.join(base, f), header_digests, header_includes, flags, opts) if self.precompiled_headers else None
+                    precompiled_headers[(dependencies, pch and pch['key'])] = pch
+                    groups.setdefault((dependencies, pch and pch['key']), []).append(os.path.splitext(f)[0])
+
+            for (dependencies, pch_key), sources in groups.items():
+                unit_headers = sorted(dependencies.union([module_name + '.inc'] if module_name is not None else []))
+                shared_relevant = {
+                    'source': os.path.abspath(src_dir),
+                    'base': os.path.abspath(base),
+                    'sources': sources,
+                    'headers': util.subdict(header_digests, unit_headers),
+                    'flags': flags,
+                    'module': module_name,
+                    'opts': opts,
+                    'pch': pch_key,
+                    'profile': profile
+                }
+                key = hashlib.shake_128(json.dumps(shared_relevant, sort_keys=True).encode('utf-8')).hexdigest(4)
+                unit_profile = profile and {**profile, 'names': [get_profile_data_name(os.path.join(base, s + '.cc')) for s in sources]}
+                yield { 'key': key, 'src_dir': src_dir, 'base_dir': base, 'sources': sources, 'headers': unit_headers, 'flags': flags, 'module_name': module_name, 'opts': opts, 'pch': precompiled_headers[(dependencies, pch_key)], 'profile': unit_profile }
 
-        # Cache modules file
-        cache_declarations, cache_definitions = modules.get_cache_module_lines(module_info['pref'], module_info['repl'])
+    # The precompiled header for a source holds the candidate headers that depend on generated headers and that the source already includes, so it adds no generated dependencies to the source.
+    # Candidates that depend on no generated header are the same in every build, so they are always added, which lets more sources share a precompiled header.
+    # Sources that include none of the candidates with generated dependencies are compiled without one.
+    # It is keyed like a shared unit, so sources with the same includes and flags share one, even between builds.
+    def get_precompiled_header(self, scanner, fname, header_digests, header_includes, flags, opts):
+        reachable = scanner.reachable_headers(fname, header_includes)
+        candidate_headers = {}
+        for name in precompiled_header_candidates:
+            resolved = scanner.resolve(name, None)
+            candidate_headers[name] = scanner.generated_dependencies(resolved, header_includes) if resolved is not None else frozenset()
 
-        self.fileparts.extend((
-            (os.path.join(inc_dir, cache_module_declaration_file_name), cache_declarations),
-            (os.path.join(inc_dir, cache_module_definition_file_name), cache_definitions)
+        if not any(candidate_headers[name] for name in reachable.intersection(precompiled_header_candidates)):
+            return None
+
+        pch_includes = [name for name in precompiled_header_candidates if name in reachable or not candidate_headers[name]]
+        pch_headers = sorted(frozenset().union(*(candidate_headers[name] for name in pch_includes)))
+        pch_relevant = {
+            'includes': pch_includes,
+            'headers': util.subdict(header_digests, pch_headers),
+            'flags': flags,
+            'opts': opts
+        }
+        key = hashlib.shake_128(json.dumps(pch_relevant, sort_keys=True).encode('utf-8')).hexdigest(4)
+        return { 'key': key, 'includes': pch_includes, 'headers': pch_headers, 'flags': flags, 'opts': opts }
+
+    def get_precompiled_header_path(self, pch, objdir_name):
+        return os.path.join(objdir_name, shared_dir_name, pch['key'], 'pch', precompiled_header_file_name)
+
+    def get_precompiled_header_fileparts(self, pch, headers, objdir_name):
+        shared_root = os.path.join(objdir_name, shared_dir_name)
+        inc_dir = os.path.join(shared_root, pch['key'], 'inc')
+        pch_path = self.get_precompiled_header_path(pch, objdir_name)
+        yield from ((os.path.join(inc_dir, name), headers[name]) for name in pch['headers'])
+        yield pch_path, ['#include "{}"'.format(name) for name in pch['includes']]
+        if self.telemetry:
+            yield os.path.join(shared_root, pch['key'], telemetry.unit_index_file_name), [json.dumps({'module': None, 'includes': pch['includes']}, sort_keys=True)]
+        generator = {'make': makefile.pch_opts, 'ninja': ninja.pch_opts}[self.generator]
+        yield self.makefile_name, generator(shared_root, pch['key'], pch_path, pch['flags'], bool(pch['headers']), pch['opts'])
+
+    def get_shared_fileparts(self, unit, headers, objdir_name):
+        shared_root = os.path.join(objdir_name, shared_dir_name)
+        inc_dir = os.path.join(shared_root, unit['key'], 'inc')
+        yield from ((os.path.join(inc_dir, name), headers[name]) for name in unit['headers'])
+        if self.telemetry:
+            yield os.path.join(shared_root, unit['key'], telemetry.unit_index_file_name), [json.dumps({'module': unit['module_name'], 'path': os.path.abspath(unit['src_dir']), 'source': os.path.abspath(unit['base_dir']), 'sources': unit['sources']}, sort_keys=True)]
+        generator = {'make': makefile.shared_opts, 'ninja': ninja.shared_opts}[self.generator]
+        pch_path = unit['pch'] and self.get_precompiled_header_path(unit['pch'], objdir_name)
+        yield self.makefile_name, generator(shared_root, unit['key'], unit['src_dir'], unit['base_dir'], unit['sources'], unit['flags'], bool(unit['headers']), unit['module_name'], unit['opts'], pch_path, unit['profile'])
+
+    # The instrumented executable is linked from the instrumented objects and run on the training traces, once for each profile
+    def get_profile_fileparts(self, profile_id, profile_dir, profile_stamp, profile_units, parsed_config, objdir_name):
+        executable = os.path.join(profile_dir, 'bin', 'champsim')
+        num_cores = parsed_config[4].get('num_cores', 1)
+        traces = list(itertools.islice(itertools.cycle(self.profile['traces']), num_cores))
+        command = ' '.join((
+            executable, '--hide-heartbeat',
+            '--warmup-instructions', str(self.profile['warmup_instructions']),
+            '--simulation-instructions', str(self.profile['simulation_instructions']),
+            *map(os.path.abspath, traces),
+            '>', os.path.join(profile_dir, 'training.log')
         ))
+        env = get_profile_env(parsed_config[5], 'generate')
+        if self.runtime_parameters:
+            yield get_parameters_file_name(executable), get_parameters_lines(parsed_config[1])
+        if self.generator == 'ninja':
+            objects = itertools.chain(*(ninja.shared_objects(os.path.join(objdir_name, shared_dir_name), u) for u in profile_units))
+            yield self.makefile_name, ninja.profile_opts(profile_id, profile_dir, profile_stamp, executable, command, objects, env)
+        else:
+            objects = [makefile.dereference(makefile.shared_objs_varname(u['key'])) for u in profile_units]
+            yield self.makefile_name, makefile.profile_opts(profile_id, profile_stamp, executable, command, objects, env)
+
+    def get_plugin_fileparts(self, plugin, env, objdir_name):
+        if self.generator == 'ninja':
+            objects = itertools.chain(*(ninja.shared_objects(os.path.join(objdir_name, shared_dir_name), u) for u in plugin['units']))
+            yield self.makefile_name, ninja.plugin_opts(plugin['key'], plugin['path'], objects, env)
+        else:
+            objects = [makefile.dereference(makefile.shared_objs_varname(u['key'])) for u in plugin['units']]
+            yield self.makefile_name, makefile.plugin_opts(plugin['key'], plugin['path'], objects, env)
+
+    def get_build_fileparts(self, build_id, headers, module_info, env, shared_units, srcdir_names, objdir_name, plugins=()):
+        inc_dir = os.path.join(os.path.abspath(objdir_name), build_id, 'inc')
+        yield from ((os.path.join(inc_dir, name), lines) for name, lines in headers.items())
+        if self.telemetry:
+            unit_keys = sorted({*(u['key'] for u in shared_units), *(u['pch']['key'] for u in shared_units if u['pch'] is not None)})
+            yield os.path.join(os.path.abspath(objdir_name), build_id, telemetry.build_index_file_name), [json.dumps({'units': unit_keys}, sort_keys=True)]
+        if self.generator == 'make':
+            yield self.makefile_name, makefile.get_build_lines(objdir_name, build_id, srcdir_names, module_info, env, shared_units)
+        if self.runtime_parameters:
+            yield self.makefile_name, self.get_link_lines(build_id, self.get_binary_path(build_id, objdir_name), shared_units, env, objdir_name, plugins)
+
+    # Each build with runtime parameters is linked once, into the object directory
+    def get_binary_path(self, build_id, objdir_name):
+        return os.path.join(os.path.abspath(objdir_name), build_id, 'bin', binary_file_name)
 
-        joined_module_info = util.subdict(util.chain(*module_info.values()), modules_to_compile) # remove module type tag
-        self.fileparts.extend((os.path.join(inc_dir, m['name'] + '.inc'), get_map_lines(util.chain(m['func_map'], m.get('deprecated_func_map', {})))) for m in joined_module_info.values())
-        self.fileparts.append((makefile_file_name, makefile.get_makefile_lines(local_objdir_name, build_id, os.path.normpath(os.path.join(local_bindir_name, executable)), local_srcdir_names, joined_module_info, env)))
+    # Ninja has no wildcards, so an executable is linked from the objects of the shared units, which cover every source found when configuring.
+    # The plug-ins are built along with the executable, but it is not linked with them, so it is not relinked when they change.
+    def get_link_lines(self, build_id, executable, shared_units, env, objdir_name, plugins=()):
+        plugin_paths = [p['path'] for p in plugins]
+        if self.generator == 'ninja':
+            objects = itertools.chain(*(ninja.shared_objects(os.path.join(objdir_name, shared_dir_name), u) for u in shared_units))
+            return ninja.get_executable_lines(build_id, executable, objects, env, plugin_paths)
+        return makefile.get_executable_lines(build_id, executable, env, plugin_paths)
+
+    def get_executable_path(self, parsed_config, bindir_name=None):
+        return os.path.abspath(os.path.join(bindir_name or self.bindir_name, parsed_config[0]))
+
+    # With runtime parameters, the executable is a link to the binary of its build, and its parameters are written beside it
+    # Every executable has its build information beside it
+    def get_executable_fileparts(self, parsed_config, build_id, bindir_name, shared_units, objdir_name, env, plugins=()):
+        executable = self.get_executable_path(parsed_config, bindir_name)
+        yield get_build_info_file_name(executable), get_build_info_lines(build_id, parsed_config[1], parsed_config[4])
+        if self.runtime_parameters:
+            yield get_parameters_file_name(executable), get_parameters_lines(parsed_config[1])
+            generator = {'make': makefile.get_linked_executable_lines, 'ninja': ninja.get_linked_executable_lines}[self.generator]
+            yield self.makefile_name, generator(build_id, executable, self.get_binary_path(build_id, objdir_name))
+        else:
+            yield self.makefile_name, self.get_link_lines(build_id, executable, shared_units, env, objdir_name, plugins)
+
+    # Render the file contents eagerly, so that they may be produced in another process
+    def render_files(self, parsed_config, bindir_name=None, srcdir_names=None, objdir_name=None):
+        return tuple((key, [(fname, list(fcontents)) for fname, fcontents in parts]) for key, parts in self.get_fileparts(parsed_config, bindir_name, srcdir_names, objdir_name))
+
+    def write_files(self, parsed_config, bindir_name=None, srcdir_names=None, objdir_name=None):
+        self.write_build(*self.get_fileparts(parsed_config, bindir_name, srcdir_names, objdir_name))
+
+    def write_build(self, *units):
+        for key, parts in units:
+            if key is None or key not in self.written_builds:
+                if key is not None:
+                    self.written_builds.add(key)
+                self.write_fileparts(parts)
+            elif key[0] == executable_unit_name:
+                raise ValueError('More than one configuration produces the executable ' + key[1])
+
+    # In streaming mode, files private to a build are written immediately.
+    # Files shared between builds are spooled alongside their destination and moved into place by finish().
+    def write_fileparts(self, fileparts):
+        if not self.streaming:
+            self.fileparts.extend(fileparts)
+            return
+
+        for fname, fcontents in fileparts:
+            if fname in shared_file_names:
+                self.spool(fname, fcontents)
+            else:
+                write_file(fname, (fcontents,), self.manifest)
+
+    def spool(self, fname, fcontents):
+        if fname not in self.spool_files:
+            os.makedirs(os.path.abspath(os.path.dirname(fname)), exist_ok=True)
+            self.spool_files[fname] = (open(fname + '.spool', 'wb'), hashlib.sha256())
+            self.spool_lines(fname, generated_warning(fname))
+
+        self.spool_lines(fname, fcontents)
+
+    def spool_lines(self, fname, lines):
+        wfp, digest = self.spool_files[fname]
+        for l in lines:
+            wfp.write((l+'\n').encode('utf-8'))
+            digest.update(l.strip().encode('utf-8'))
+            digest.update(b'\n')
 
     def finish(self):
         for fname, fcontents in itertools.groupby(sorted(self.fileparts, key=operator.itemgetter(0)), key=operator.itemgetter(0)):
-            os.makedirs(os.path.abspath(os.path.dirname(fname)), exist_ok=True)
-            if os.path.splitext(fname)[1] in ('.cc', '.h', '.inc'):
-                contents_with_header = itertools.chain(cxx_generated_warning, *(f[1] for f in fcontents))
-            elif os.path.splitext(fname)[1] in ('.mk',):
-                contents_with_header = itertools.chain(make_generated_warning, *(f[1] for f in fcontents))
-            else:
-                contents_with_header = itertools.chain.from_iterable(f[1] for f in fcontents) # no header
+            write_file(fname, [f[1] for f in fcontents], self.manifest)
+
+        for fname, (wfp, digest) in self.spool_files.items():
+            # Lines are joined, not terminated, by newlines
+            if wfp.tell() > 0:
+                wfp.truncate(wfp.tell()-1)
+            wfp.close()
+            replace_if_different(fname, wfp.name, digest.hexdigest(), self.manifest)
+        self.spool_files = {}
 
-            write_if_different(fname, '\n'.join(contents_with_header))
+        self.manifest.save()
 
 
 @contextlib.contextmanager
-def writer(bindir_name=None, objdir_name=None):
-    w = FileWriter(bindir_name, objdir_name)
+def writer(bindir_name=None, objdir_name=None, streaming=False, makefile_name=None, generator='make', precompiled_headers=False, profile=None, telemetry=False, runtime_parameters=False, plugins=False, configure_inputs=False):
+    w = FileWriter(bindir_name, objdir_name, streaming, makefile_name, generator, precompiled_headers, profile, telemetry, runtime_parameters, plugins, configure_inputs)
     try:
         yield w
     finally:
@@ -0,0 +1,119 @@
+#    Copyright 2023 The ChampSim Contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+include_pattern = re.compile(r'^\s*#\s*include\s*[<"]([^>"]+)[>"]')
+
+def included_names(lines):
+    yield from (m[1] for m in map(include_pattern.match, lines) if m is not None)
+
+# The files that may be scanned for includes
+source_extensions = ('.c', '.cc', '.cpp', '.h', '.hh', '.hpp', '.inc')
+
+def source_files(dirname):
+    for base, _, files in os.walk(dirname):
+        yield from (os.path.join(base, f) for f in sorted(files) if os.path.splitext(f)[1] in source_extensions)
+
+# The digest of the include directives of each source in the directory, and of the names of the sources, so that added or removed sources are noticed.
+# Sources that change in other ways have the same digests, since they do not change how the sources are grouped.
+def include_digests(dirname):
+    fnames = list(source_files(dirname))
+    def digest(lines):
+        return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+    def file_digest(fname):
+        with open(fname, 'rt', errors='replace') as rfp:
+            return digest(included_names(rfp))
+    return {'': digest(os.path.relpath(f, dirname) for f in fnames), **{f: file_digest(f) for f in fnames}}
+
+# Check that the includes of the sources have not changed since the digests were written
+def check(digest_fnames):
+    for fname in digest_fnames:
+        try:
+            with open(fname, 'rt') as rfp:
+                recorded = json.load(rfp)
+        except (OSError, ValueError):
+            return False
+        if include_digests(recorded['dir']) != recorded['digests']:
+            return False
+    return True
+
+# Finds the generated headers that a source file depends on, following includes through the headers in the include directories.
+# Headers that cannot be found in the include directories are assumed to be system headers.
+class IncludeScanner:
+    def __init__(self, include_dirs):
+        self.include_dirs = [os.path.abspath(d) for d in include_dirs]
+        self.file_includes = {}
+        self.resolved = {}
+        self.dependencies = {}
+
+    def includes_of(self, fname):
+        if fname not in self.file_includes:
+            with open(fname, 'rt') as rfp:
+                self.file_includes[fname] = list(included_names(rfp))
+        return self.file_includes[fname]
+
+    def resolve(self, name, current_dir):
+        if (name, current_dir) not in self.resolved:
+            candidates = (os.path.normpath(os.path.join(d, name)) for d in (current_dir, *self.include_dirs) if d is not None)
+            self.resolved[(name, current_dir)] = next(filter(os.path.isfile, candidates), None)
+        return self.resolved[(name, current_dir)]
+
+    # Return the names of the generated headers included by the file, directly or indirectly.
+    # The generated headers may not have been written yet, so they are given as a dict of their names to the names they include.
+    # The result depends only on that dict, so it is memoized on it.
+    def generated_dependencies(self, fname, generated_includes):
+        return self.memoized_scan(fname, generated_includes)[0]
+
+    # Return the names of all headers included by the file, directly or indirectly, as they were written in the include directives.
+    def reachable_headers(self, fname, generated_includes):
+        return self.memoized_scan(fname, generated_includes)[1]
+
+    def memoized_scan(self, fname, generated_includes):
+        memo_key = (os.path.abspath(fname), tuple(sorted((k, tuple(v)) for k,v in generated_includes.items())))
+        if memo_key not in self.dependencies:
+            self.dependencies[memo_key] = self.scan(os.path.abspath(fname), generated_includes)
+        return self.dependencies[memo_key]
+
+    def scan(self, fname, generated_includes):
+        found = set()
+        reached = set()
+        visited = set()
+        stack = [(fname, os.path.dirname(fname), self.includes_of(fname))]
+        while stack:
+            current, current_dir, names = stack.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            reached.update(names)
+            for name in names:
+                if name in generated_includes:
+                    found.add(name)
+                    stack.append((name, None, generated_includes[name]))
+                else:
+                    resolved = self.resolve(name, current_dir)
+                    if resolved is not None:
+                        stack.append((resolved, os.path.dirname(resolved), self.includes_of(resolved)))
+        return frozenset(found), frozenset(reached)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check whether the includes of the sources that ChampSim was configured with have changed')
+    parser.add_argument('digests', nargs='*', help='The files of digests written when configuring')
+    args = parser.parse_args()
+    sys.exit(0 if check(args.digests) else 1)
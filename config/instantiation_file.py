@@ -12,16 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import itertools
 import functools
 import operator
+import string
 
 from . import util
 
 pmem_fmtstr = 'MEMORY_CONTROLLER {name}{{{frequency}, {io_freq}, {tRP}, {tRCD}, {tCAS}, {turn_around_time}, {{{_ulptr}}}}};'
 vmem_fmtstr = 'VirtualMemory vmem{{{pte_page_size}, {num_levels}, {minor_fault_penalty}, {dram_name}}};'
 
-queue_fmtstr = 'champsim::channel {name}{{{rq_size}, {pq_size}, {wq_size}, {_offset_bits}, {_queue_check_full_addr:b}}};'
+queue_args_fmtstr = '{{{rq_size}, {pq_size}, {wq_size}, {_offset_bits}, {_queue_check_full_addr:b}}}'
+queue_fmtstr = 'champsim::channel {name}' + queue_args_fmtstr + ';'
 
 core_builder_parts = {
     'ifetch_buffer_size': '.ifetch_buffer_size({ifetch_buffer_size})',
@@ -75,6 +78,57 @@ default_ptw_queue = {
                 '_queue_check_full_addr':False
         }
 
+# The names of the parameters that a set of builder parts reads
+def format_fields(builder_parts):
+    return tuple(sorted({name.split('[')[0] for fmtstr in builder_parts.values() for _, name, _, _ in string.Formatter().parse(fmtstr) if name}))
+
+queue_parameters = ('rq_size', 'pq_size', 'wq_size')
+
+# The parameters of each kind of element that may be read from a file when the simulator starts, rather than compiled in.
+# Parameters that are also written to the generated constants headers are always compiled in.
+runtime_parameter_names = {
+    'cores': (*format_fields(core_builder_parts), 'frequency'),
+    'caches': (*(k for k in format_fields(cache_builder_parts) if k != '_offset_bits'), *queue_parameters),
+    'ptws': ('mshr_size', 'max_read', 'max_write', *('pscl{}_{}'.format(level, dim) for level in range(2,6) for dim in ('set', 'way')), *queue_parameters),
+    'pmem': ('frequency', 'tRP', 'tRCD', 'tCAS', 'turn_around_time'),
+    'vmem': ('pte_page_size', 'num_levels', 'minor_fault_penalty')
+}
+
+# Only numbers are read at run time. Other values, such as expressions, are compiled in.
+def runtime_values(elem, kind):
+    return {k: v for k,v in elem.items() if k in runtime_parameter_names[kind] and isinstance(v, (int, float)) and not isinstance(v, bool)}
+
+# The values of the runtime parameters, in the layout of the parameters file
+def get_runtime_parameters(cores, caches, ptws, pmem, vmem):
+    return {
+        'cores': {c['name']: runtime_values(c, 'cores') for c in cores},
+        'caches': {c['name']: runtime_values(c, 'caches') for c in caches},
+        'ptws': {p['name']: runtime_values(p, 'ptws') for p in ptws},
+        'pmem': runtime_values(pmem, 'pmem'),
+        'vmem': runtime_values(vmem, 'vmem')
+    }
+
+def quoted(name):
+    return '"{}"'.format(name)
+
+# A reference into the parameters file. Each part of the path is a C++ expression, so that the name of an element may be computed.
+def parameter_reference(*path):
+    return 'parameters' + ''.join('.at({})'.format(p) for p in path)
+
+def refer_parameters(elem, kind, *path):
+    return {**elem, **{k: parameter_reference(quoted(kind), *path, quoted(k)) for k in runtime_values(elem, kind)}}
+
+# Replace the runtime parameters of each element with a reference into the parameters file.
+# Elements that differ only in those parameters are then identical.
+def get_parameter_references(cores, caches, ptws, pmem, vmem):
+    return {
+        'cores': [refer_parameters(c, 'cores', quoted(c['name'])) for c in cores],
+        'caches': tuple(refer_parameters(c, 'caches', quoted(c['name'])) for c in caches),
+        'ptws': tuple(refer_parameters(p, 'ptws', quoted(p['name'])) for p in ptws),
+        'pmem': refer_parameters(pmem, 'pmem'),
+        'vmem': refer_parameters(vmem, 'vmem')
+    }
+
 # Avoids a warning on clang under -Wbraced-scalar-init if there is only one member
 def vector_string(iterable):
     hoisted = list(iterable)
@@ -82,7 +136,12 @@ def vector_string(iterable):
         return hoisted[0]
     return '{'+', '.join(hoisted)+'}'
 
-def get_instantiation_lines(cores, caches, ptws, pmem, vmem):
+# The names of the elements directly below an element, in the order they are searched
+def get_lower_names(elem):
+    return [elem[k] for k in ('L1I', 'L1D', 'lower_level', 'lower_translate') if k in elem]
+
+# The upper levels of each element, with the sizes of the queues between them
+def get_upper_levels(cores, caches, ptws, pmem):
     upper_level_pairs = tuple(itertools.chain(
         ((elem['lower_level'], elem['name']) for elem in ptws),
         ((elem['lower_level'], elem['name']) for elem in caches),
@@ -93,7 +152,7 @@ def get_instantiation_lines(cores, caches, ptws, pmem, vmem):
     upper_levels = {k: {'uppers': tuple(x[1] for x in v)} for k,v in itertools.groupby(sorted(upper_level_pairs, key=operator.itemgetter(0)), key=operator.itemgetter(0))}
 
     subdict_keys = ('rq_size', 'pq_size', 'wq_size', '_offset_bits', '_queue_check_full_addr')
-    upper_levels = util.chain(upper_levels,
+    return util.chain(upper_levels,
             *({c['name']: util.subdict(c, subdict_keys)} for c in caches),
             *({p['name']: util.chain(default_ptw_queue, util.subdict(p, subdict_keys))} for p in ptws),
             {pmem['name']: {
@@ -106,126 +165,143 @@ def get_instantiation_lines(cores, caches, ptws, pmem, vmem):
             }
         )
 
-    yield '#include "environment.h"'
-    yield '#include "defaults.hpp"'
-    yield '#include "vmem.h"'
-    yield 'namespace champsim::configured {'
-    yield 'struct generated_environment final : public champsim::environment {'
-    yield ''
-
-    for ll,v in upper_levels.items():
-        for ul in v['uppers']:
-            yield queue_fmtstr.format(name='{}_to_{}_queues'.format(ul, ll), **v)
-    yield ''
-
-    yield pmem_fmtstr.format(
-            _ulptr=vector_string('&{}_to_{}_queues'.format(ul, pmem['name']) for ul in upper_levels[pmem['name']]['uppers']),
-            **pmem)
-    yield vmem_fmtstr.format(dram_name=pmem['name'], **vmem)
-
-    for ptw in ptws:
-        yield 'PageTableWalker {name}{{PageTableWalker::Builder{{champsim::defaults::default_ptw}}'.format(**ptw)
-        yield '.name("{name}")'.format(**ptw)
-        yield '.cpu({cpu})'.format(**ptw)
-        yield '.virtual_memory(&vmem)'
-
-        if "pscl5_set" in ptw or "pscl5_way" in ptw:
-            yield '.add_pscl(5, {pscl5_set}, {pscl5_way})'.format(**ptw)
-        if "pscl4_set" in ptw or "pscl4_way" in ptw:
-            yield '.add_pscl(4, {pscl4_set}, {pscl4_way})'.format(**ptw)
-        if "pscl3_set" in ptw or "pscl3_way" in ptw:
-            yield '.add_pscl(3, {pscl3_set}, {pscl3_way})'.format(**ptw)
-        if "pscl2_set" in ptw or "pscl2_way" in ptw:
-            yield '.add_pscl(2, {pscl2_set}, {pscl2_way})'.format(**ptw)
-        if "mshr_size" in ptw:
-            yield '.mshr_size({mshr_size})'.format(**ptw)
-        if "max_read" in ptw:
-            yield '.tag_bandwidth({max_read})'.format(**ptw)
-        if "max_write" in ptw:
-            yield '.fill_bandwidth({max_write})'.format(**ptw)
-
-        yield '.upper_levels({{{}}})'.format(vector_string('&{}_to_{}_queues'.format(ul, ptw['name']) for ul in upper_levels[ptw['name']]['uppers']))
-        yield '.lower_level({})'.format('&{}_to_{}_queues'.format(ptw['name'], ptw['lower_level']))
-
-        yield '};'
-        yield ''
-
-    for elem in caches:
-        yield 'CACHE {}{{CACHE::Builder{{ {} }}'.format(elem['name'], elem.get('_defaults', ''))
-        yield '.name("{name}")'.format(**elem)
-
-        local_cache_builder_parts = {
-            ('prefetch_as_load', True): '.set_prefetch_as_load()',
-            ('prefetch_as_load', False): '.reset_prefetch_as_load()',
-            ('wq_check_full_addr', True): '.set_wq_checks_full_addr()',
-            ('wq_check_full_addr', False): '.reset_wq_checks_full_addr()',
-            ('virtual_prefetch', True): '.set_virtual_prefetch()',
-            ('virtual_prefetch', False): '.reset_virtual_prefetch()'
-        }
-
-        yield from (v.format(**elem) for k,v in cache_builder_parts.items() if k in elem)
-        yield from (v.format(**elem) for k,v in local_cache_builder_parts.items() if k[0] in elem and k[1] == elem[k[0]])
-
-        # Create prefetch activation masks
-        if 'prefetch_activate' in elem:
-            yield '.prefetch_activate({})'.format(', '.join('access_type::'+t for t in elem['prefetch_activate']))
-
+# The arguments to the builder functions, other than the element, are C++ expressions.
+# The upper levels and lower levels are pointers to queues.
+def get_ptw_builder_lines(ptw, name, cpu, upper_levels, lower_level):
+    yield '.name({})'.format(name)
+    yield '.cpu({})'.format(cpu)
+    yield '.virtual_memory(&vmem)'
+
+    if "pscl5_set" in ptw or "pscl5_way" in ptw:
+        yield '.add_pscl(5, {pscl5_set}, {pscl5_way})'.format(**ptw)
+    if "pscl4_set" in ptw or "pscl4_way" in ptw:
+        yield '.add_pscl(4, {pscl4_set}, {pscl4_way})'.format(**ptw)
+    if "pscl3_set" in ptw or "pscl3_way" in ptw:
+        yield '.add_pscl(3, {pscl3_set}, {pscl3_way})'.format(**ptw)
+    if "pscl2_set" in ptw or "pscl2_way" in ptw:
+        yield '.add_pscl(2, {pscl2_set}, {pscl2_way})'.format(**ptw)
+    if "mshr_size" in ptw:
+        yield '.mshr_size({mshr_size})'.format(**ptw)
+    if "max_read" in ptw:
+        yield '.tag_bandwidth({max_read})'.format(**ptw)
+    if "max_write" in ptw:
+        yield '.fill_bandwidth({max_write})'.format(**ptw)
+
+    yield '.upper_levels({{{}}})'.format(vector_string(upper_levels))
+    yield '.lower_level({})'.format(lower_level)
+
+# With plug-ins, the modules are loaded by their names when the element is built, rather than compiled into the build.
+# The modules given by the defaults are cleared, since they are not compiled in.
+def get_plugin_builder_lines(elem, kinds):
+    for kind, key in kinds:
+        yield '.{}<0>()'.format(kind)
+        if elem.get(key):
+            yield '.{}_plugins({{{}}})'.format(kind, vector_string('plugins.{}({})'.format(kind, quoted(k['name'])) for k in elem[key]))
+
+def get_cache_builder_lines(elem, name, upper_levels, lower_level, lower_translate=None, plugins=False):
+    yield '.name({})'.format(name)
+
+    local_cache_builder_parts = {
+        ('prefetch_as_load', True): '.set_prefetch_as_load()',
+        ('prefetch_as_load', False): '.reset_prefetch_as_load()',
+        ('wq_check_full_addr', True): '.set_wq_checks_full_addr()',
+        ('wq_check_full_addr', False): '.reset_wq_checks_full_addr()',
+        ('virtual_prefetch', True): '.set_virtual_prefetch()',
+        ('virtual_prefetch', False): '.reset_virtual_prefetch()'
+    }
+
+    yield from (v.format(**elem) for k,v in cache_builder_parts.items() if k in elem)
+    yield from (v.format(**elem) for k,v in local_cache_builder_parts.items() if k[0] in elem and k[1] == elem[k[0]])
+
+    # Create prefetch activation masks
+    if 'prefetch_activate' in elem:
+        yield '.prefetch_activate({})'.format(', '.join('access_type::'+t for t in elem['prefetch_activate']))
+
+    if plugins:
+        yield from get_plugin_builder_lines(elem, (('replacement', '_replacement_data'), ('prefetcher', '_prefetcher_data')))
+    else:
         if elem.get('_replacement_data'):
             yield '.replacement<{}>()'.format(' | '.join('CACHE::r{}'.format(k['name']) for k in elem['_replacement_data']))
 
         if elem.get('_prefetcher_data'):
             yield '.prefetcher<{}>()'.format(' | '.join('CACHE::p{}'.format(k['name']) for k in elem['_prefetcher_data']))
 
-        yield '.upper_levels({{{}}})'.format(vector_string('&{}_to_{}_queues'.format(ul, elem['name']) for ul in upper_levels[elem['name']]['uppers']))
-        yield '.lower_level({})'.format('&{}_to_{}_queues'.format(elem['name'], elem['lower_level']))
+    yield '.upper_levels({{{}}})'.format(vector_string(upper_levels))
+    yield '.lower_level({})'.format(lower_level)
 
-        if 'lower_translate' in elem:
-            yield '.lower_translate({})'.format('&{}_to_{}_queues'.format(elem['name'], elem['lower_translate']))
+    if lower_translate is not None:
+        yield '.lower_translate({})'.format(lower_translate)
 
-        yield '};'
-        yield ''
+# The first level caches are given as the caches themselves, rather than pointers
+def get_core_builder_lines(cpu, index, l1i, l1d, fetch_queues, data_queues, plugins=False):
+    yield '.index({})'.format(index)
+    yield '.frequency({frequency})'.format(**cpu)
+    yield '.l1i(&{})'.format(l1i)
+    yield '.l1i_bandwidth({}.MAX_TAG)'.format(l1i)
+    yield '.l1d_bandwidth({}.MAX_TAG)'.format(l1d)
 
-    for cpu in cores:
-        yield 'O3_CPU {}{{O3_CPU::Builder{{ champsim::defaults::default_core }}'.format(cpu['name'])
-
-        yield '.index({_index})'.format(**cpu)
-        yield '.frequency({frequency})'.format(**cpu)
-        yield '.l1i(&{L1I})'.format(**cpu)
-        yield '.l1i_bandwidth({L1I}.MAX_TAG)'.format(**cpu)
-        yield '.l1d_bandwidth({L1D}.MAX_TAG)'.format(**cpu)
-
-        yield from (v.format(**cpu) for k,v in core_builder_parts.items() if k in cpu)
-        yield from (v.format(**cpu['DIB']) for k,v in dib_builder_parts.items() if k in cpu)
+    yield from (v.format(**cpu) for k,v in core_builder_parts.items() if k in cpu)
+    yield from (v.format(**cpu['DIB']) for k,v in dib_builder_parts.items() if k in cpu)
 
+    if plugins:
+        yield from get_plugin_builder_lines(cpu, (('branch_predictor', '_branch_predictor_data'), ('btb', '_btb_data')))
+    else:
         if cpu.get('_branch_predictor_data'):
             yield '.branch_predictor<{}>()'.format(' | '.join('O3_CPU::b{}'.format(k['name']) for k in cpu['_branch_predictor_data']))
         if cpu.get('_btb_data'):
             yield '.btb<{}>()'.format(' | '.join('O3_CPU::t{}'.format(k['name']) for k in cpu['_btb_data']))
 
-        yield '.fetch_queues({})'.format('&{}_to_{}_queues'.format(cpu['name'], cpu['L1I']))
-        yield '.data_queues({})'.format('&{}_to_{}_queues'.format(cpu['name'], cpu['L1D']))
+    yield '.fetch_queues({})'.format(fetch_queues)
+    yield '.data_queues({})'.format(data_queues)
 
-        yield '};'
+def get_environment_begin_lines(runtime_parameters, includes=(), plugins=None):
+    yield '#include "environment.h"'
+    yield '#include "defaults.hpp"'
+    yield '#include "vmem.h"'
+    if plugins is not None:
+        yield '#include "module_plugin.h"'
+    yield from ('#include <{}>'.format(i) for i in includes)
+    if runtime_parameters:
+        yield '#include <nlohmann/json.hpp>'
+        yield '#define CHAMPSIM_RUNTIME_PARAMETERS'
+    yield 'namespace champsim::configured {'
+    yield 'struct generated_environment final : public champsim::environment {'
+    yield ''
+
+    # The parameters are declared first, so that they are initialized before the elements that read them
+    if runtime_parameters:
+        yield 'const nlohmann::json parameters;'
+        yield 'explicit generated_environment(nlohmann::json parameters_) : parameters(std::move(parameters_)) {}'
         yield ''
 
+    # The loader is declared before the elements, which load their modules from it as they are built
+    if plugins is not None:
+        yield 'champsim::plugin::loader plugins{{'
+        yield from ('  {{{}, {}}},'.format(quoted(name), quoted(path)) for name, path in sorted(plugins.items()))
+        yield '}};'
+        yield ''
+
+# The views list the elements in the order of the configuration, which is the order in which they are operated and printed.
+# The reference gives the expression for the element of each name.
+def get_environment_end_lines(cores, caches, ptws, pmem, reference=lambda name: name):
     yield ''
     yield 'std::vector<std::reference_wrapper<O3_CPU>> cpu_view() override {'
     yield '  return {'
-    yield '    ' + ', '.join('std::ref({name})'.format(**elem) for elem in cores)
+    yield '    ' + ', '.join('std::ref({})'.format(reference(elem['name'])) for elem in cores)
     yield '  };'
     yield '}'
     yield ''
 
     yield 'std::vector<std::reference_wrapper<CACHE>> cache_view() override {'
     yield '  return {'
-    yield '    ' + ', '.join('{name}'.format(**elem) for elem in caches)
+    yield '    ' + ', '.join(reference(elem['name']) for elem in caches)
     yield '  };'
     yield '}'
     yield ''
 
     yield 'std::vector<std::reference_wrapper<PageTableWalker>> ptw_view() override {'
     yield '  return {'
-    yield '    ' + ', '.join('{name}'.format(**elem) for elem in ptws)
+    yield '    ' + ', '.join(reference(elem['name']) for elem in ptws)
     yield '  };'
     yield '}'
     yield ''
@@ -233,12 +309,257 @@ def get_instantiation_lines(cores, caches, ptws, pmem, vmem):
     yield 'MEMORY_CONTROLLER& dram_view() override {{ return {}; }}'.format(pmem['name'])
     yield ''
 
+    yield 'VirtualMemory& vmem_view() override { return vmem; }'
+    yield ''
+
     yield 'std::vector<std::reference_wrapper<champsim::operable>> operable_view() override {'
     yield '  return {'
-    yield '    ' + ', '.join('{name}'.format(**elem) for elem in itertools.chain(cores, ptws, caches, (pmem,)))
+    yield '    ' + ', '.join(reference(elem['name']) for elem in itertools.chain(cores, ptws, caches, (pmem,)))
     yield '  };'
     yield '}'
     yield ''
 
     yield '};'
     yield '}'
+
+# Each core's private elements, in the order they are reached from the core. Elements reached from more than one core are shared.
+def get_private_names(cores, elements_by_name):
+    reached = []
+    for cpu in cores:
+        order = []
+        stack = list(reversed(get_lower_names(cpu)))
+        while stack:
+            name = stack.pop()
+            if name not in order and name in elements_by_name:
+                order.append(name)
+                stack.extend(reversed(get_lower_names(elements_by_name[name])))
+        reached.append(order)
+
+    counts = collections.Counter(itertools.chain(*reached))
+    return [[n for n in order if counts[n] == 1] for order in reached]
+
+# The element with the names of a core's elements replaced by their roles, and without the values that identify the core.
+# With runtime parameters, the values that are read at run time may differ between cores.
+def get_canonical_element(elem, kind, roles, runtime_parameters):
+    def canonical(val):
+        if isinstance(val, str):
+            return roles.get(val, val)
+        if isinstance(val, dict):
+            return {k: canonical(v) for k,v in val.items()}
+        if isinstance(val, (list, tuple)):
+            return [canonical(v) for v in val]
+        return val
+
+    retval = {k: canonical(v) for k,v in elem.items() if k not in ('name', '_index', 'cpu')}
+    if runtime_parameters:
+        retval.update({k: None for k in runtime_values(elem, kind)})
+    return kind, retval
+
+# If every core has a private hierarchy that is the same as the first core's, return the names of each core's private elements, in the same order for each core.
+# The cores are in the order of their indices. Otherwise, return None.
+def get_per_cpu_names(cores, caches, ptws, pmem, runtime_parameters=False):
+    if len(cores) < 2:
+        return None
+
+    kinds = {**{c['name']: 'caches' for c in caches}, **{p['name']: 'ptws' for p in ptws}}
+    elements_by_name = {e['name']: e for e in itertools.chain(caches, ptws, (pmem,))}
+    cores = sorted(cores, key=operator.itemgetter('_index'))
+    private_names = get_private_names(cores, elements_by_name)
+
+    canonical_hierarchies = []
+    for i, (cpu, names) in enumerate(zip(cores, private_names)):
+        if cpu['_index'] != i or any(n not in kinds or elements_by_name[n].get('cpu', i) != i for n in names):
+            return None
+        roles = {cpu['name']: '@cpu', **{n: '@{}'.format(k) for k,n in enumerate(names)}}
+        canonical_hierarchies.append([get_canonical_element(cpu, 'cores', roles, runtime_parameters), *(get_canonical_element(elements_by_name[n], kinds[n], roles, runtime_parameters) for n in names)])
+
+    if any(h != canonical_hierarchies[0] for h in canonical_hierarchies):
+        return None
+    return private_names
+
+# The arrays of per-core elements are named by the part of the first core's element names that follows the core's name, if that is the same for every core
+def get_per_cpu_labels(cores, per_cpu_names, shared_names):
+    labels = {}
+    for k, names in enumerate(zip(*per_cpu_names)):
+        suffixes = {n[len(cpu['name']):] if n.startswith(cpu['name']) else None for cpu, n in zip(cores, names)}
+        suffix = suffixes.pop() if len(suffixes) == 1 else None
+        labels[names[0]] = suffix.lstrip('_') if suffix and suffix.lstrip('_').isidentifier() else str(k)
+    if len(set(labels.values())) < len(labels) or any(l in shared_names or l == 'core' for l in labels.values()):
+        labels = {n: str(k) for k,n in enumerate(per_cpu_names[0])}
+    return {cores[0]['name']: 'core', **labels}
+
+def get_unrolled_lines(cores, caches, ptws, pmem, vmem, plugins=False):
+    upper_levels = get_upper_levels(cores, caches, ptws, pmem)
+
+    for ll,v in upper_levels.items():
+        for ul in v['uppers']:
+            yield queue_fmtstr.format(name='{}_to_{}_queues'.format(ul, ll), **v)
+    yield ''
+
+    yield pmem_fmtstr.format(
+            _ulptr=vector_string('&{}_to_{}_queues'.format(ul, pmem['name']) for ul in upper_levels[pmem['name']]['uppers']),
+            **pmem)
+    yield vmem_fmtstr.format(dram_name=pmem['name'], **vmem)
+
+    for ptw in ptws:
+        yield 'PageTableWalker {name}{{PageTableWalker::Builder{{champsim::defaults::default_ptw}}'.format(**ptw)
+        yield from get_ptw_builder_lines(ptw, quoted(ptw['name']), ptw['cpu'],
+                ('&{}_to_{}_queues'.format(ul, ptw['name']) for ul in upper_levels[ptw['name']]['uppers']),
+                '&{}_to_{}_queues'.format(ptw['name'], ptw['lower_level']))
+        yield '};'
+        yield ''
+
+    for elem in caches:
+        yield 'CACHE {}{{CACHE::Builder{{ {} }}'.format(elem['name'], elem.get('_defaults', ''))
+        yield from get_cache_builder_lines(elem, quoted(elem['name']),
+                ('&{}_to_{}_queues'.format(ul, elem['name']) for ul in upper_levels[elem['name']]['uppers']),
+                '&{}_to_{}_queues'.format(elem['name'], elem['lower_level']),
+                '&{}_to_{}_queues'.format(elem['name'], elem['lower_translate']) if 'lower_translate' in elem else None,
+                plugins)
+        yield '};'
+        yield ''
+
+    for cpu in cores:
+        yield 'O3_CPU {}{{O3_CPU::Builder{{ champsim::defaults::default_core }}'.format(cpu['name'])
+        yield from get_core_builder_lines(cpu, cpu['_index'], cpu['L1I'], cpu['L1D'],
+                '&{}_to_{}_queues'.format(cpu['name'], cpu['L1I']),
+                '&{}_to_{}_queues'.format(cpu['name'], cpu['L1D']),
+                plugins)
+        yield '};'
+        yield ''
+
+# Cores with identical private hierarchies are built in loops, into arrays of elements with one for each core.
+# The code is then the same size no matter how many cores there are, other than the lists of the elements.
+# Each core's elements are in a deque, which does not move its elements as it grows, so that they may refer to each other.
+def get_per_cpu_lines(cores, caches, ptws, pmem, vmem, per_cpu_names, runtime_parameters, plugins=False):
+    kinds = {**{c['name']: 'caches' for c in caches}, **{p['name']: 'ptws' for p in ptws}, **{c['name']: 'cores' for c in cores}}
+    indexed_cores = sorted(cores, key=operator.itemgetter('_index'))
+    shared_names = [e['name'] for e in itertools.chain(caches, ptws, (pmem,)) if not any(e['name'] in names for names in per_cpu_names)]
+    labels = get_per_cpu_labels(indexed_cores, per_cpu_names, shared_names)
+
+    # The name of the first core's element in the same role as each element, and the index of its core
+    where = {n: (n, None) for n in shared_names}
+    for i, (cpu, names) in enumerate(zip(indexed_cores, per_cpu_names)):
+        where.update({cpu['name']: (indexed_cores[0]['name'], i), **{n: (t, i) for n,t in zip(names, per_cpu_names[0])}})
+
+    def member(name):
+        return 'per_cpu_' + labels[name]
+
+    def names_member(name):
+        return member(name) + '_names'
+
+    def queue_member(ul, ll):
+        return 'per_cpu_{}_to_{}_queues'.format(labels[ul], labels.get(ll, ll))
+
+    # Elements and queues of the first core stand for those of the core with the given index
+    def element(name, index=None):
+        template, i = where[name]
+        return name if i is None else '{}[{}]'.format(member(template), i if index is None else index)
+
+    def queue(ul, ll, index=None):
+        template_ul, i = where[ul]
+        template_ll, _ = where[ll]
+        return '&{}_to_{}_queues'.format(ul, ll) if i is None else '&{}[{}]'.format(queue_member(template_ul, template_ll), i if index is None else index)
+
+    def render(elem, kind, name):
+        return refer_parameters(elem, kind, *((name,) if name is not None else ())) if runtime_parameters else elem
+
+    templates = {indexed_cores[0]['name']: indexed_cores[0], **{e['name']: e for e in itertools.chain(caches, ptws) if e['name'] in per_cpu_names[0]}}
+    rendered = {
+        **{n: render(e, kinds[n], names_member(n) + '[i]') for n,e in templates.items()},
+        **{e['name']: render(e, kinds[e['name']], quoted(e['name'])) for e in itertools.chain(caches, ptws) if e['name'] in shared_names}
+    }
+    rendered_pmem = render(pmem, 'pmem', None)
+    rendered_vmem = render(vmem, 'vmem', None)
+    upper_levels = get_upper_levels(cores, [rendered.get(c['name'], c) for c in caches], [rendered.get(p['name'], p) for p in ptws], rendered_pmem)
+
+    yield 'static constexpr std::size_t num_per_cpu = {};'.format(len(cores))
+    for name in templates:
+        yield 'static constexpr std::array<const char*, num_per_cpu> {}{{{{{}}}}};'.format(names_member(name), ', '.join(quoted(n) for n in itertools.chain([c['name'] for c in indexed_cores] if name == indexed_cores[0]['name'] else (names[per_cpu_names[0].index(name)] for names in per_cpu_names))))
+    yield ''
+    yield 'template <typename T, typename F>'
+    yield 'static std::deque<T> make_per_cpu(F&& make)'
+    yield '{'
+    yield '  std::deque<T> elems;'
+    yield '  for (std::size_t i = 0; i < num_per_cpu; ++i)'
+    yield '    elems.emplace_back(make(i));'
+    yield '  return elems;'
+    yield '}'
+    yield ''
+
+    for ll,v in upper_levels.items():
+        for ul in v['uppers']:
+            template_ul, i = where[ul]
+            if i is None:
+                yield queue_fmtstr.format(name='{}_to_{}_queues'.format(ul, ll), **v)
+            elif i == 0:
+                queue_args = queue_args_fmtstr.format(**v)
+                yield 'std::deque<champsim::channel> {} = make_per_cpu<champsim::channel>([&](std::size_t{}) {{ return champsim::channel{}; }});'.format(queue_member(ul, ll), ' i' if '[i]' in queue_args else '', queue_args)
+    yield ''
+
+    yield pmem_fmtstr.format(_ulptr=vector_string(queue(ul, pmem['name']) for ul in upper_levels[pmem['name']]['uppers']), **rendered_pmem)
+    yield vmem_fmtstr.format(dram_name=pmem['name'], **rendered_vmem)
+    yield ''
+
+    for ptw in ptws:
+        if ptw['name'] in shared_names:
+            yield 'PageTableWalker {name}{{PageTableWalker::Builder{{champsim::defaults::default_ptw}}'.format(**ptw)
+            yield from get_ptw_builder_lines(rendered[ptw['name']], quoted(ptw['name']), ptw['cpu'], (queue(ul, ptw['name']) for ul in upper_levels[ptw['name']]['uppers']), queue(ptw['name'], ptw['lower_level']))
+            yield '};'
+            yield ''
+        elif ptw['name'] in templates:
+            yield 'std::deque<PageTableWalker> {} = make_per_cpu<PageTableWalker>([&](std::size_t i) {{'.format(member(ptw['name']))
+            yield 'return PageTableWalker::Builder{champsim::defaults::default_ptw}'
+            yield from get_ptw_builder_lines(rendered[ptw['name']], names_member(ptw['name']) + '[i]', 'i', (queue(ul, ptw['name'], 'i') for ul in upper_levels[ptw['name']]['uppers']), queue(ptw['name'], ptw['lower_level'], 'i'))
+            yield ';'
+            yield '});'
+            yield ''
+
+    for elem in caches:
+        lower_translate = elem.get('lower_translate')
+        if elem['name'] in shared_names:
+            yield 'CACHE {}{{CACHE::Builder{{ {} }}'.format(elem['name'], elem.get('_defaults', ''))
+            yield from get_cache_builder_lines(rendered[elem['name']], quoted(elem['name']),
+                    (queue(ul, elem['name']) for ul in upper_levels[elem['name']]['uppers']),
+                    queue(elem['name'], elem['lower_level']),
+                    queue(elem['name'], lower_translate) if lower_translate is not None else None,
+                    plugins)
+            yield '};'
+            yield ''
+        elif elem['name'] in templates:
+            yield 'std::deque<CACHE> {} = make_per_cpu<CACHE>([&](std::size_t i) {{'.format(member(elem['name']))
+            yield 'return CACHE::Builder{{ {} }}'.format(elem.get('_defaults', ''))
+            yield from get_cache_builder_lines(rendered[elem['name']], names_member(elem['name']) + '[i]',
+                    (queue(ul, elem['name'], 'i') for ul in upper_levels[elem['name']]['uppers']),
+                    queue(elem['name'], elem['lower_level'], 'i'),
+                    queue(elem['name'], lower_translate, 'i') if lower_translate is not None else None,
+                    plugins)
+            yield ';'
+            yield '});'
+            yield ''
+
+    cpu = indexed_cores[0]
+    yield 'std::deque<O3_CPU> {} = make_per_cpu<O3_CPU>([&](std::size_t i) {{'.format(member(cpu['name']))
+    yield 'return O3_CPU::Builder{ champsim::defaults::default_core }'
+    yield from get_core_builder_lines(rendered[cpu['name']], 'i', element(cpu['L1I'], 'i'), element(cpu['L1D'], 'i'), queue(cpu['name'], cpu['L1I'], 'i'), queue(cpu['name'], cpu['L1D'], 'i'), plugins)
+    yield ';'
+    yield '});'
+    yield ''
+
+    yield from get_environment_end_lines(cores, caches, ptws, pmem, element)
+
+# With runtime parameters, the environment is constructed from the contents of a parameters file, and the elements are built with the values it holds.
+# With plug-ins, the paths of the plug-ins are given by the names of their modules.
+def get_instantiation_lines(cores, caches, ptws, pmem, vmem, runtime_parameters=False, plugins=None):
+    per_cpu_names = get_per_cpu_names(cores, caches, ptws, pmem, runtime_parameters)
+    if per_cpu_names is not None:
+        yield from get_environment_begin_lines(runtime_parameters, includes=('array', 'deque'), plugins=plugins)
+        yield from get_per_cpu_lines(cores, caches, ptws, pmem, vmem, per_cpu_names, runtime_parameters, plugins is not None)
+        return
+
+    if runtime_parameters:
+        cores, caches, ptws, pmem, vmem = operator.itemgetter('cores', 'caches', 'ptws', 'pmem', 'vmem')(get_parameter_references(cores, caches, ptws, pmem, vmem))
+
+    yield from get_environment_begin_lines(runtime_parameters, plugins=plugins)
+    yield from get_unrolled_lines(cores, caches, ptws, pmem, vmem, plugins is not None)
+    yield from get_environment_end_lines(cores, caches, ptws, pmem)
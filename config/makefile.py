@@ -14,34 +14,45 @@
 
 import itertools, operator
 import os
+import shlex
 
 from . import util
 
 def dereference(var):
     return '$(' + var + ')'
 
+# The variable that holds every object file in the build
+def all_objs_varname(build_id):
+    return build_id + '_all_objs'
+
+# The variable that holds the object files of a shared unit
+def shared_objs_varname(key):
+    return key + '_objs'
+
 def dependency(target, *dependent, order=None):
     if order is None:
         return '{}: {}'.format(target, ' '.join(dependent))
     else:
         return '{}: {} | {}'.format(target, ' '.join(dependent), order)
 
-def assign_variable(var, val, target=None):
-    retval = '{} = {}'.format(var, val)
+# Private target-specific variables are not inherited by the target's prerequisites
+def assign_variable(var, val, target=None, private=False):
+    retval = '{}{} = {}'.format('private ' if private else '', var, val)
     if target is not None:
         retval = dependency(target, retval)
     return retval
 
-def append_variable(var, *val, targets=[]):
-    retval = '{} += {}'.format(var, ' '.join(val))
+def append_variable(var, *val, targets=[], private=False):
+    retval = '{}{} += {}'.format('private ' if private else '', var, ' '.join(val))
     if targets:
         retval = dependency(' '.join(targets), retval)
     return retval
 
+# Values may be a single string or a sequence of strings
 def each_in_dict_list(d):
-    yield from itertools.chain(*(zip(itertools.repeat(kv[0]), kv[1]) for kv in d.items()))
+    yield from itertools.chain(*(zip(itertools.repeat(kv[0]), [kv[1]] if isinstance(kv[1], str) else kv[1]) for kv in d.items()))
 
-def make_part(src_dirs, dest_dir, build_id):
+def make_part(src_dirs, dest_dir, build_id, exclude={}):
     dir_varnames = []
     obj_varnames = []
 
@@ -66,7 +77,10 @@ def make_part(src_dirs, dest_dir, build_id):
 
         # Definee variables
         yield assign_variable(local_dir_varname, dest_dir)
-        yield assign_variable(local_obj_varname, '$(patsubst {src_dir}/%.cc, {dest_dir}/%.o, $(wildcard {src_dir}/*.cc))'.format(dest_dir=rel_dest_dir, src_dir=rel_src_dir))
+        sources = '$(wildcard {src_dir}/*.cc)'.format(src_dir=rel_src_dir)
+        if exclude.get(os.path.abspath(base)):
+            sources = '$(filter-out {}, {})'.format(' '.join(os.path.join(os.path.abspath(base), s + '.cc') for s in exclude[os.path.abspath(base)]), sources)
+        yield assign_variable(local_obj_varname, '$(patsubst {src_dir}/%.cc, {dest_dir}/%.o, {sources})'.format(dest_dir=rel_dest_dir, src_dir=rel_src_dir, sources=sources))
 
         # Set flags
         yield from (append_variable(*kv, targets=[dereference(local_obj_varname)]) for kv in each_in_dict_list(local_opts))
@@ -81,7 +95,7 @@ def make_part(src_dirs, dest_dir, build_id):
 
     return dir_varnames, obj_varnames
 
-def executable_opts(obj_root, build_id, executable, source_dirs):
+def build_opts(obj_root, build_id, source_dirs, exclude={}):
     dest_dir = os.path.join(obj_root, build_id)
 
     # Add compiler flags
@@ -89,28 +103,151 @@ def executable_opts(obj_root, build_id, executable, source_dirs):
 
     yield '######'
     yield '# Build ID: ' + build_id
-    yield '# Executable: ' + executable
     yield '######'
     yield ''
 
-    dir_varnames, obj_varnames = yield from make_part(source_dirs, os.path.join(dest_dir, 'obj'), build_id)
-    yield dependency(executable, *map(dereference, obj_varnames), order=os.path.split(executable)[0])
+    dir_varnames, obj_varnames = yield from make_part(source_dirs, os.path.join(dest_dir, 'obj'), build_id, exclude)
 
     yield from (append_variable(*kv, targets=[dereference(x) for x in obj_varnames]) for kv in each_in_dict_list(local_opts))
-    yield append_variable('build_dirs', *map(dereference, dir_varnames), os.path.split(executable)[0])
+    yield append_variable('build_dirs', *map(dereference, dir_varnames))
     yield append_variable('build_objs', *map(dereference, obj_varnames))
-    yield append_variable('executable_name', executable)
     yield ''
 
     return dir_varnames, obj_varnames
 
-def module_opts(obj_dir, build_id, module_name, source_dirs, opts):
+# Objects whose generated dependencies are identical in every build that uses them.
+# The key identifies the contents of the generated headers and the flags, so these objects are compiled once and linked into each build.
+# A precompiled header, if given, is force-included before any other header.
+# A profile, if given, names the directory that holds the profile data, the name of each object's data, and the target that produces it, if any.
+# Since the header and the profile are prerequisites of the objects, their flags are made private so that those are not built with them.
+def shared_opts(obj_root, key, src_dir, base_dir, sources, config_file, has_headers=True, module_name=None, opts={}, pch=None, profile=None):
+    dest_dir = os.path.join(obj_root, key)
+    obj_dir = os.path.normpath(os.path.join(dest_dir, 'obj', os.path.relpath(base_dir, src_dir)))
+    dir_varname = key + '_dirs'
+    obj_varname = shared_objs_varname(key)
+
+    source_opts = {'CPPFLAGS': ('-I'+os.path.abspath(src_dir),)}
+    local_opts = {'CPPFLAGS': (
+        *(('-I'+os.path.join(dest_dir, 'inc'),) if has_headers else ()),
+        *(('-Winvalid-pch', '-I'+os.path.dirname(pch), '-include '+os.path.basename(pch)) if pch is not None else ()),
+        *(('-include {}.inc'.format(module_name),) if module_name is not None else ())
+    )}
+
+    yield '######'
+    yield '# Shared objects: ' + key
+    if module_name is not None:
+        yield '# Module: ' + module_name
+    yield '# Source: ' + os.path.abspath(base_dir)
+    yield '# Destination: ' + obj_dir
+    yield '######'
+    yield ''
+
+    yield assign_variable(dir_varname, obj_dir)
+    yield assign_variable(obj_varname, ' '.join(os.path.join(obj_dir, s + '.o') for s in sources))
+
+    private = pch is not None or profile is not None
+    yield from (append_variable(*kv, targets=[dereference(obj_varname)], private=private) for kv in each_in_dict_list(source_opts))
+    yield from (append_variable(*kv, targets=[dereference(obj_varname)], private=private) for kv in each_in_dict_list(opts))
+    yield from (append_variable(*kv, targets=[dereference(obj_varname)], private=private) for kv in each_in_dict_list(local_opts))
+    yield from (assign_variable(*kv, target=dereference(obj_varname), private=private) for kv in util.subdict(config_file, ('CXX',)).items())
+    yield from (append_variable(*kv, targets=[dereference(obj_varname)], private=private) for kv in each_in_dict_list(util.subdict(config_file, ('CPPFLAGS', 'CXXFLAGS'))))
+
+    yield dependency(dereference(obj_varname), dependency(os.path.join(obj_dir, '%.o'), os.path.join(os.path.abspath(base_dir), '%.cc')), order=obj_dir)
+    if pch is not None:
+        yield dependency(dereference(obj_varname), pch + '.gch')
+    if profile is not None:
+        yield from (append_variable('CXXFLAGS', '-dumpdir', profile['dir']+os.sep, '-dumpbase', name, targets=[os.path.join(obj_dir, s + '.o')], private=True) for s, name in zip(sources, profile['names']))
+    if profile is not None and profile['stamp'] is not None:
+        yield dependency(dereference(obj_varname), profile['stamp'])
+    yield '-include $(wildcard {})'.format(os.path.join(obj_dir, '*.d'))
+    if module_name is None:
+        yield append_variable('build_dirs', dereference(dir_varname))
+        yield append_variable('build_objs', dereference(obj_varname))
+    else:
+        yield append_variable('module_dirs', dereference(dir_varname))
+        yield append_variable('module_objs', dereference(obj_varname))
+    yield ''
+
+# A precompiled header is compiled with the same flags as the objects that use it
+def pch_opts(obj_root, key, header, config_file, has_headers=True, opts={}):
+    dest_dir = os.path.join(obj_root, key)
+    pch_varname = key + '_pch'
+
+    local_opts = {'CPPFLAGS': ('-I'+os.path.join(dest_dir, 'inc'),) if has_headers else ()}
+
+    yield '######'
+    yield '# Precompiled header: ' + key
+    yield '# Destination: ' + header + '.gch'
+    yield '######'
+    yield ''
+
+    yield assign_variable(pch_varname, header + '.gch')
+
+    yield from (append_variable(*kv, targets=[dereference(pch_varname)]) for kv in each_in_dict_list(opts))
+    yield from (append_variable(*kv, targets=[dereference(pch_varname)]) for kv in each_in_dict_list(local_opts))
+    yield from (assign_variable(*kv, target=dereference(pch_varname)) for kv in util.subdict(config_file, ('CXX',)).items())
+    yield from (append_variable(*kv, targets=[dereference(pch_varname)]) for kv in each_in_dict_list(util.subdict(config_file, ('CPPFLAGS', 'CXXFLAGS'))))
+
+    yield dependency(dereference(pch_varname), header)
+    yield '-include $(wildcard {})'.format(os.path.join(os.path.dirname(header), '*.d'))
+    yield append_variable('pch_files', dereference(pch_varname))
+    yield ''
+
+# The instrumented executable is linked from the given objects and run to produce the profile data.
+# The profile is marked as complete by the stamp file, which the optimized objects depend on.
+def profile_opts(profile_id, stamp, executable, command, objects, config_file):
+    yield '######'
+    yield '# Profile: ' + profile_id
+    yield '# Executable: ' + executable
+    yield '######'
+    yield ''
+
+    yield dependency(executable, *objects, order=os.path.split(executable)[0])
+    yield from (append_variable(*kv, targets=[executable]) for kv in each_in_dict_list(util.subdict(config_file, ('LDFLAGS', 'LDLIBS'))))
+    yield append_variable('build_dirs', os.path.split(executable)[0])
+    yield append_variable('pgo_executables', executable)
+
+    yield dependency(stamp, executable)
+    yield assign_variable('pgo_command', command, target=stamp)
+    yield append_variable('pgo_profiles', stamp)
+    yield ''
+
+# The plug-ins are order-only prerequisites, so they are built with the executable but do not cause it to be relinked
+def executable_opts(build_id, executable, config_file={}, plugins=()):
+    yield '######'
+    yield '# Build ID: ' + build_id
+    yield '# Executable: ' + executable
+    yield '######'
+    yield ''
+
+    yield dependency(executable, dereference(all_objs_varname(build_id)), order=' '.join((os.path.split(executable)[0], *plugins)))
+    yield from (append_variable(*kv, targets=[executable]) for kv in each_in_dict_list(util.subdict(config_file, ('LDFLAGS', 'LDLIBS'))))
+    yield assign_variable('telemetry_build_id', build_id, target=executable, private=True)
+    yield append_variable('build_dirs', os.path.split(executable)[0])
+    yield append_variable('executable_name', executable)
+    yield ''
+
+# A plug-in is a shared object linked from the objects of one module and the entry point for its kind
+def plugin_opts(key, library, objects, config_file={}):
+    yield '######'
+    yield '# Plug-in: ' + key
+    yield '# Library: ' + library
+    yield '######'
+    yield ''
+
+    yield dependency(library, *objects, order=os.path.split(library)[0])
+    yield from (append_variable(*kv, targets=[library]) for kv in each_in_dict_list(util.subdict(config_file, ('LDFLAGS', 'LDLIBS'))))
+    yield append_variable('build_dirs', os.path.split(library)[0])
+    yield append_variable('plugin_libraries', library)
+    yield ''
+
+def module_opts(obj_dir, build_id, module_name, source_dirs, opts, exclude={}):
     build_dir = os.path.join(obj_dir, build_id)
     dest_dir = os.path.join(build_dir, module_name)
 
     local_opts = {'CPPFLAGS': ('-I'+os.path.join(build_dir, 'inc'), '-include {}.inc'.format(module_name))}
 
-    dir_varnames, obj_varnames = yield from make_part(source_dirs, dest_dir, build_id+'_'+module_name)
+    dir_varnames, obj_varnames = yield from make_part(source_dirs, dest_dir, build_id+'_'+module_name, exclude)
     yield from (append_variable(*kv, targets=[dereference(x) for x in obj_varnames]) for kv in each_in_dict_list(opts))
     yield from (append_variable(*kv, targets=[dereference(x) for x in obj_varnames]) for kv in each_in_dict_list(local_opts))
     yield append_variable('module_dirs', *map(dereference, dir_varnames))
@@ -119,20 +256,64 @@ def module_opts(obj_dir, build_id, module_name, source_dirs, opts):
 
     return dir_varnames, obj_varnames
 
-def get_makefile_lines(objdir, build_id, executable, source_dirs, module_info, config_file):
-    executable_path = os.path.abspath(executable)
+# The log that the Makefile records compile and link times in, if telemetry is enabled
+def get_telemetry_lines(log_name):
+    yield assign_variable('telemetry_log', os.path.abspath(log_name))
+    yield ''
+
+# The prefix that configure was given, so that the test configuration may be generated with the same outputs.
+# The command is run again, in the directory it was run in, if the includes of the sources it scanned change.
+def get_configure_lines(prefix, command):
+    yield assign_variable('configured_prefix', os.path.abspath(prefix))
+    yield assign_variable('configure_command', 'cd {} && {}'.format(shlex.quote(os.getcwd()), ' '.join(map(shlex.quote, command))).replace('$', '$$'))
+    yield ''
+
+# The sources that were scanned for includes, and the file that holds the digests of their includes
+def get_configure_input_lines(digest_file, inputs):
+    yield append_variable('configure_digests', digest_file)
+    yield append_variable('configure_inputs', *inputs)
+    yield ''
+
+# Generate the rules for the objects of a build. These may be shared by many executables.
+# Sources that are compiled as part of a shared unit are excluded, and the unit's objects are linked instead.
+def get_build_lines(objdir, build_id, source_dirs, module_info, config_file, shared_units=()):
+    exclude = {}
+    for unit in shared_units:
+        exclude.setdefault(os.path.abspath(unit['base_dir']), []).extend(unit['sources'])
 
-    dir_varnames, obj_varnames = yield from executable_opts(os.path.abspath(objdir), build_id, executable_path, source_dirs)
+    dir_varnames, obj_varnames = yield from build_opts(os.path.abspath(objdir), build_id, source_dirs, exclude)
     for k,v in module_info.items():
-        module_dir_varnames, module_obj_varnames = yield from module_opts(os.path.abspath(objdir), build_id, k, (v['fname'],), v['opts'])
-        yield dependency(executable_path, *map(dereference, module_obj_varnames))
+        module_dir_varnames, module_obj_varnames = yield from module_opts(os.path.abspath(objdir), build_id, k, (v['fname'],), v['opts'], exclude)
         dir_varnames.extend(module_dir_varnames)
         obj_varnames.extend(module_obj_varnames)
 
     global_overrides = util.subdict(config_file, ('CXX',))
-    yield from (assign_variable(*kv, targets=[dereference(x) for x in dir_varnames]) for kv in global_overrides.items())
+    yield from (assign_variable(*kv, target=' '.join(map(dereference, obj_varnames))) for kv in global_overrides.items())
 
     global_opts = util.subdict(config_file, ('CPPFLAGS', 'CXXFLAGS', 'LDFLAGS', 'LDLIBS'))
     yield from (append_variable(*kv, targets=[dereference(x) for x in obj_varnames]) for kv in each_in_dict_list(global_opts))
+    yield assign_variable(all_objs_varname(build_id), ' '.join(map(dereference, (*obj_varnames, *(shared_objs_varname(u['key']) for u in shared_units)))))
+    yield ''
+
+# Generate the rules to link an executable from the objects of a build
+def get_executable_lines(build_id, executable, config_file={}, plugins=()):
+    yield from executable_opts(build_id, os.path.abspath(executable), config_file, plugins)
+
+# An executable that shares the binary of its build is a link to it
+def get_linked_executable_lines(build_id, executable, binary):
+    yield '######'
+    yield '# Build ID: ' + build_id
+    yield '# Executable: ' + executable
+    yield '# Binary: ' + binary
+    yield '######'
+    yield ''
+
+    yield dependency(executable, binary, order=os.path.split(executable)[0])
+    yield append_variable('build_dirs', os.path.split(executable)[0])
+    yield append_variable('executable_name', executable)
+    yield append_variable('linked_executables', executable)
     yield ''
 
+def get_makefile_lines(objdir, build_id, executable, source_dirs, module_info, config_file, shared_units=()):
+    yield from get_build_lines(objdir, build_id, source_dirs, module_info, config_file, shared_units)
+    yield from get_executable_lines(build_id, executable, config_file)
@@ -14,6 +14,7 @@
 
 import os
 import itertools
+import json
 
 from . import util
 
@@ -22,26 +23,103 @@ def get_module_name(path, start=os.path.dirname(os.path.dirname(os.path.abspath(
     fname_translation_table = str.maketrans('./-','_DH')
     return os.path.relpath(path, start=start).translate(fname_translation_table)
 
+# The contents of the module search directories, shared by all search contexts.
+# Each directory is listed at most once per process, and listings may be persisted between runs.
+# A persisted listing is reused if the directory's modification time has not changed.
+# Modules that were found are also remembered by their search paths, so that new search contexts do not search again.
+class ModuleRegistry:
+    def __init__(self, fname=None):
+        self.directories = {}
+        self.validated = set()
+        self.found = {}
+        self.dirty = False
+        if fname is not None:
+            self.load(fname)
+
+    def load(self, fname):
+        if os.path.exists(fname):
+            try:
+                with open(fname, 'rt') as rfp:
+                    self.directories = json.load(rfp)
+            except ValueError:
+                pass # Rescan everything if the registry is corrupt
+        self.validated = set()
+        self.found = {}
+
+    def save(self, fname):
+        if self.dirty:
+            os.makedirs(os.path.abspath(os.path.dirname(fname)), exist_ok=True)
+            with open(fname, 'wt') as wfp:
+                json.dump(self.directories, wfp)
+            self.dirty = False
+
+    # Forget which directories were checked and which modules were found, so that the next lookup compares modification times again
+    def invalidate(self):
+        self.validated = set()
+        self.found = {}
+
+    # Return the list of (name, is_dir) entries in the directory, or None if it is not a directory
+    def listing(self, path):
+        key = os.path.abspath(path)
+        if key not in self.validated:
+            self.validated.add(key)
+            try:
+                mtime = os.stat(key).st_mtime_ns if os.path.isdir(key) else None
+            except OSError:
+                mtime = None
+
+            if mtime is None:
+                if self.directories.pop(key, None) is not None:
+                    self.dirty = True
+            elif self.directories.get(key, {}).get('mtime_ns') != mtime:
+                with os.scandir(key) as it:
+                    self.directories[key] = {'mtime_ns': mtime, 'entries': [(e.name, e.is_dir()) for e in it]}
+                self.dirty = True
+
+        entry = self.directories.get(key)
+        return entry and entry['entries']
+
+    def isdir(self, path):
+        return self.listing(path) is not None
+
+    # Equivalent to os.path.exists(), but consults the listing if the parent is a known directory
+    def exists(self, path):
+        parent, base = os.path.split(path)
+        if base in ('', '.', '..') or os.path.abspath(parent) not in self.validated:
+            return os.path.exists(path)
+        entries = self.listing(parent)
+        return entries is not None and any(n == base for n,_ in entries)
+
+    # Equivalent to the subdirectories listed by os.walk()
+    def subdirectories(self, path):
+        return [n for n,is_dir in (self.listing(path) or []) if is_dir]
+
+default_registry = ModuleRegistry()
+
 class ModuleSearchContext:
-    def __init__(self, paths):
-        self.paths = [p for p in paths if os.path.exists(p) and os.path.isdir(p)]
+    def __init__(self, paths, registry=None):
+        self.registry = registry or default_registry
+        self.paths = [p for p in paths if self.registry.isdir(p)]
 
     def data_from_path(self, path):
         return {'name': get_module_name(path), 'fname': path, '_is_instruction_prefetcher': path.endswith('_instr')}
 
     # Try the context's module directories, then try to interpret as a path
     def find(self, module):
-        # Return a normalized directory: variables and user shorthands are expanded
-        path = os.path.relpath(os.path.expandvars(os.path.expanduser(next(filter(os.path.exists, itertools.chain(
-            (os.path.join(dirname, module) for dirname in self.paths), # Prepend search paths
-            (module,) # Interpret as file path
-        ))))))
+        key = (*self.paths, module)
+        if key not in self.registry.found:
+            # Return a normalized directory: variables and user shorthands are expanded
+            path = os.path.relpath(os.path.expandvars(os.path.expanduser(next(filter(self.registry.exists, itertools.chain(
+                (os.path.join(dirname, module) for dirname in self.paths), # Prepend search paths
+                (module,) # Interpret as file path
+            ))))))
+            self.registry.found[key] = self.data_from_path(path)
 
-        return self.data_from_path(path)
+        return dict(self.registry.found[key])
 
     def find_all(self):
-        base_dirs = [next(os.walk(p)) for p in self.paths]
-        files = itertools.starmap(os.path.join, itertools.chain(*(zip(itertools.repeat(b), d) for b,d,_ in base_dirs)))
+        base_dirs = [(p, self.registry.subdirectories(p)) for p in self.paths]
+        files = itertools.starmap(os.path.join, itertools.chain(*(zip(itertools.repeat(b), d) for b,d in base_dirs)))
         return [self.data_from_path(f) for f in files]
 
 # A unifying function for the four module types to return their information
@@ -0,0 +1,227 @@
+#    Copyright 2023 The ChampSim Contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import glob
+import os
+
+from . import telemetry
+
+champsim_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def escape_path(path):
+    return path.replace('$', '$$').replace(' ', '$ ').replace(':', '$:')
+
+def dereference(var):
+    return '${' + var + '}'
+
+# Flags may be given as a single string or as a sequence of strings
+def flag_list(val):
+    return [val] if isinstance(val, str) else list(val)
+
+def flag_string(val):
+    return ' '.join(flag_list(val))
+
+def assign_variable(var, val, indent=False):
+    return '{}{} = {}'.format('  ' if indent else '', var, val)
+
+def build(outputs, rule, inputs, implicit=(), variables={}, order_only=()):
+    line = 'build {}: {}'.format(' '.join(map(escape_path, outputs)), ' '.join((rule, *map(escape_path, inputs))))
+    if implicit:
+        line += ' | ' + ' '.join(map(escape_path, implicit))
+    if order_only:
+        line += ' || ' + ' '.join(map(escape_path, order_only))
+    yield line
+    yield from (assign_variable(k, v, indent=True) for k,v in variables.items())
+
+# The same triplet that the Makefile selects
+def vcpkg_triplet_dir(root_dir):
+    installed = os.path.join(root_dir, 'vcpkg_installed')
+    triplets = sorted(d for d in glob.glob(os.path.join(installed, '*', '')) if d != os.path.join(installed, 'vcpkg', ''))
+    return os.path.normpath(triplets[0]) if triplets else None
+
+# The global flags and rules, equivalent to those in the Makefile.
+# Make reads the environment when it runs, but a ninja file is fixed when it is generated, so the environment is read at configure time.
+# If a telemetry log is given, each compile and link is run through the recorder, which appends its wall time to the log.
+def get_prelude_lines(objdir, environ=os.environ, root_dir=champsim_root, telemetry_log=None):
+    triplet_dir = vcpkg_triplet_dir(root_dir)
+    record = ' '.join((*telemetry.get_record_command(telemetry_log), '$out', '--')) + ' ' if telemetry_log is not None else ''
+    record_link = ' '.join((*telemetry.get_record_command(telemetry_log), '$out', '--build-id=$build_id', '--')) + ' ' if telemetry_log is not None else ''
+
+    yield assign_variable('builddir', os.path.abspath(objdir))
+    yield assign_variable('cxx', environ.get('CXX', 'g++'))
+    yield assign_variable('cppflags', ' '.join(filter(None, (environ.get('CPPFLAGS'), '-I'+os.path.join(root_dir, 'inc'), triplet_dir and '-isystem '+os.path.join(triplet_dir, 'include')))))
+    yield assign_variable('cxxflags', ' '.join(filter(None, (environ.get('CXXFLAGS'), '--std=c++17 -O3 -Wall -Wextra -Wshadow -Wpedantic'))))
+    yield assign_variable('ldflags', ' '.join(filter(None, (environ.get('LDFLAGS'), triplet_dir and '-L{0}/lib -L{0}/lib/manual-link'.format(triplet_dir)))))
+    yield assign_variable('ldlibs', ' '.join(filter(None, (environ.get('LDLIBS'), '-llzma -lz -lbz2 -lfmt -ldl'))))
+    yield ''
+
+    yield 'rule cxx'
+    yield assign_variable('command', record + '$cxx -MMD -MF $out.d $cxxflags $cppflags -c -o $out $in', indent=True)
+    yield assign_variable('depfile', '$out.d', indent=True)
+    yield assign_variable('deps', 'gcc', indent=True)
+    yield assign_variable('description', 'CXX $out', indent=True)
+    yield ''
+
+    yield 'rule cxx_pch'
+    yield assign_variable('command', record + '$cxx -MMD -MF $out.d $cxxflags $cppflags -x c++-header -c -o $out $in', indent=True)
+    yield assign_variable('depfile', '$out.d', indent=True)
+    yield assign_variable('deps', 'gcc', indent=True)
+    yield assign_variable('description', 'PCH $out', indent=True)
+    yield ''
+
+    yield 'rule pgo_train'
+    yield assign_variable('command', 'find $profile_dir -name \'*.gcda\' -delete && $pgo_command && touch $out', indent=True)
+    yield assign_variable('description', 'TRAIN $out', indent=True)
+    yield ''
+
+    yield 'rule hardlink'
+    yield assign_variable('command', 'ln -f $in $out 2>/dev/null || cp $in $out', indent=True)
+    yield assign_variable('description', 'LN $out', indent=True)
+    yield ''
+
+    yield 'rule link'
+    yield assign_variable('command', record_link + '$cxx $cxxflags $cppflags $ldflags -o $out $in $ldlibs', indent=True)
+    yield assign_variable('description', 'LINK $out', indent=True)
+    yield ''
+
+    yield 'rule link_plugin'
+    yield assign_variable('command', record + '$cxx $cxxflags $cppflags -shared $ldflags -o $out $in $ldlibs', indent=True)
+    yield assign_variable('description', 'PLUGIN $out', indent=True)
+    yield ''
+
+def shared_obj_dir(obj_root, key, src_dir, base_dir):
+    return os.path.normpath(os.path.join(obj_root, key, 'obj', os.path.relpath(base_dir, src_dir)))
+
+# The object files of a shared unit
+def shared_objects(obj_root, unit):
+    obj_dir = shared_obj_dir(obj_root, unit['key'], unit['src_dir'], unit['base_dir'])
+    return [os.path.join(obj_dir, s + '.o') for s in unit['sources']]
+
+# Objects whose generated dependencies are identical in every build that uses them. See makefile.shared_opts()
+def shared_opts(obj_root, key, src_dir, base_dir, sources, config_file, has_headers=True, module_name=None, opts={}, pch=None, profile=None):
+    dest_dir = os.path.join(obj_root, key)
+    obj_dir = shared_obj_dir(obj_root, key, src_dir, base_dir)
+    cppflags_varname = key + '_cppflags'
+    cxxflags_varname = key + '_cxxflags'
+
+    cppflags = (
+        '-I'+os.path.abspath(src_dir),
+        *flag_list(opts.get('CPPFLAGS', [])),
+        *(('-I'+os.path.join(dest_dir, 'inc'),) if has_headers else ()),
+        *(('-Winvalid-pch', '-I'+os.path.dirname(pch), '-include '+os.path.basename(pch)) if pch is not None else ()),
+        *(('-include {}.inc'.format(module_name),) if module_name is not None else ()),
+        *flag_list(config_file.get('CPPFLAGS', []))
+    )
+    cxxflags = (*flag_list(opts.get('CXXFLAGS', [])), *flag_list(config_file.get('CXXFLAGS', [])))
+
+    edge_variables = {'cppflags': dereference(cppflags_varname), 'cxxflags': dereference(cxxflags_varname)}
+    if 'CXX' in config_file:
+        edge_variables['cxx'] = config_file['CXX']
+
+    yield '######'
+    yield '# Shared objects: ' + key
+    if module_name is not None:
+        yield '# Module: ' + module_name
+    yield '# Source: ' + os.path.abspath(base_dir)
+    yield '# Destination: ' + obj_dir
+    yield '######'
+    yield ''
+
+    yield assign_variable(cppflags_varname, ' '.join((dereference('cppflags'), *cppflags)))
+    yield assign_variable(cxxflags_varname, ' '.join((dereference('cxxflags'), *cxxflags)))
+    implicit = (*((pch + '.gch',) if pch is not None else ()), *((profile['stamp'],) if profile is not None and profile['stamp'] is not None else ()))
+    for i, s in enumerate(sources):
+        object_variables = edge_variables
+        if profile is not None:
+            object_variables = {**edge_variables, 'cxxflags': ' '.join((edge_variables['cxxflags'], '-dumpdir', profile['dir']+os.sep, '-dumpbase', profile['names'][i]))}
+        yield from build((os.path.join(obj_dir, s + '.o'),), 'cxx', (os.path.join(os.path.abspath(base_dir), s + '.cc'),), implicit=implicit, variables=object_variables)
+    yield ''
+
+# A precompiled header is compiled with the same flags as the objects that use it
+def pch_opts(obj_root, key, header, config_file, has_headers=True, opts={}):
+    dest_dir = os.path.join(obj_root, key)
+
+    cppflags = (
+        *flag_list(opts.get('CPPFLAGS', [])),
+        *(('-I'+os.path.join(dest_dir, 'inc'),) if has_headers else ()),
+        *flag_list(config_file.get('CPPFLAGS', []))
+    )
+    cxxflags = (*flag_list(opts.get('CXXFLAGS', [])), *flag_list(config_file.get('CXXFLAGS', [])))
+
+    edge_variables = {'cppflags': ' '.join((dereference('cppflags'), *cppflags)), 'cxxflags': ' '.join((dereference('cxxflags'), *cxxflags))}
+    if 'CXX' in config_file:
+        edge_variables['cxx'] = config_file['CXX']
+
+    yield '######'
+    yield '# Precompiled header: ' + key
+    yield '# Destination: ' + header + '.gch'
+    yield '######'
+    yield ''
+
+    yield from build((header + '.gch',), 'cxx_pch', (header,), variables=edge_variables)
+    yield ''
+
+# The instrumented executable is linked from the given objects and run to produce the profile data. See makefile.profile_opts()
+def profile_opts(profile_id, profile_dir, stamp, executable, command, objects, config_file):
+    yield '######'
+    yield '# Profile: ' + profile_id
+    yield '# Executable: ' + executable
+    yield '######'
+    yield ''
+
+    yield from get_link_lines(executable, objects, config_file)
+    yield from build((stamp,), 'pgo_train', (executable,), variables={'profile_dir': profile_dir, 'pgo_command': command})
+    yield ''
+
+def get_link_lines(executable, objects, config_file, build_id=None, order_only=(), rule='link'):
+    link_variables = {k.lower(): ' '.join((dereference(k.lower()), flag_string(config_file[k]))) for k in ('LDFLAGS', 'LDLIBS') if k in config_file}
+    if 'CXX' in config_file:
+        link_variables['cxx'] = config_file['CXX']
+    if build_id is not None:
+        link_variables['build_id'] = build_id
+    yield from build((executable,), rule, objects, variables=link_variables, order_only=order_only)
+
+# Generate the edge to link an executable from the objects of its build. See makefile.executable_opts()
+def get_executable_lines(build_id, executable, objects, config_file, plugins=()):
+    yield '######'
+    yield '# Build ID: ' + build_id
+    yield '# Executable: ' + executable
+    yield '######'
+    yield ''
+
+    yield from get_link_lines(executable, objects, config_file, build_id, order_only=plugins)
+    yield ''
+
+# A plug-in is linked from the objects of one module and the entry point for its kind. See makefile.plugin_opts()
+def plugin_opts(key, library, objects, config_file):
+    yield '######'
+    yield '# Plug-in: ' + key
+    yield '# Library: ' + library
+    yield '######'
+    yield ''
+
+    yield from get_link_lines(library, objects, config_file, rule='link_plugin')
+    yield ''
+
+# An executable that shares the binary of its build is a link to it. See makefile.get_linked_executable_lines()
+def get_linked_executable_lines(build_id, executable, binary):
+    yield '######'
+    yield '# Build ID: ' + build_id
+    yield '# Executable: ' + executable
+    yield '# Binary: ' + binary
+    yield '######'
+    yield ''
+
+    yield from build((executable,), 'hardlink', (binary,))
+    yield ''
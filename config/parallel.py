@@ -0,0 +1,40 @@
+#    Copyright 2023 The ChampSim Contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import concurrent.futures
+import functools
+import itertools
+
+from . import parse
+
+# Like map(), but distributes the calls over a pool of processes.
+# Results are yielded in the order of the inputs, and at most `window` calls are in flight at once,
+# so the iterable is consumed lazily.
+def ordered_map(func, iterable, jobs, window=None):
+    window = window or 4*jobs
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        it = iter(iterable)
+        pending = collections.deque(executor.submit(func, x) for x in itertools.islice(it, window))
+        while pending:
+            result = pending.popleft().result()
+            pending.extend(executor.submit(func, x) for x in itertools.islice(it, 1))
+            yield result
+
+def parse_and_render(writer, configs, parse_kwargs, write_kwargs):
+    return writer.render_files(parse.parse_config(*configs, **parse_kwargs), **write_kwargs)
+
+# Parse and render each configuration in a process pool. The rendered builds are yielded in order.
+def render_configs(writer, config_files, jobs, write_kwargs={}, **parse_kwargs):
+    yield from ordered_map(functools.partial(parse_and_render, writer, parse_kwargs=parse_kwargs, write_kwargs=write_kwargs), config_files, jobs)
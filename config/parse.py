@@ -54,8 +54,9 @@ def duplicate_to_length(elements, n):
     repeat_factor = math.ceil(n / len(elements));
     return list(itertools.islice(itertools.chain(*(itertools.repeat(e, repeat_factor) for e in elements)), n))
 
-def filter_inaccessible(system, roots, key='lower_level'):
-    return util.combine_named(*(util.iter_system(system, r, key=key) for r in roots))
+def filter_inaccessible(system, roots, key='lower_level', index=None):
+    index = index or util.SystemIndex(system.values(), keys=(key,))
+    return util.combine_named(*(index.iter_system(system, r, key=key) for r in roots))
 
 def split_string_or_list(val, delim=','):
     if isinstance(val, str):
@@ -122,23 +123,27 @@ def parse_normalized(cores, caches, ptws, pmem, vmem, merged_configs, branch_con
 
     cores = [util.chain(cpu, {'DIB': dict()}, default_core) for cpu in cores]
 
+    # The links between elements do not change while normalizing, so they are indexed once
+    index = util.SystemIndex(cores, caches.values(), keys=util.topology_keys)
+
     # Frequencies are the maximum of the upper levels, unless specified
+    # The first path to reach a cache determines its frequency
+    frequencies = {k: c['frequency'] for k,c in caches.items() if 'frequency' in c}
     for cpu,name in itertools.product(cores, ('L1I', 'L1D', 'ITLB', 'DTLB')):
-        caches = util.combine_named(caches.values(),
-            itertools.islice(itertools.accumulate(
-                itertools.chain((cpu,), util.iter_system(caches, cpu[name])),
-                lambda u,l: {'name': l['name'], 'frequency': max(u.get('frequency', 0), l.get('frequency', 0))}
-            ), 1, None)
-        )
+        upper_frequency = cpu.get('frequency', 0)
+        for c in index.iter_system(caches, cpu[name]):
+            upper_frequency = max(upper_frequency, frequencies.get(c['name'], 0))
+            frequencies.setdefault(c['name'], upper_frequency)
+    caches = util.combine_named(caches.values(), ({'name': k, 'frequency': v} for k,v in frequencies.items()))
 
-    caches = util.combine_named(caches.values(), defaults.list_defaults(cores, caches));
+    caches = util.combine_named(caches.values(), defaults.list_defaults(cores, caches, index));
 
     # Apply defaults to PTW
     ptws = util.combine_named(
             ptws.values(),
             ({
                 'name': cpu['PTW'],
-                **defaults.ul_dependent_defaults(*util.upper_levels_for(caches.values(), cpu['PTW']), queue_factor=16, mshr_factor=5, bandwidth_factor=2),
+                **defaults.ul_dependent_defaults(*index.upper_levels_for(cpu['PTW']), queue_factor=16, mshr_factor=5, bandwidth_factor=2),
                 'frequency': cpu['frequency'],
                 'cpu': cpu['_index']
             } for cpu in cores)
@@ -158,7 +163,7 @@ def parse_normalized(cores, caches, ptws, pmem, vmem, merged_configs, branch_con
             ptw[new] = ptw[old]
 
     # Remove caches that are inaccessible
-    caches = filter_inaccessible(caches, [cpu[name] for cpu,name in itertools.product(cores, ('ITLB', 'DTLB', 'L1I', 'L1D'))])
+    caches = filter_inaccessible(caches, [cpu[name] for cpu,name in itertools.product(cores, ('ITLB', 'DTLB', 'L1I', 'L1D'))], index=index)
 
     pmem['io_freq'] = pmem['frequency'] # Save value
     scale_frequencies(itertools.chain(cores, caches.values(), ptws.values(), (pmem,)))
@@ -178,8 +183,8 @@ def parse_normalized(cores, caches, ptws, pmem, vmem, merged_configs, branch_con
         if 'prefetch_activate' in c:
             c['prefetch_activate'] = split_string_or_list(c['prefetch_activate'])
 
-    tlb_path = itertools.chain.from_iterable(util.iter_system(caches, cpu[name]) for cpu,name in itertools.product(cores, ('ITLB', 'DTLB')))
-    l1d_path = itertools.chain.from_iterable(util.iter_system(caches, cpu[name]) for cpu,name in itertools.product(cores, ('L1I', 'L1D')))
+    tlb_path = itertools.chain.from_iterable(index.iter_system(caches, cpu[name]) for cpu,name in itertools.product(cores, ('ITLB', 'DTLB')))
+    l1d_path = itertools.chain.from_iterable(index.iter_system(caches, cpu[name]) for cpu,name in itertools.product(cores, ('L1I', 'L1D')))
     caches = util.combine_named(
             # TLBs use page offsets, Caches use block offsets
             ({'name': c['name'], '_offset_bits': 'champsim::lg2(' + str(config_file['page_size']) + ')'} for c in tlb_path),
@@ -191,8 +196,8 @@ def parse_normalized(cores, caches, ptws, pmem, vmem, merged_configs, branch_con
             ({'name': k, '_queue_check_full_addr': c.get('_first_level', False) or c.get('wq_check_full_addr', False)} for k,c in caches.items()),
 
             # The end of the data path is the physical memory
-            ({'name': collections.deque(util.iter_system(caches, cpu['L1I']), maxlen=1)[0]['name'], 'lower_level': 'DRAM'} for cpu in cores),
-            ({'name': collections.deque(util.iter_system(caches, cpu['L1D']), maxlen=1)[0]['name'], 'lower_level': 'DRAM'} for cpu in cores),
+            ({'name': collections.deque(index.iter_system(caches, cpu['L1I']), maxlen=1)[0]['name'], 'lower_level': 'DRAM'} for cpu in cores),
+            ({'name': collections.deque(index.iter_system(caches, cpu['L1D']), maxlen=1)[0]['name'], 'lower_level': 'DRAM'} for cpu in cores),
 
             # Get module path names and unique module names
             ({'name': c['name'], '_replacement_data': [replacement_context.find(f) for f in util.wrap_list(c.get('replacement',[]))]} for c in caches.values()),
@@ -213,31 +218,36 @@ def parse_normalized(cores, caches, ptws, pmem, vmem, merged_configs, branch_con
             }
 
     if compile_all_modules:
-        modules_to_compile = [*set(itertools.chain(*(d.keys() for d in module_info.values())))]
+        modules_to_compile = sorted(set(itertools.chain(*(d.keys() for d in module_info.values()))))
     else:
-        modules_to_compile = [*set(d['name'] for d in itertools.chain(
+        modules_to_compile = sorted(set(d['name'] for d in itertools.chain(
             *(c['_replacement_data'] for c in caches.values()),
             *(c['_prefetcher_data'] for c in caches.values()),
             *(c['_branch_predictor_data'] for c in cores),
             *(c['_btb_data'] for c in cores)
-        ))]
+        )))
 
     env_vars = ('CC', 'CXX', 'CPPFLAGS', 'CXXFLAGS', 'LDFLAGS', 'LDLIBS')
     extern_config_file_keys = ('block_size', 'page_size', 'heartbeat_frequency', 'num_cores')
 
     return elements, modules_to_compile, module_info, util.subdict(config_file, extern_config_file_keys), util.subdict(config_file, env_vars)
 
-def parse_config(*configs, module_dir=[], branch_dir=[], btb_dir=[], pref_dir=[], repl_dir=[], compile_all_modules=False):
+# The contexts to search for each type of module. The directories given first have the highest priority.
+def get_search_contexts(module_dir=[], branch_dir=[], btb_dir=[], pref_dir=[], repl_dir=[]):
     champsim_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return {
+        'branch_context': modules.ModuleSearchContext([*(os.path.join(m, 'branch') for m in module_dir), *branch_dir, os.path.join(champsim_root, 'branch')]),
+        'btb_context': modules.ModuleSearchContext([*(os.path.join(m, 'btb') for m in module_dir), *btb_dir, os.path.join(champsim_root, 'btb')]),
+        'replacement_context': modules.ModuleSearchContext([*(os.path.join(m, 'replacement') for m in module_dir), *repl_dir, os.path.join(champsim_root, 'replacement')]),
+        'prefetcher_context': modules.ModuleSearchContext([*(os.path.join(m, 'prefetcher') for m in module_dir), *pref_dir, os.path.join(champsim_root, 'prefetcher')])
+    }
 
+def parse_config(*configs, module_dir=[], branch_dir=[], btb_dir=[], pref_dir=[], repl_dir=[], compile_all_modules=False):
     name = executable_name(*configs)
     merged_configs = util.chain(*configs)
     elements, modules_to_compile, module_info, config_file, env = parse_normalized(*normalize_config(merged_configs),
         merged_configs,
-        branch_context = modules.ModuleSearchContext([*(os.path.join(m, 'branch') for m in module_dir), *branch_dir, os.path.join(champsim_root, 'branch')]),
-        btb_context = modules.ModuleSearchContext([*(os.path.join(m, 'btb') for m in module_dir), *btb_dir, os.path.join(champsim_root, 'btb')]),
-        replacement_context = modules.ModuleSearchContext([*(os.path.join(m, 'replacement') for m in module_dir), *repl_dir, os.path.join(champsim_root, 'replacement')]),
-        prefetcher_context = modules.ModuleSearchContext([*(os.path.join(m, 'prefetcher') for m in module_dir), *pref_dir, os.path.join(champsim_root, 'prefetcher')]),
+        **get_search_contexts(module_dir, branch_dir, btb_dir, pref_dir, repl_dir),
         compile_all_modules = compile_all_modules
     )
 
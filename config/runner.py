@@ -0,0 +1,483 @@
+#    Copyright 2023 The ChampSim Contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Run simulations with the executables of the generated builds.
+# A run is an executable, the traces for its cores, and the lengths of its phases. Each run writes its statistics with --json to a file named by its ID.
+# Completed runs are appended to a journal, so that a campaign that is interrupted resumes with only the runs that did not complete.
+# Runs may also be shared between hosts through a queue in a directory that they all mount. Any number of workers on any host claim runs from it.
+# The statistics of completed runs may be ingested into a store, where they may be queried across sweeps.
+# Like the telemetry, this may be run as a script, so it does not depend on the rest of the package.
+
+import argparse
+import concurrent.futures
+import contextlib
+import csv
+import fcntl
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+journal_file_name = 'journal.jsonl'
+
+# The directories of a queue. The statistics and logs are written to the queue directory itself, as they are to a results directory.
+queue_runs_dir_name = 'runs'
+queue_locks_dir_name = 'locks'
+queue_done_dir_name = 'done'
+
+# The suffix of the parameters that are written beside executables with runtime parameters. See filewrite.parameters_file_suffix
+parameters_file_suffix = '.json'
+
+# The suffix of the build information that is written beside every executable. See filewrite.build_info_file_suffix
+build_info_file_suffix = '.build.json'
+
+# The tables of the results store. Each statistic of each run is a row, named by its phase and its path in the JSON statistics, as in "roi.LLC.LOAD.miss".
+# The values are stored in order of their statistics, so that reading one statistic across a sweep reads only that statistic's rows.
+# The tables refer to runs and statistics by their numbers in the store, which are smaller than their names. Queries may use the stats view, which names them.
+store_schema = (
+    'CREATE TABLE IF NOT EXISTS runs (run INTEGER PRIMARY KEY, id TEXT UNIQUE, build_id TEXT, executable TEXT, warmup_instructions INTEGER, simulation_instructions INTEGER)',
+    'CREATE TABLE IF NOT EXISTS traces (run INTEGER, cpu INTEGER, trace TEXT, PRIMARY KEY (run, cpu)) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS parameters (run INTEGER, name TEXT, value, PRIMARY KEY (run, name)) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS stat_names (stat INTEGER PRIMARY KEY, name TEXT, phase TEXT, UNIQUE (name, phase))',
+    'CREATE TABLE IF NOT EXISTS stat_values (stat INTEGER, run INTEGER, value REAL, PRIMARY KEY (stat, run)) WITHOUT ROWID',
+    'CREATE VIEW IF NOT EXISTS stats AS SELECT n.name AS name, v.run AS run, n.phase AS phase, v.value AS value FROM stat_values v JOIN stat_names n USING (stat)',
+    'CREATE INDEX IF NOT EXISTS runs_by_build ON runs (build_id)',
+    'CREATE INDEX IF NOT EXISTS traces_by_trace ON traces (trace)',
+    'CREATE INDEX IF NOT EXISTS parameters_by_name ON parameters (name, value)'
+)
+
+# The executables that the configuration wrote to the directory
+def find_executables(bindir_name):
+    names = sorted(os.listdir(bindir_name)) if os.path.isdir(bindir_name) else []
+    paths = (os.path.abspath(os.path.join(bindir_name, n)) for n in names if not n.endswith(parameters_file_suffix))
+    return [p for p in paths if os.path.isfile(p) and os.access(p, os.X_OK)]
+
+# The traces of a multi-core run are separated by commas
+def parse_trace_group(val):
+    return [t for t in val.split(',') if t]
+
+# A file of trace groups has one group on each line. Blank lines and lines that begin with # are skipped.
+def read_trace_groups(fname):
+    with open(fname, 'rt') as rfp:
+        return [parse_trace_group(l.strip()) for l in rfp if l.strip() and not l.lstrip().startswith('#')]
+
+# The run ID is a hash of everything that the simulation depends on, so that the same run has the same ID in every campaign
+def get_run_id(run):
+    return hashlib.shake_128(json.dumps(run, sort_keys=True).encode('utf-8')).hexdigest(8)
+
+# Every combination of the executables, trace groups, and phase lengths. A phase length of None is left to the simulator's default.
+def get_runs(executables, trace_groups, warmup_instructions=(None,), simulation_instructions=(None,)):
+    for executable, traces, warmup, simulation in itertools.product(executables, trace_groups, warmup_instructions, simulation_instructions):
+        run = {
+            'executable': os.path.abspath(executable),
+            'traces': [os.path.abspath(t) for t in traces],
+            'warmup_instructions': warmup,
+            'simulation_instructions': simulation
+        }
+        yield {'id': get_run_id(run), **run}
+
+def get_result_names(results_dir, run_id):
+    return os.path.join(results_dir, run_id + '.json'), os.path.join(results_dir, run_id + '.log')
+
+def get_command(run, json_name, extra_args=()):
+    return [
+        run['executable'],
+        *(('--warmup-instructions', str(run['warmup_instructions'])) if run['warmup_instructions'] is not None else ()),
+        *(('--simulation-instructions', str(run['simulation_instructions'])) if run['simulation_instructions'] is not None else ()),
+        '--json', json_name,
+        *extra_args,
+        *run['traces']
+    ]
+
+# Write the file under a name private to this process and move it into place, so that readers on any host see all of it or none of it
+def write_atomic(fname, contents):
+    part_name = '{}.{}.{}.part'.format(fname, socket.gethostname(), os.getpid())
+    with open(part_name, 'wt') as wfp:
+        wfp.write(contents)
+        wfp.flush()
+        os.fsync(wfp.fileno())
+    os.replace(part_name, fname)
+
+def load_entry(fname):
+    try:
+        with open(fname, 'rt') as rfp:
+            return json.load(rfp)
+    except (FileNotFoundError, ValueError):
+        return None
+
+# Read the most recent entry for each run. A line cut short by an interrupted campaign is skipped.
+# The entries of runs completed from a queue are each in their own file.
+def load_journal(results_dir):
+    entries = {}
+    journal_name = os.path.join(results_dir, journal_file_name)
+    if os.path.exists(journal_name):
+        with open(journal_name, 'rt') as rfp:
+            for l in rfp:
+                try:
+                    entry = json.loads(l)
+                except ValueError:
+                    continue
+                entries[entry['id']] = entry
+
+    done_dir = os.path.join(results_dir, queue_done_dir_name)
+    for name in (sorted(os.listdir(done_dir)) if os.path.isdir(done_dir) else []):
+        entry = load_entry(os.path.join(done_dir, name)) if name.endswith('.json') else None
+        if entry is not None:
+            entries[entry['id']] = entry
+    return entries
+
+# Each entry is a single line, written as soon as its run completes
+def append_journal(results_dir, entry):
+    with open(os.path.join(results_dir, journal_file_name), 'at') as wfp:
+        wfp.write(json.dumps(entry, sort_keys=True) + '\n')
+        wfp.flush()
+        os.fsync(wfp.fileno())
+
+# The cores that the runner may use
+def get_available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+# Each worker in the pool takes a core when it starts. Its simulations inherit its affinity, so each runs on the worker's core.
+def pin_worker(cores):
+    core = cores.get()
+    if core is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {core})
+
+def get_pool(jobs, pin):
+    available_cores = get_available_cores()
+    jobs = jobs or len(available_cores)
+
+    context = multiprocessing.get_context()
+    cores = context.Queue()
+    for core in itertools.islice(itertools.cycle(available_cores if pin else (None,)), jobs):
+        cores.put(core)
+    return jobs, concurrent.futures.ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=pin_worker, initargs=(cores,))
+
+def load_build_info(executable):
+    return load_entry(executable + build_info_file_suffix) or {}
+
+# Run a simulation, with its output in a log beside its statistics.
+# Both are written under names private to this process and moved into place when the simulation ends, so a run that is cut short leaves nothing behind that could be taken for its results.
+def execute(run, results_dir, extra_args=()):
+    json_name, log_name = get_result_names(results_dir, run['id'])
+    part_suffix = '.{}.{}.part'.format(socket.gethostname(), os.getpid())
+    start = time.monotonic()
+    with open(log_name + part_suffix, 'wb') as wfp:
+        status = subprocess.call(get_command(run, json_name + part_suffix, extra_args), stdout=wfp, stderr=subprocess.STDOUT)
+    if os.path.exists(json_name + part_suffix):
+        os.replace(json_name + part_suffix, json_name)
+    os.replace(log_name + part_suffix, log_name)
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None
+    build_id = load_build_info(run['executable']).get('build_id')
+    return {**run, 'status': status, 'seconds': round(time.monotonic() - start, 3), 'time': time.time(), 'cores': cores, 'json': json_name, 'log': log_name, 'build_id': build_id}
+
+# Run each run that has not completed, and yield the journal entry of each as it completes.
+# The pool has one worker for each available core, unless the number of jobs is given. At most `window` runs are submitted at once, so the runs are consumed lazily.
+def run_all(runs, results_dir, jobs=None, pin=True, extra_args=(), window=None):
+    results_dir = os.path.abspath(results_dir)
+    os.makedirs(results_dir, exist_ok=True)
+    completed = {k for k,v in load_journal(results_dir).items() if v['status'] == 0}
+    pending_runs = (r for r in runs if r['id'] not in completed)
+
+    jobs, executor = get_pool(jobs, pin)
+    window = window or 4*jobs
+    with executor:
+        in_flight = {executor.submit(execute, r, results_dir, extra_args) for r in itertools.islice(pending_runs, window)}
+        while in_flight:
+            done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            in_flight.update(executor.submit(execute, r, results_dir, extra_args) for r in itertools.islice(pending_runs, len(done)))
+            for future in done:
+                entry = future.result()
+                append_journal(results_dir, entry)
+                yield entry
+
+def get_queue_names(queue_dir, run_id):
+    return tuple(os.path.join(queue_dir, d, run_id + ext) for d, ext in ((queue_runs_dir_name, '.json'), (queue_locks_dir_name, '.lock'), (queue_done_dir_name, '.json')))
+
+# Add the runs to the queue. Runs that are already in the queue are not added again, but those that failed are retried.
+# Return the number of runs that were added or retried.
+def enqueue(runs, queue_dir):
+    queue_dir = os.path.abspath(queue_dir)
+    for d in (queue_runs_dir_name, queue_locks_dir_name, queue_done_dir_name):
+        os.makedirs(os.path.join(queue_dir, d), exist_ok=True)
+
+    count = 0
+    for run in runs:
+        run_name, _, done_name = get_queue_names(queue_dir, run['id'])
+        entry = load_entry(done_name)
+        if not os.path.exists(run_name):
+            write_atomic(run_name, json.dumps(run, sort_keys=True))
+            count += 1
+        elif entry is not None and entry['status'] != 0:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(done_name)
+            count += 1
+    return count
+
+# A run is claimed by locking its lock file, which works between hosts on a shared file system.
+# The lock is held until the run's entry is written. If the worker dies, the lock is released with it, and the run is claimed by another worker.
+def try_claim(lock_name):
+    fd = os.open(lock_name, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+def release(fd):
+    fcntl.lockf(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+# Claim and execute runs from the queue until none remain, and yield the entry of each run this worker completes.
+# Runs that are claimed by other workers are left to them. If waiting, the worker polls until they complete, so it may take over the runs of workers that die.
+def work(queue_dir, extra_args=(), wait=False, poll_interval=10.0):
+    queue_dir = os.path.abspath(queue_dir)
+    while True:
+        done = set(os.listdir(os.path.join(queue_dir, queue_done_dir_name)))
+        pending = [n for n in sorted(os.listdir(os.path.join(queue_dir, queue_runs_dir_name))) if n.endswith('.json') and n not in done]
+        if not pending:
+            return
+
+        claimed = 0
+        for name in pending:
+            run_name, lock_name, done_name = get_queue_names(queue_dir, os.path.splitext(name)[0])
+            fd = try_claim(lock_name)
+            if fd is None:
+                continue
+            try:
+                # Another worker may have completed the run since the queue was listed
+                if os.path.exists(done_name):
+                    continue
+                claimed += 1
+                entry = {**execute(load_entry(run_name), queue_dir, extra_args), 'host': socket.gethostname(), 'pid': os.getpid()}
+                write_atomic(done_name, json.dumps(entry, sort_keys=True))
+                yield entry
+            finally:
+                release(fd)
+
+        if not claimed:
+            if not wait:
+                return
+            time.sleep(poll_interval)
+
+def print_entry(entry, count, total=None):
+    progress = '{}/{}'.format(count, total) if total is not None else str(count)
+    print('[{}] {} {:>9.2f}s  {}  {}  {}'.format(progress, 'ok  ' if entry['status'] == 0 else 'FAIL', entry['seconds'], entry['id'], os.path.basename(entry['executable']), ' '.join(map(os.path.basename, entry['traces']))), flush=True)
+
+# A worker in the pool of a host. Return the number of runs that failed.
+def work_and_print(queue_dir, extra_args, wait, poll_interval):
+    failed = 0
+    for count, entry in enumerate(work(queue_dir, extra_args, wait, poll_interval), start=1):
+        failed += int(entry['status'] != 0)
+        print_entry(entry, count)
+    return failed
+
+# Start a pool of workers on this host, one for each available core unless the number of jobs is given. Return the number of runs that failed.
+def work_all(queue_dir, jobs=None, pin=True, extra_args=(), wait=False, poll_interval=10.0):
+    jobs, executor = get_pool(jobs, pin)
+    with executor:
+        return sum(f.result() for f in [executor.submit(work_and_print, queue_dir, extra_args, wait, poll_interval) for _ in range(jobs)])
+
+# The statistics of each completed run, with the run that produced them. The statistics are found by the run's ID, so the results may be moved.
+def collect(results_dir):
+    for entry in load_journal(results_dir).values():
+        json_name, _ = get_result_names(results_dir, entry['id'])
+        if entry['status'] == 0 and os.path.exists(json_name):
+            with open(json_name, 'rt') as rfp:
+                stats = json.load(rfp)
+            yield {**{k: entry[k] for k in ('id', 'executable', 'traces', 'warmup_instructions', 'simulation_instructions')}, 'stats': stats}
+
+# The numeric statistics of each phase, named by their phases and paths. The elements of lists, such as the cores, are named by their indices.
+# The documents are walked with a stack rather than by recursion, which is much faster.
+def flatten_stats(stats):
+    flat = []
+    for phase in stats:
+        stack = [(region, phase[region]) for region in ('sim', 'roi') if region in phase]
+        while stack:
+            prefix, val = stack.pop()
+            if type(val) is dict:
+                stack.extend((prefix + '.' + k, v) for k,v in val.items())
+            elif type(val) is list:
+                stack.extend((prefix + '.' + str(i), v) for i,v in enumerate(val))
+            elif type(val) in (int, float):
+                flat.append(((prefix, phase['name']), val))
+    return flat
+
+def open_store(store_name):
+    connection = sqlite3.connect(store_name)
+    for statement in store_schema:
+        connection.execute(statement)
+    return connection
+
+# Add the statistics of each completed run in the results directory that is not already in the store. Return the number of runs that were added.
+# The parameters of a run are those written beside its executable, if it has not been configured again since the run.
+# The values are inserted in sorted batches, so that the rows of each statistic are appended together.
+def ingest(results_dir, store_name, batch_size=1000):
+    connection = open_store(store_name)
+    count = 0
+    batch = []
+    with connection:
+        stored = {r[0] for r in connection.execute('SELECT id FROM runs')}
+        stat_numbers = {(name, phase): stat for stat, name, phase in connection.execute('SELECT stat, name, phase FROM stat_names')}
+        for entry in load_journal(results_dir).values():
+            json_name, _ = get_result_names(results_dir, entry['id'])
+            if entry['status'] != 0 or entry['id'] in stored or not os.path.exists(json_name):
+                continue
+            with open(json_name, 'rt') as rfp:
+                stats = json.load(rfp)
+
+            build_info = load_build_info(entry['executable'])
+            build_id = entry.get('build_id')
+            parameters = build_info.get('parameters', {}) if build_id is not None and build_info.get('build_id') == build_id else {}
+
+            run = connection.execute('INSERT INTO runs (id, build_id, executable, warmup_instructions, simulation_instructions) VALUES (?, ?, ?, ?, ?)',
+                    (entry['id'], build_id, entry['executable'], entry['warmup_instructions'], entry['simulation_instructions'])).lastrowid
+            connection.executemany('INSERT INTO traces VALUES (?, ?, ?)', ((run, i, t) for i,t in enumerate(entry['traces'])))
+            connection.executemany('INSERT INTO parameters VALUES (?, ?, ?)', ((run, k, v) for k,v in parameters.items()))
+            for key, value in flatten_stats(stats):
+                if key not in stat_numbers:
+                    stat_numbers[key] = connection.execute('INSERT INTO stat_names (name, phase) VALUES (?, ?)', key).lastrowid
+                batch.append((stat_numbers[key], run, value))
+            count += 1
+
+            if count % batch_size == 0:
+                connection.executemany('INSERT OR REPLACE INTO stat_values VALUES (?, ?, ?)', sorted(batch))
+                batch.clear()
+        connection.executemany('INSERT OR REPLACE INTO stat_values VALUES (?, ?, ?)', sorted(batch))
+    connection.close()
+    return count
+
+# The rows of a query on the store, preceded by the names of its columns
+def query(store_name, sql, parameters=()):
+    connection = open_store(store_name)
+    try:
+        cursor = connection.execute(sql, parameters)
+        yield tuple(d[0] for d in cursor.description or ())
+        yield from cursor
+    finally:
+        connection.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run ChampSim executables on traces, and collect their statistics')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    # The options that select the runs
+    runs_parser = argparse.ArgumentParser(add_help=False)
+    runs_parser.add_argument('executables', nargs='*',
+            help='The executables to run. If none are given, every executable in the binary directory is run.')
+    runs_parser.add_argument('--bindir', default='bin',
+            help='The directory of executables to run, if none are given')
+    runs_parser.add_argument('-t', '--trace', action='append', default=[], metavar='TRACES',
+            help='The traces of a run, separated by commas if the executable has more than one core. May be given more than once.')
+    runs_parser.add_argument('--trace-list', action='append', default=[], metavar='FILE',
+            help='A file with the traces of a run on each line, as for --trace')
+    runs_parser.add_argument('-w', '--warmup-instructions', action='append', type=int, metavar='N',
+            help='The number of instructions in the warmup phase. May be given more than once.')
+    runs_parser.add_argument('-i', '--simulation-instructions', action='append', type=int, metavar='N',
+            help='The number of instructions in the detailed phase. May be given more than once.')
+
+    # The options of the processes that run simulations
+    pool_parser = argparse.ArgumentParser(add_help=False)
+    pool_parser.add_argument('-j', '--jobs', type=int, metavar='N',
+            help='The number of simulations to run at once. By default, one for each core that may be used.')
+    pool_parser.add_argument('--no-pin', action='store_true',
+            help='Do not pin each simulation to a core')
+
+    run_parser = subparsers.add_parser('run', parents=[runs_parser, pool_parser], help='Run every combination of the executables, traces, and phase lengths. Arguments given after -- are passed to each simulation.')
+    run_parser.add_argument('-o', '--results', default='results', metavar='DIR',
+            help='The directory for the statistics, logs, and journal of the runs')
+
+    enqueue_parser = subparsers.add_parser('enqueue', parents=[runs_parser], help='Add every combination of the executables, traces, and phase lengths to a queue in a shared directory. Runs that failed are retried.')
+    enqueue_parser.add_argument('-q', '--queue', required=True, metavar='DIR')
+
+    work_parser = subparsers.add_parser('work', parents=[pool_parser], help='Run simulations from a queue in a shared directory until none remain. Start workers on as many hosts as needed. Arguments given after -- are passed to each simulation.')
+    work_parser.add_argument('queue', metavar='DIR')
+    work_parser.add_argument('--wait', action='store_true',
+            help='Wait for the runs claimed by other workers to complete, and take them over if their workers die')
+    work_parser.add_argument('--poll-interval', type=float, default=10.0, metavar='SECONDS')
+
+    collect_parser = subparsers.add_parser('collect', help='Write the statistics of every completed run, from a results directory or a queue, as one JSON array')
+    collect_parser.add_argument('results', nargs='?', default='results', metavar='DIR')
+    collect_parser.add_argument('-o', '--output', metavar='FILE',
+            help='The file to write to. If none is given, stdout is used.')
+
+    ingest_parser = subparsers.add_parser('ingest', help='Add the statistics of every completed run, from a results directory or a queue, to a store that may be queried with SQL')
+    ingest_parser.add_argument('results', nargs='?', default='results', metavar='DIR')
+    ingest_parser.add_argument('-s', '--store', default='results.db', metavar='FILE',
+            help='The SQLite database of the store. Runs that are already in it are not added again.')
+
+    query_parser = subparsers.add_parser('query', help='Run an SQL query on a store, and write its rows as CSV')
+    query_parser.add_argument('sql')
+    query_parser.add_argument('-s', '--store', default='results.db', metavar='FILE')
+
+    # The arguments for the simulations are passed through untouched, even if they look like ours
+    argv = sys.argv[1:]
+    extra_args = argv[argv.index('--')+1:] if '--' in argv else []
+    args = parser.parse_args(argv[:len(argv)-len(extra_args)-1] if '--' in argv else argv)
+
+    if args.action == 'collect':
+        results = list(collect(args.results))
+        if args.output:
+            with open(args.output, 'wt') as wfp:
+                json.dump(results, wfp, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+        sys.exit(0)
+
+    if args.action == 'ingest':
+        print('{} runs added to {}'.format(ingest(args.results, args.store), args.store))
+        sys.exit(0)
+
+    if args.action == 'query':
+        csv.writer(sys.stdout).writerows(query(args.store, args.sql))
+        sys.exit(0)
+
+    if args.action == 'work':
+        failed = work_all(args.queue, args.jobs, not args.no_pin, extra_args, args.wait, args.poll_interval)
+        if failed:
+            print('{} runs failed. Their logs are in {}'.format(failed, args.queue))
+        sys.exit(1 if failed else 0)
+
+    executables = args.executables or find_executables(args.bindir)
+    trace_groups = [*map(parse_trace_group, args.trace), *itertools.chain.from_iterable(map(read_trace_groups, args.trace_list))]
+    if not executables or not trace_groups:
+        parser.error('At least one executable and one trace are required')
+
+    runs = list(get_runs(executables, trace_groups, args.warmup_instructions or (None,), args.simulation_instructions or (None,)))
+
+    if args.action == 'enqueue':
+        print('{} runs, {} added to the queue'.format(len(runs), enqueue(runs, args.queue)))
+        sys.exit(0)
+
+    completed = {k for k,v in load_journal(args.results).items() if v['status'] == 0}
+    remaining = len([r for r in runs if r['id'] not in completed])
+    print('{} runs, {} already completed'.format(len(runs), len(runs) - remaining))
+
+    failed = 0
+    for count, entry in enumerate(run_all(runs, args.results, args.jobs, not args.no_pin, extra_args), start=1):
+        failed += int(entry['status'] != 0)
+        print_entry(entry, count, remaining)
+
+    if failed:
+        print('{} runs failed. Their logs are in {}'.format(failed, args.results))
+    sys.exit(1 if failed else 0)
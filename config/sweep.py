@@ -0,0 +1,123 @@
+#    Copyright 2023 The ChampSim Contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import re
+
+from . import parse
+
+sweep_key = 'sweep'
+
+def is_sweep(val):
+    return isinstance(val, dict) and list(val.keys()) == [sweep_key]
+
+# The values of a sweep expression. The expression is either a list of values, or a range with an inclusive stop:
+#   { "start": 1024, "stop": 4096, "step": 1024 }
+#   { "start": 1024, "stop": 8192, "factor": 2 }
+def sweep_values(expr):
+    spec = expr[sweep_key]
+    if isinstance(spec, list):
+        return spec
+
+    if not isinstance(spec, dict) or 'start' not in spec or 'stop' not in spec:
+        raise ValueError('Sweep expression must be a list or a range with "start" and "stop": ' + repr(spec))
+    if 'step' in spec and 'factor' in spec:
+        raise ValueError('Sweep range may have "step" or "factor", but not both: ' + repr(spec))
+
+    if 'factor' in spec:
+        if spec['factor'] <= 1 or spec['start'] <= 0:
+            raise ValueError('Geometric sweep must have a positive start and a factor greater than 1: ' + repr(spec))
+        advance = lambda v: v * spec['factor']
+    else:
+        if spec.get('step', 1) <= 0:
+            raise ValueError('Sweep step must be positive: ' + repr(spec))
+        advance = lambda v: v + spec.get('step', 1)
+
+    return list(itertools.takewhile(lambda v: v <= spec['stop'], itertools.accumulate(itertools.repeat(spec['start']), lambda v,_: advance(v))))
+
+# Find the paths to all sweep expressions in the configuration
+def find_sweeps(config, path=tuple()):
+    if is_sweep(config):
+        yield path, sweep_values(config)
+    elif isinstance(config, dict):
+        for k,v in config.items():
+            yield from find_sweeps(v, (*path, k))
+    elif isinstance(config, list):
+        for i,v in enumerate(config):
+            yield from find_sweeps(v, (*path, i))
+
+# Copy the configuration, replacing the values at the given paths
+def substitute(config, replacements, path=tuple()):
+    if path in replacements:
+        return replacements[path]
+    if isinstance(config, dict):
+        return {k: substitute(v, replacements, (*path, k)) for k,v in config.items()}
+    if isinstance(config, list):
+        return [substitute(v, replacements, (*path, i)) for i,v in enumerate(config)]
+    return config
+
+def point_label(path, value):
+    return re.sub(r'[^A-Za-z0-9_.+-]', '_', '.'.join(map(str, path)) + '-' + str(value))
+
+def point_suffix(point):
+    return '_'.join(itertools.starmap(point_label, point))
+
+# Give each point in a sweep a distinct executable name
+def rename_point(config, point):
+    suffix = point_suffix(point)
+    if 'executable_name' in config:
+        return {**config, 'executable_name': config['executable_name'] + '_' + suffix}
+    if config.get('name') is not None:
+        return {**config, 'name': config['name'] + '_' + suffix}
+    return {**config, 'name': suffix}
+
+# Yield each configuration described by the sweep expressions in the given configuration, with the point in the sweep it was made from.
+# Configurations without sweep expressions are yielded unchanged, at an empty point.
+def expand_points(config):
+    sweeps = list(find_sweeps(config))
+    if not sweeps:
+        yield config, []
+        return
+
+    paths = [p for p,_ in sweeps]
+    for values in itertools.product(*(v for _,v in sweeps)):
+        point = list(zip(paths, values))
+        yield substitute(config, dict(point)), point
+
+# Yield each configuration described by the sweep expressions in the given configuration.
+# Configurations without sweep expressions are yielded unchanged.
+def expand(config):
+    for point_config, point in expand_points(config):
+        yield rename_point(point_config, point) if point else point_config
+
+def expand_product_points(*config_lists):
+    if not config_lists:
+        yield tuple(), []
+        return
+
+    head, *tail = config_lists
+    for config in head:
+        for point_config, point in expand_points(config):
+            for rest, rest_point in expand_product_points(*tail):
+                yield (point_config, *rest), [*point, *rest_point]
+
+# Equivalent to itertools.product(), over the expansions of each list of configurations.
+# The combinations are generated lazily, so large sweeps are never held in memory at once.
+# Each combination that came from a sweep is followed by a configuration that names its executable, since the name may be given by any of the files.
+def expand_product(*config_lists):
+    for configs, point in expand_product_points(*config_lists):
+        if point:
+            yield (*configs, {'executable_name': parse.executable_name(*configs) + '_' + point_suffix(point)})
+        else:
+            yield configs
@@ -0,0 +1,156 @@
+#    Copyright 2023 The ChampSim Contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compile and link times of the generated builds.
+# The build files run each compile and link through this file as a script, so it must not depend on the rest of the package.
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+log_file_name = 'telemetry.jsonl'
+unit_index_file_name = 'telemetry_unit.json'
+build_index_file_name = 'telemetry_build.json'
+
+# The command that the build files prefix to each compile and link
+def get_record_command(log_name):
+    return ('python3', os.path.abspath(__file__), 'record', os.path.abspath(log_name))
+
+# Run the command and append its wall time to the log. Each entry is a single line, so that parallel jobs may append to the same log.
+def record(log_name, target, command, build_id=None):
+    start = time.monotonic()
+    status = subprocess.call(command)
+    entry = {'target': os.path.abspath(target), 'seconds': round(time.monotonic() - start, 3), 'status': status, 'time': time.time()}
+    if build_id:
+        entry['build_id'] = build_id
+    os.makedirs(os.path.dirname(os.path.abspath(log_name)), exist_ok=True)
+    with open(log_name, 'at') as wfp:
+        wfp.write(json.dumps(entry, sort_keys=True) + '\n')
+    return status
+
+# Read the most recent successful entry for each target. A line cut short by an interrupted build is skipped.
+def load_log(log_name):
+    entries = {}
+    if os.path.exists(log_name):
+        with open(log_name, 'rt') as rfp:
+            for l in rfp:
+                try:
+                    entry = json.loads(l)
+                except ValueError:
+                    continue
+                if entry.get('status') == 0:
+                    entries[entry['target']] = entry
+    return entries
+
+# The generated files record which module each shared unit compiles and which shared units each build links
+def load_index(objdir_name):
+    units = {}
+    for fname in glob.glob(os.path.join(objdir_name, '*', '*', unit_index_file_name)):
+        with open(fname, 'rt') as rfp:
+            units[os.path.basename(os.path.dirname(fname))] = json.load(rfp)
+    builds = {}
+    for fname in glob.glob(os.path.join(objdir_name, '*', build_index_file_name)):
+        with open(fname, 'rt') as rfp:
+            builds[os.path.basename(os.path.dirname(fname))] = json.load(rfp)
+    return units, builds
+
+def get_kind(target):
+    return {'.o': 'compile', '.gch': 'pch'}.get(os.path.splitext(target)[1], 'link')
+
+# Objects and precompiled headers are found under the directory of their shared unit
+def get_unit_key(target, objdir_name, shared_dir_name='shared'):
+    relpath = os.path.relpath(target, os.path.join(os.path.abspath(objdir_name), shared_dir_name))
+    if relpath.startswith(os.pardir):
+        return None
+    return relpath.split(os.sep)[0]
+
+# Modules are named by their type and directory, such as replacement/lru, rather than by their mangled names
+def get_module_label(unit, kind):
+    if unit.get('module') is not None:
+        return os.path.join(*os.path.normpath(unit['path']).split(os.sep)[-2:])
+    return '(precompiled headers)' if kind == 'pch' else '(core)'
+
+# Attribute each entry to its shared unit, module, and build.
+# Objects are shared by every build that links their unit, so compile times are totalled for each build that uses them, but counted once for each module.
+def summarize(entries, units, builds, objdir_name):
+    targets = []
+    modules = {}
+    build_totals = {k: {'compile': 0.0, 'link': 0.0, 'units': len(v['units'])} for k,v in builds.items()}
+    unit_seconds = {}
+    for entry in entries.values():
+        kind = get_kind(entry['target'])
+        key = get_unit_key(entry['target'], objdir_name) if kind != 'link' else None
+        module_name = get_module_label(units.get(key, {}), kind) if key is not None else None
+        targets.append({**entry, 'kind': kind, 'unit': key, 'module': module_name})
+        if key is not None:
+            unit_seconds[key] = unit_seconds.get(key, 0.0) + entry['seconds']
+            modules[module_name] = modules.get(module_name, 0.0) + entry['seconds']
+        if kind == 'link' and entry.get('build_id') in build_totals:
+            build_totals[entry['build_id']]['link'] += entry['seconds']
+
+    for build_id, build in builds.items():
+        build_totals[build_id]['compile'] = sum(unit_seconds.get(k, 0.0) for k in build['units'])
+
+    return {
+        'targets': sorted(targets, key=lambda t: t['seconds'], reverse=True),
+        'modules': dict(sorted(modules.items(), key=lambda kv: kv[1], reverse=True)),
+        'builds': dict(sorted(build_totals.items(), key=lambda kv: kv[1]['compile'] + kv[1]['link'], reverse=True))
+    }
+
+def get_report_lines(objdir_name, count=10):
+    entries = load_log(os.path.join(objdir_name, log_file_name))
+    if not entries:
+        yield 'No build telemetry has been recorded. Configure with --telemetry and build first.'
+        return
+
+    summary = summarize(entries, *load_index(objdir_name), objdir_name)
+    yield 'Slowest targets:'
+    for t in summary['targets'][:count]:
+        label = t['module'] or t.get('build_id') or ''
+        yield '{:>9.2f}s  {:<7}  {:<24}  {}'.format(t['seconds'], t['kind'], label, t['target'])
+    yield ''
+    yield 'Compile time by module:'
+    for name, seconds in list(summary['modules'].items())[:count]:
+        yield '{:>9.2f}s  {}'.format(seconds, name)
+    yield ''
+    yield 'Time by build (objects shared between builds are counted in each):'
+    for build_id, build in list(summary['builds'].items())[:count]:
+        yield '{:>9.2f}s  {}  ({:.2f}s compile in {} units, {:.2f}s link)'.format(build['compile'] + build['link'], build_id, build['compile'], build['units'], build['link'])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record or report the compile and link times of ChampSim builds')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    record_parser = subparsers.add_parser('record', help='Run a command, given after --, and record its wall time')
+    record_parser.add_argument('log')
+    record_parser.add_argument('target')
+    record_parser.add_argument('--build-id')
+
+    report_parser = subparsers.add_parser('report', help='Summarize the recorded times')
+    report_parser.add_argument('objdir')
+    report_parser.add_argument('-n', '--count', type=int, default=10)
+
+    # The command is passed through untouched, even if it has options that look like ours
+    argv = sys.argv[1:]
+    command = argv[argv.index('--')+1:] if '--' in argv else []
+    args = parser.parse_args(argv[:len(argv)-len(command)-1] if '--' in argv else argv)
+    if args.action == 'record':
+        sys.exit(record(args.log, args.target, command, args.build_id))
+    else:
+        for l in get_report_lines(args.objdir, args.count):
+            print(l)
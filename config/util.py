@@ -13,8 +13,6 @@
 # limitations under the License.
 
 import itertools
-import functools
-import operator
 
 def read_element_name(cpu, elem):
     return cpu.get(elem) if isinstance(cpu.get(elem), str) else cpu.get(elem,{}).get('name', cpu['name']+'_'+elem)
@@ -31,13 +29,29 @@ def wrap_list(attr):
         attr = [attr]
     return attr
 
+# Merge the dicts, giving priority to the earliest.
+# If the highest-priority value for a key is a dict, it is merged with all of the lower-priority dicts for that key.
+# If it is a list, it is concatenated with all of the lower-priority lists. Otherwise, it overrides all other values.
+# Keys are ordered by their first appearance, starting from the lowest priority.
 def chain(*dicts):
-    def merge_dicts(x,y):
-        dict_merges = {k:merge_dicts(v, y[k]) for k,v in x.items() if isinstance(v, dict) and isinstance(y.get(k), dict)}
-        list_merges = {k:(v + y[k]) for k,v in x.items() if isinstance(v, list) and isinstance(y.get(k), list)}
-        return dict(itertools.chain(y.items(), x.items(), dict_merges.items(), list_merges.items()))
+    if len(dicts) == 1:
+        return dicts[0]
 
-    return functools.reduce(merge_dicts, dicts)
+    values = {}
+    for d in reversed(dicts):
+        for k,v in d.items():
+            values.setdefault(k, []).append(v)
+
+    def merge_values(vals):
+        head = vals[-1] # the values were gathered in reverse
+        if isinstance(head, dict):
+            return chain(*(v for v in reversed(vals) if isinstance(v, dict)))
+        if isinstance(head, list):
+            lists = [v for v in reversed(vals) if isinstance(v, list)]
+            return lists[0] if len(lists) == 1 else list(itertools.chain(*lists))
+        return head
+
+    return {k: merge_values(v) for k,v in values.items()}
 
 def extend_each(x,y):
     merges = {k: (*x[k],*y[k]) for k in x if k in y}
@@ -46,10 +60,12 @@ def extend_each(x,y):
 def subdict(d, keys):
     return {k:v for k,v in d.items() if k in keys}
 
+# Merge the elements of the iterables that share a name, giving priority to the earliest
 def combine_named(*iterables):
-    iterable = sorted(itertools.chain(*iterables), key=operator.itemgetter('name'))
-    iterable = itertools.groupby(iterable, key=operator.itemgetter('name'))
-    return {kv[0]: chain(*kv[1]) for kv in iterable}
+    groups = {}
+    for elem in itertools.chain(*iterables):
+        groups.setdefault(elem['name'], []).append(elem)
+    return {k: chain(*groups[k]) for k in sorted(groups)}
 
 # Assign defaults that are unique per core
 def upper_levels_for(system, name, key='lower_level'):
@@ -58,3 +74,34 @@ def upper_levels_for(system, name, key='lower_level'):
     upper_levels = itertools.groupby(upper_levels, key=finder)
     return next(filter(lambda kv: kv[0] == name, upper_levels))[1]
 
+
+# Forward and reverse links between the elements of a system.
+# Building the index once avoids rescanning the system for every path and every upper-level lookup.
+class SystemIndex:
+    def __init__(self, *iterables, keys=('lower_level', 'lower_translate')):
+        self.lower = {k: {} for k in keys}
+        self.upper = {k: {} for k in keys}
+        for elem, key in itertools.product(itertools.chain(*iterables), keys):
+            if key in elem:
+                self.upper[key].setdefault(elem[key], []).append(elem)
+                if 'name' in elem:
+                    self.lower[key][elem['name']] = elem[key]
+
+    # The names along the path starting at the given name, stopping if a loop is found
+    def path(self, name, key='lower_level'):
+        visited = set()
+        while name is not None and name not in visited:
+            visited.add(name)
+            yield name
+            name = self.lower[key].get(name)
+
+    # Equivalent to iter_system(), but follows the indexed links
+    def iter_system(self, system, name, key='lower_level'):
+        yield from (system[n] for n in itertools.takewhile(lambda n: n in system, self.path(name, key=key)))
+
+    # Equivalent to upper_levels_for(). The elements are given as they were when the index was built.
+    def upper_levels_for(self, name, key='lower_level'):
+        return self.upper[key].get(name, [])
+
+# The links followed when normalizing a configuration
+topology_keys = ('lower_level', 'lower_translate', 'L1I', 'L1D', 'ITLB', 'DTLB', 'PTW')
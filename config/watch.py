@@ -0,0 +1,109 @@
+#    Copyright 2023 The ChampSim Contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import json
+import os
+import time
+
+from . import parallel
+from . import parse
+from . import util
+
+# Drives the parsing and rendering of configurations.
+# If state is kept, the rendered files for each configuration are held between runs, so that only configurations that changed are parsed again.
+class ConfigureSession:
+    def __init__(self, jobs=1, keep_state=False):
+        self.jobs = jobs
+        self.keep_state = keep_state
+        self.rendered = {}
+        self.used = set()
+
+    def render_uncached(self, writer, config_files, parse_kwargs, write_kwargs, jobs):
+        if jobs > 1:
+            yield from parallel.render_configs(writer, config_files, jobs, write_kwargs, **parse_kwargs)
+        elif self.keep_state:
+            yield from (writer.render_files(parse.parse_config(*c, **parse_kwargs), **write_kwargs) for c in config_files)
+        else:
+            yield from (writer.get_fileparts(parse.parse_config(*c, **parse_kwargs), **write_kwargs) for c in config_files)
+
+    # Yield the rendered build for each configuration, in order
+    def render_all(self, writer, config_files, parse_kwargs, write_kwargs={}, jobs=None):
+        jobs = jobs or self.jobs
+        if not self.keep_state:
+            yield from self.render_uncached(writer, config_files, parse_kwargs, write_kwargs, jobs)
+            return
+
+        # Configurations are read lazily, and only their keys are held until their builds are yielded.
+        # Renders arrive in the order of the configurations that were missing, and each build is yielded once every build before it is ready.
+        keys = collections.deque()
+        waiting = collections.deque()
+        def missing():
+            for c in config_files:
+                k = json.dumps([c, parse_kwargs, write_kwargs], sort_keys=True)
+                keys.append(k)
+                if k not in self.rendered and k not in waiting:
+                    waiting.append(k)
+                    yield c
+
+        def ready():
+            while keys and keys[0] in self.rendered:
+                k = keys.popleft()
+                self.used.add(k)
+                yield self.rendered[k]
+
+        for rendered in self.render_uncached(writer, missing(), parse_kwargs, write_kwargs, jobs):
+            self.rendered[waiting.popleft()] = rendered
+            yield from ready()
+        yield from ready()
+
+    # Forget the configurations that were not used since the last call
+    def prune(self):
+        self.rendered = util.subdict(self.rendered, self.used)
+        self.used = set()
+
+    # Forget all configurations, for instance if the available modules have changed
+    def clear(self):
+        self.rendered = {}
+        self.used = set()
+
+def snapshot(paths):
+    def mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+    return {p: mtime(p) for p in paths}
+
+# The directories and every file beneath them, so that files that are added, removed, or changed may be noticed
+def tree(dirs):
+    for d in dirs:
+        for base, _, files in os.walk(d):
+            yield base
+            yield from (os.path.join(base, f) for f in files)
+
+# Poll the paths, yielding the list of paths that changed whenever any of them do.
+# The paths may be given as a function returning them, in which case they are found again on each poll, and paths that appear or disappear count as changed.
+# Changes are measured from the time of the call, not from the first iteration.
+def watch(paths, interval=1.0):
+    get_paths = paths if callable(paths) else (lambda: paths)
+    def poll(last):
+        while True:
+            time.sleep(interval)
+            current = snapshot(get_paths())
+            changed = [p for p in {**last, **current} if current.get(p) != last.get(p)]
+            last = current
+            if changed:
+                yield changed
+    return poll(snapshot(get_paths()))
@@ -30,13 +30,20 @@
 #include <string>
 #include <vector>
 
+#include "address_constants.h"
 #include "champsim.h"
-#include "champsim_constants.h"
 #include "channel.h"
+#include "cpu_constants.h"
 #include "module_impl.h"
 #include "operable.h"
 #include <type_traits>
 
+namespace champsim::plugin
+{
+struct prefetcher_functions;
+struct replacement_functions;
+} // namespace champsim::plugin
+
 struct cache_stats {
   std::string name;
   // prefetch stats
@@ -258,6 +265,35 @@ public:
     void impl_replacement_final_stats();
   };
 
+  // The replacement functions of a plug-in are given the blocks of a set
+  friend struct champsim::plugin::replacement_functions;
+
+  // Modules that are loaded from plug-ins, in the order they were given
+  struct plugin_model final : module_concept {
+    CACHE* intern_;
+    std::vector<const champsim::plugin::prefetcher_functions*> prefetchers;
+    std::vector<const champsim::plugin::replacement_functions*> replacements;
+    plugin_model(CACHE* cache, std::vector<const champsim::plugin::prefetcher_functions*> prefetchers_,
+                 std::vector<const champsim::plugin::replacement_functions*> replacements_)
+        : intern_(cache), prefetchers(std::move(prefetchers_)), replacements(std::move(replacements_))
+    {
+    }
+
+    void impl_prefetcher_initialize() override;
+    uint32_t impl_prefetcher_cache_operate(uint64_t addr, uint64_t ip, uint8_t cache_hit, bool useful_prefetch, uint8_t type, uint32_t metadata_in) override;
+    uint32_t impl_prefetcher_cache_fill(uint64_t addr, uint32_t set, uint32_t way, uint8_t prefetch, uint64_t evicted_addr, uint32_t metadata_in) override;
+    void impl_prefetcher_cycle_operate() override;
+    void impl_prefetcher_final_stats() override;
+    void impl_prefetcher_branch_operate(uint64_t ip, uint8_t branch_type, uint64_t branch_target) override;
+
+    void impl_initialize_replacement() override;
+    uint32_t impl_find_victim(uint32_t triggering_cpu, uint64_t instr_id, uint32_t set, const BLOCK* current_set, uint64_t ip, uint64_t full_addr,
+                              uint32_t type) override;
+    void impl_update_replacement_state(uint32_t triggering_cpu, uint32_t set, uint32_t way, uint64_t full_addr, uint64_t ip, uint64_t victim_addr,
+                                       uint32_t type, uint8_t hit) override;
+    void impl_replacement_final_stats() override;
+  };
+
   std::unique_ptr<module_concept> module_pimpl;
 
   void impl_prefetcher_initialize() { module_pimpl->impl_prefetcher_initialize(); }
@@ -316,6 +352,8 @@ public:
     std::vector<CACHE::channel_type*> m_uls{};
     CACHE::channel_type* m_ll{};
     CACHE::channel_type* m_lt{nullptr};
+    std::vector<const champsim::plugin::prefetcher_functions*> m_pref_plugins{};
+    std::vector<const champsim::plugin::replacement_functions*> m_repl_plugins{};
 
     friend class CACHE;
 
@@ -324,7 +362,8 @@ public:
         : m_name(other.m_name), m_freq_scale(other.m_freq_scale), m_sets(other.m_sets), m_ways(other.m_ways), m_pq_size(other.m_pq_size),
           m_mshr_size(other.m_mshr_size), m_hit_lat(other.m_hit_lat), m_fill_lat(other.m_fill_lat), m_latency(other.m_latency), m_max_tag(other.m_max_tag),
           m_max_fill(other.m_max_fill), m_offset_bits(other.m_offset_bits), m_pref_load(other.m_pref_load), m_wq_full_addr(other.m_wq_full_addr),
-          m_va_pref(other.m_va_pref), m_pref_act_mask(other.m_pref_act_mask), m_uls(other.m_uls), m_ll(other.m_ll), m_lt(other.m_lt)
+          m_va_pref(other.m_va_pref), m_pref_act_mask(other.m_pref_act_mask), m_uls(other.m_uls), m_ll(other.m_ll), m_lt(other.m_lt),
+          m_pref_plugins(other.m_pref_plugins), m_repl_plugins(other.m_repl_plugins)
     {
     }
 
@@ -442,6 +481,16 @@ public:
       m_lt = lt_;
       return *this;
     }
+    self_type& prefetcher_plugins(std::vector<const champsim::plugin::prefetcher_functions*>&& pref_plugins_)
+    {
+      m_pref_plugins = std::move(pref_plugins_);
+      return *this;
+    }
+    self_type& replacement_plugins(std::vector<const champsim::plugin::replacement_functions*>&& repl_plugins_)
+    {
+      m_repl_plugins = std::move(repl_plugins_);
+      return *this;
+    }
     template <unsigned long long P>
     Builder<P, R_FLAG> prefetcher()
     {
@@ -460,8 +509,18 @@ public:
         NUM_WAY(b.m_ways), MSHR_SIZE(b.m_mshr_size), PQ_SIZE(b.m_pq_size), HIT_LATENCY((b.m_hit_lat > 0) ? b.m_hit_lat : b.m_latency - b.m_fill_lat),
         FILL_LATENCY(b.m_fill_lat), OFFSET_BITS(b.m_offset_bits), MAX_TAG(b.m_max_tag), MAX_FILL(b.m_max_fill), prefetch_as_load(b.m_pref_load),
         match_offset_bits(b.m_wq_full_addr), virtual_prefetch(b.m_va_pref), pref_activate_mask(b.m_pref_act_mask),
-        module_pimpl(std::make_unique<module_model<P_FLAG, R_FLAG>>(this))
+        module_pimpl(make_module<P_FLAG, R_FLAG>(std::move(b.m_pref_plugins), std::move(b.m_repl_plugins)))
+  {
+  }
+
+  // If any plug-ins are given, they replace the modules that were compiled in
+  template <unsigned long long P_FLAG, unsigned long long R_FLAG>
+  std::unique_ptr<module_concept> make_module(std::vector<const champsim::plugin::prefetcher_functions*>&& pref_plugins,
+                                              std::vector<const champsim::plugin::replacement_functions*>&& repl_plugins)
   {
+    if (std::empty(pref_plugins) && std::empty(repl_plugins))
+      return std::make_unique<module_model<P_FLAG, R_FLAG>>(this);
+    return std::make_unique<plugin_model>(this, std::move(pref_plugins), std::move(repl_plugins));
   }
 };
 
@@ -0,0 +1,110 @@
+/*
+ *    Copyright 2023 The ChampSim Contributors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#ifndef CHECKPOINT_H
+#define CHECKPOINT_H
+
+#include <cstddef>
+#include <iosfwd>
+#include <map>
+#include <string>
+#include <type_traits>
+#include <vector>
+
+class CACHE;
+class O3_CPU;
+
+namespace champsim::checkpoint
+{
+/*
+ * The warmed state of a simulation, as a set of named sections of bytes.
+ * Sections are matched by name when a snapshot is restored, so a snapshot may be restored into any binary whose structures of the same name have the same
+ * size. Sections that the restoring binary does not have are ignored.
+ */
+class snapshot
+{
+  std::map<std::string, std::vector<char>> sections;
+
+public:
+  void put(const std::string& name, const void* data, std::size_t size);
+  void get(const std::string& name, void* data, std::size_t size) const;
+  bool contains(const std::string& name) const;
+
+  template <typename T>
+  void put(const std::string& name, const T& value)
+  {
+    static_assert(std::is_trivially_copyable_v<T>);
+    put(name, &value, sizeof(T));
+  }
+
+  template <typename T>
+  void get(const std::string& name, T& value) const
+  {
+    static_assert(std::is_trivially_copyable_v<T>);
+    get(name, &value, sizeof(T));
+  }
+
+  template <typename T>
+  void put(const std::string& name, const std::vector<T>& values)
+  {
+    static_assert(std::is_trivially_copyable_v<T>);
+    put(name, std::data(values), std::size(values) * sizeof(T));
+  }
+
+  // The vector must already have the size of the saved vector
+  template <typename T>
+  void get(const std::string& name, std::vector<T>& values) const
+  {
+    static_assert(std::is_trivially_copyable_v<T>);
+    get(name, std::data(values), std::size(values) * sizeof(T));
+  }
+
+  void put(const std::string& name, const std::string& value);
+  void get(const std::string& name, std::string& value) const;
+
+  void write(std::ostream& stream) const;
+  static snapshot read(std::istream& stream);
+};
+
+/*
+ * Modules keep their state in their own structures, which they register here when they are initialized.
+ * Each region is named by its owner and a key, like "LLC.lru.last_used_cycles", and is saved and restored with the simulator's own state.
+ * A vector is kept at the size it has when it is registered, so it must not be resized afterward. Registering a name again replaces the earlier region.
+ */
+void keep(const std::string& name, void* data, std::size_t size);
+
+std::string owner_name(const CACHE& cache);
+std::string owner_name(const O3_CPU& cpu);
+
+template <typename Owner, typename T>
+void keep(const Owner* owner, const std::string& key, T& value)
+{
+  static_assert(std::is_trivially_copyable_v<T>);
+  keep(owner_name(*owner) + "." + key, &value, sizeof(T));
+}
+
+template <typename Owner, typename T>
+void keep(const Owner* owner, const std::string& key, std::vector<T>& values)
+{
+  static_assert(std::is_trivially_copyable_v<T>);
+  keep(owner_name(*owner) + "." + key, std::data(values), std::size(values) * sizeof(T));
+}
+
+void save_kept(snapshot& snap);
+void restore_kept(const snapshot& snap);
+} // namespace champsim::checkpoint
+
+#endif
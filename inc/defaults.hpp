@@ -17,8 +17,9 @@
 #ifndef DEFAULTS_HPP
 #define DEFAULTS_HPP
 
+#include "address_constants.h"
 #include "cache.h"
-#include "champsim_constants.h"
+#include "cpu_constants.h"
 #include "ooo_cpu.h"
 #include "ptw.h"
 
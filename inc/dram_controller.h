@@ -23,8 +23,8 @@
 #include <optional>
 #include <string>
 
-#include "champsim_constants.h"
 #include "channel.h"
+#include "dram_constants.h"
 #include "operable.h"
 
 struct dram_stats {
@@ -25,6 +25,7 @@
 #include "ooo_cpu.h"
 #include "operable.h"
 #include "ptw.h"
+#include "vmem.h"
 
 namespace champsim
 {
@@ -33,6 +34,7 @@ struct environment {
   virtual std::vector<std::reference_wrapper<CACHE>> cache_view() = 0;
   virtual std::vector<std::reference_wrapper<PageTableWalker>> ptw_view() = 0;
   virtual MEMORY_CONTROLLER& dram_view() = 0;
+  virtual VirtualMemory& vmem_view() = 0;
   virtual std::vector<std::reference_wrapper<operable>> operable_view() = 0;
 };
 } // namespace champsim
@@ -0,0 +1,86 @@
+/*
+ *    Copyright 2023 The ChampSim Contributors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#ifndef MODULE_PLUGIN_H
+#define MODULE_PLUGIN_H
+
+#include <cstdint>
+#include <map>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "cache.h"
+#include "ooo_cpu.h"
+
+namespace champsim::plugin
+{
+/*
+ * The functions of a module that is built as a plug-in. Each is a member of the class the module extends, under the module's mangled name.
+ * A plug-in is a shared object that holds one module, and it returns the table of its functions from the entry point for its kind.
+ */
+struct prefetcher_functions {
+  void (CACHE::*initialize)();
+  uint32_t (CACHE::*cache_operate)(uint64_t, uint64_t, uint8_t, bool, uint8_t, uint32_t);
+  uint32_t (CACHE::*cache_fill)(uint64_t, uint32_t, uint32_t, uint8_t, uint64_t, uint32_t);
+  void (CACHE::*cycle_operate)();
+  void (CACHE::*final_stats)();
+  void (CACHE::*branch_operate)(uint64_t, uint8_t, uint64_t);
+};
+
+struct replacement_functions {
+  void (CACHE::*initialize)();
+  uint32_t (CACHE::*find_victim)(uint32_t, uint64_t, uint32_t, const CACHE::BLOCK*, uint64_t, uint64_t, uint32_t);
+  void (CACHE::*update_replacement_state)(uint32_t, uint32_t, uint32_t, uint64_t, uint64_t, uint64_t, uint32_t, uint8_t);
+  void (CACHE::*final_stats)();
+};
+
+struct branch_predictor_functions {
+  void (O3_CPU::*initialize)();
+  void (O3_CPU::*last_branch_result)(uint64_t, uint64_t, uint8_t, uint8_t);
+  uint8_t (O3_CPU::*predict_branch)(uint64_t);
+};
+
+struct btb_functions {
+  void (O3_CPU::*initialize)();
+  void (O3_CPU::*update_btb)(uint64_t, uint64_t, uint8_t, uint8_t);
+  std::pair<uint64_t, uint8_t> (O3_CPU::*btb_prediction)(uint64_t);
+};
+
+/*
+ * Opens plug-ins by the mangled names of their modules.
+ * A plug-in is first searched for as <name>.so in each directory of the CHAMPSIM_PLUGIN_PATH environment variable, then at the path it was configured with.
+ * Plug-ins stay open for the life of the process, and each is opened once.
+ */
+class loader
+{
+  std::map<std::string, std::string> m_paths;
+  std::vector<std::string> m_search_path;
+  std::map<std::string, void*> m_handles;
+
+  const void* entry(const std::string& name, const char* symbol);
+
+public:
+  explicit loader(std::map<std::string, std::string> paths);
+
+  const prefetcher_functions* prefetcher(const std::string& name);
+  const replacement_functions* replacement(const std::string& name);
+  const branch_predictor_functions* branch_predictor(const std::string& name);
+  const btb_functions* btb(const std::string& name);
+};
+} // namespace champsim::plugin
+
+#endif
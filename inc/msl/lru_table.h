@@ -128,6 +128,13 @@ public:
     return std::exchange(*hit, {}).data;
   }
 
+  // Gives the contents of the table and its count of accesses to the function, so that they may be saved and restored together
+  template <typename F>
+  void visit_state(F&& func)
+  {
+    func(block, access_count);
+  }
+
   lru_table(std::size_t sets, std::size_t ways, SetProj set_proj, TagProj tag_proj)
       : set_projection(set_proj), tag_projection(tag_proj), NUM_SET(sets), NUM_WAY(ways)
   {
@@ -32,9 +32,10 @@
 #include <stdexcept>
 #include <vector>
 
+#include "address_constants.h"
 #include "champsim.h"
-#include "champsim_constants.h"
 #include "channel.h"
+#include "cpu_constants.h"
 #include "instruction.h"
 #include "module_impl.h"
 #include "operable.h"
@@ -61,6 +62,12 @@ public:
   bool issue_write(request_type packet);
 };
 
+namespace champsim::plugin
+{
+struct branch_predictor_functions;
+struct btb_functions;
+} // namespace champsim::plugin
+
 struct cpu_stats {
   std::string name;
   uint64_t begin_instrs = 0, begin_cycles = 0;
@@ -103,7 +110,7 @@ public:
   uint64_t finish_phase_instr = 0;
   uint64_t last_heartbeat_cycle = 0;
   uint64_t last_heartbeat_instr = 0;
-  uint64_t next_print_instruction = STAT_PRINTING_PERIOD;
+  uint64_t next_print_instruction = heartbeat_period();
 
   // instruction
   uint64_t num_retired = 0;
@@ -150,6 +157,9 @@ public:
   CacheBus L1I_bus, L1D_bus;
   CACHE* l1i;
 
+  // The number of instructions between heartbeats
+  static uint64_t heartbeat_period();
+
   void initialize() override final;
   long operate() override final;
   void begin_phase() override final;
@@ -218,6 +228,26 @@ public:
     std::pair<uint64_t, uint8_t> impl_btb_prediction(uint64_t ip);
   };
 
+  // Modules that are loaded from plug-ins, in the order they were given
+  struct plugin_model final : module_concept {
+    O3_CPU* intern_;
+    std::vector<const champsim::plugin::branch_predictor_functions*> branch_predictors;
+    std::vector<const champsim::plugin::btb_functions*> btbs;
+    plugin_model(O3_CPU* core, std::vector<const champsim::plugin::branch_predictor_functions*> branch_predictors_,
+                 std::vector<const champsim::plugin::btb_functions*> btbs_)
+        : intern_(core), branch_predictors(std::move(branch_predictors_)), btbs(std::move(btbs_))
+    {
+    }
+
+    void impl_initialize_branch_predictor() override;
+    void impl_last_branch_result(uint64_t ip, uint64_t target, uint8_t taken, uint8_t branch_type) override;
+    uint8_t impl_predict_branch(uint64_t ip) override;
+
+    void impl_initialize_btb() override;
+    void impl_update_btb(uint64_t ip, uint64_t predicted_target, uint8_t taken, uint8_t branch_type) override;
+    std::pair<uint64_t, uint8_t> impl_btb_prediction(uint64_t ip) override;
+  };
+
   std::unique_ptr<module_concept> module_pimpl;
 
   void impl_initialize_branch_predictor() { module_pimpl->impl_initialize_branch_predictor(); }
@@ -272,6 +302,8 @@ public:
     long int m_l1d_bw{};
     champsim::channel* m_fetch_queues{};
     champsim::channel* m_data_queues{};
+    std::vector<const champsim::plugin::branch_predictor_functions*> m_bp_plugins{};
+    std::vector<const champsim::plugin::btb_functions*> m_btb_plugins{};
 
     friend class O3_CPU;
 
@@ -284,7 +316,8 @@ public:
           m_schedule_width(other.m_schedule_width), m_execute_width(other.m_execute_width), m_lq_width(other.m_lq_width), m_sq_width(other.m_sq_width),
           m_retire_width(other.m_retire_width), m_mispredict_penalty(other.m_mispredict_penalty), m_decode_latency(other.m_decode_latency),
           m_dispatch_latency(other.m_dispatch_latency), m_schedule_latency(other.m_schedule_latency), m_execute_latency(other.m_execute_latency),
-          m_l1i(other.m_l1i), m_l1i_bw(other.m_l1i_bw), m_l1d_bw(other.m_l1d_bw), m_fetch_queues(other.m_fetch_queues), m_data_queues(other.m_data_queues)
+          m_l1i(other.m_l1i), m_l1i_bw(other.m_l1i_bw), m_l1d_bw(other.m_l1d_bw), m_fetch_queues(other.m_fetch_queues), m_data_queues(other.m_data_queues),
+          m_bp_plugins(other.m_bp_plugins), m_btb_plugins(other.m_btb_plugins)
     {
     }
 
@@ -437,6 +470,16 @@ public:
       return *this;
     }
 
+    self_type& branch_predictor_plugins(std::vector<const champsim::plugin::branch_predictor_functions*>&& bp_plugins_)
+    {
+      m_bp_plugins = std::move(bp_plugins_);
+      return *this;
+    }
+    self_type& btb_plugins(std::vector<const champsim::plugin::btb_functions*>&& btb_plugins_)
+    {
+      m_btb_plugins = std::move(btb_plugins_);
+      return *this;
+    }
     template <unsigned long long B>
     Builder<B, T_FLAG> branch_predictor()
     {
@@ -457,8 +500,19 @@ public:
         SCHEDULER_SIZE(b.m_schedule_width), EXEC_WIDTH(b.m_execute_width), LQ_WIDTH(b.m_lq_width), SQ_WIDTH(b.m_sq_width), RETIRE_WIDTH(b.m_retire_width),
         BRANCH_MISPREDICT_PENALTY(b.m_mispredict_penalty), DISPATCH_LATENCY(b.m_dispatch_latency), DECODE_LATENCY(b.m_decode_latency),
         SCHEDULING_LATENCY(b.m_schedule_latency), EXEC_LATENCY(b.m_execute_latency), L1I_BANDWIDTH(b.m_l1i_bw), L1D_BANDWIDTH(b.m_l1d_bw),
-        L1I_bus(b.m_cpu, b.m_fetch_queues), L1D_bus(b.m_cpu, b.m_data_queues), l1i(b.m_l1i), module_pimpl(std::make_unique<module_model<B_FLAG, T_FLAG>>(this))
+        L1I_bus(b.m_cpu, b.m_fetch_queues), L1D_bus(b.m_cpu, b.m_data_queues), l1i(b.m_l1i),
+        module_pimpl(make_module<B_FLAG, T_FLAG>(std::move(b.m_bp_plugins), std::move(b.m_btb_plugins)))
+  {
+  }
+
+  // If any plug-ins are given, they replace the modules that were compiled in
+  template <unsigned long long B_FLAG, unsigned long long T_FLAG>
+  std::unique_ptr<module_concept> make_module(std::vector<const champsim::plugin::branch_predictor_functions*>&& bp_plugins,
+                                              std::vector<const champsim::plugin::btb_functions*>&& btb_plugins)
   {
+    if (std::empty(bp_plugins) && std::empty(btb_plugins))
+      return std::make_unique<module_model<B_FLAG, T_FLAG>>(this);
+    return std::make_unique<plugin_model>(this, std::move(bp_plugins), std::move(btb_plugins));
   }
 };
 
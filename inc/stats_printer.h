@@ -53,4 +53,18 @@ public:
   json_printer(std::ostream& str) : stream(str) {}
   void print(std::vector<phase_stats>& stats);
 };
+
+/*
+ * Writes statistics as they are produced, one JSON document per line, so that they may be followed while the simulation runs.
+ * Each line is flushed as it is written, so the lines written before a simulation is killed are kept.
+ */
+class json_stream_printer
+{
+  std::ostream& stream;
+
+public:
+  json_stream_printer(std::ostream& str) : stream(str) {}
+  void print_heartbeat(const phase_stats& stats, uint32_t cpu, long long elapsed_seconds);
+  void print(const phase_stats& stats, bool is_warmup);
+};
 } // namespace champsim
@@ -20,9 +20,13 @@
 #include <cstdint>
 #include <map>
 
-#include "champsim_constants.h"
+#include "address_constants.h"
 
 class MEMORY_CONTROLLER;
+namespace champsim::checkpoint
+{
+class snapshot;
+}
 
 // reserve 1MB or one page of space
 inline constexpr auto VMEM_RESERVE_CAPACITY = std::max<uint64_t>(PAGE_SIZE, 1ull << 20);
@@ -55,6 +59,10 @@ public:
   std::size_t available_ppages() const;
   std::pair<uint64_t, uint64_t> va_to_pa(uint32_t cpu_num, uint64_t vaddr);
   std::pair<uint64_t, uint64_t> get_pte_pa(uint32_t cpu_num, uint64_t vaddr, std::size_t level);
+
+  // The page maps are saved and restored with the rest of the warmed state
+  void save(champsim::checkpoint::snapshot& snap) const;
+  void restore(const champsim::checkpoint::snapshot& snap);
 };
 
 #endif
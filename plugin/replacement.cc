@@ -0,0 +1,26 @@
+/*
+ *    Copyright 2023 The ChampSim Contributors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#include "cache.h"
+#include "module_plugin.h"
+
+// Compiled with the module's map of names, so that each function is found under the module's mangled name
+extern "C" const void* champsim_replacement_plugin()
+{
+  static const champsim::plugin::replacement_functions functions{&CACHE::initialize_replacement, &CACHE::find_victim, &CACHE::update_replacement_state,
+                                                                 &CACHE::replacement_final_stats};
+  return &functions;
+}
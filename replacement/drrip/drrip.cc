@@ -4,6 +4,7 @@
 #include <utility>
 
 #include "cache.h"
+#include "checkpoint.h"
 #include "msl/fwcounter.h"
 
 namespace
@@ -39,6 +40,12 @@ void CACHE::initialize_replacement()
   }
 
   ::rrpv.insert({this, std::vector<unsigned>(NUM_SET * NUM_WAY)});
+
+  // the sampler sets are chosen the same way each time, so only the counters are kept
+  champsim::checkpoint::keep(this, "drrip.rrpv", ::rrpv[this]);
+  champsim::checkpoint::keep(this, "drrip.bip_counter", ::bip_counter[this]);
+  for (std::size_t cpu = 0; cpu < NUM_CPUS; ++cpu)
+    champsim::checkpoint::keep(this, "drrip.psel" + std::to_string(cpu), ::PSEL[std::make_pair(this, cpu)]);
 }
 
 // called on every cache hit and cache fill
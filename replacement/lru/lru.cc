@@ -4,13 +4,18 @@
 #include <vector>
 
 #include "cache.h"
+#include "checkpoint.h"
 
 namespace
 {
 std::map<CACHE*, std::vector<uint64_t>> last_used_cycles;
 }
 
-void CACHE::initialize_replacement() { ::last_used_cycles[this] = std::vector<uint64_t>(NUM_SET * NUM_WAY); }
+void CACHE::initialize_replacement()
+{
+  ::last_used_cycles[this] = std::vector<uint64_t>(NUM_SET * NUM_WAY);
+  champsim::checkpoint::keep(this, "lru.last_used_cycles", ::last_used_cycles[this]);
+}
 
 uint32_t CACHE::find_victim(uint32_t triggering_cpu, uint64_t instr_id, uint32_t set, const BLOCK* current_set, uint64_t ip, uint64_t full_addr, uint32_t type)
 {
@@ -6,6 +6,7 @@
 #include <vector>
 
 #include "cache.h"
+#include "checkpoint.h"
 #include "msl/bits.h"
 
 namespace
@@ -57,6 +58,12 @@ void CACHE::initialize_replacement()
   sampler.emplace(this, ::SAMPLER_SET * NUM_WAY);
 
   ::rrpv_values[this] = std::vector<int>(NUM_SET * NUM_WAY, ::maxRRPV);
+
+  // the sampler sets are chosen the same way each time, so only the contents of the sampler are kept
+  champsim::checkpoint::keep(this, "ship.sampler", ::sampler[this]);
+  champsim::checkpoint::keep(this, "ship.rrpv", ::rrpv_values[this]);
+  for (std::size_t cpu = 0; cpu < NUM_CPUS; ++cpu)
+    champsim::checkpoint::keep(this, "ship.shct" + std::to_string(cpu), ::SHCT[std::make_pair(this, cpu)]);
 }
 
 // find replacement victim
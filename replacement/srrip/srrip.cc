@@ -1,6 +1,7 @@
 #include <cassert>
 
 #include "cache.h"
+#include "checkpoint.h"
 #include <unordered_map>
 
 namespace
@@ -10,7 +11,11 @@ std::unordered_map<CACHE*, std::vector<int>> rrpv_values;
 } // namespace
 
 // initialize replacement state
-void CACHE::initialize_replacement() { ::rrpv_values[this] = std::vector<int>(NUM_SET * NUM_WAY, ::maxRRPV); }
+void CACHE::initialize_replacement()
+{
+  ::rrpv_values[this] = std::vector<int>(NUM_SET * NUM_WAY, ::maxRRPV);
+  champsim::checkpoint::keep(this, "srrip.rrpv", ::rrpv_values[this]);
+}
 
 // find replacement victim
 uint32_t CACHE::find_victim(uint32_t triggering_cpu, uint64_t instr_id, uint32_t set, const BLOCK* current_set, uint64_t ip, uint64_t full_addr, uint32_t type)
@@ -24,8 +24,8 @@
 #include <fmt/core.h>
 #include <fmt/ranges.h>
 
+#include "address_constants.h"
 #include "champsim.h"
-#include "champsim_constants.h"
 #include "deadlock.h"
 #include "instruction.h"
 #include "util/algorithm.h"
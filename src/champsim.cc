@@ -17,14 +17,21 @@
 #include "champsim.h"
 
 #include <algorithm>
+#include <array>
 #include <chrono>
+#include <filesystem>
 #include <numeric>
+#include <ostream>
+#include <stdexcept>
 #include <vector>
 
+#include "address_constants.h"
+#include "checkpoint.h"
 #include "environment.h"
 #include "ooo_cpu.h"
 #include "operable.h"
 #include "phase_info.h"
+#include "stats_printer.h"
 #include "tracereader.h"
 #include <fmt/chrono.h>
 #include <fmt/core.h>
@@ -37,7 +44,64 @@ std::chrono::seconds elapsed_time() { return std::chrono::duration_cast<std::chr
 
 namespace champsim
 {
-phase_stats do_phase(phase_info phase, environment& env, std::vector<tracereader>& traces)
+// The statistics of the phase so far. The statistics of CPUs that have not completed the phase are taken to the current cycle.
+phase_stats get_phase_stats(const phase_info& phase, environment& env, const std::vector<bool>& phase_complete)
+{
+  const auto& [phase_name, is_warmup, length, trace_index, trace_names] = phase;
+  bool all_complete = std::accumulate(std::begin(phase_complete), std::end(phase_complete), true, std::logical_and{});
+
+  phase_stats stats;
+  stats.name = phase_name;
+
+  for (std::size_t i = 0; i < std::size(trace_index); ++i)
+    stats.trace_names.push_back(trace_names.at(trace_index.at(i)));
+
+  auto cpus = env.cpu_view();
+  std::transform(std::begin(cpus), std::end(cpus), std::back_inserter(stats.sim_cpu_stats), [&](const O3_CPU& cpu) {
+    auto cpu_stats = cpu.sim_stats;
+    if (!phase_complete.at(cpu.cpu)) {
+      cpu_stats.end_instrs = cpu_stats.begin_instrs + cpu.sim_instr();
+      cpu_stats.end_cycles = cpu.current_cycle;
+    }
+    return cpu_stats;
+  });
+  std::transform(std::begin(cpus), std::end(cpus), std::back_inserter(stats.roi_cpu_stats), [](const O3_CPU& cpu) { return cpu.roi_stats; });
+
+  // The average miss latency is found when the phase ends
+  auto caches = env.cache_view();
+  std::transform(std::begin(caches), std::end(caches), std::back_inserter(stats.sim_cache_stats), [all_complete](const CACHE& cache) {
+    auto cache_stats = cache.sim_stats;
+    if (!all_complete) {
+      auto total_miss = std::accumulate(std::begin(cache_stats.misses), std::end(cache_stats.misses), 0ull,
+                                        [](auto acc, const auto& type_misses) { return std::accumulate(std::begin(type_misses), std::end(type_misses), acc); });
+      cache_stats.avg_miss_latency = std::ceil(cache_stats.total_miss_latency) / std::ceil(total_miss);
+    }
+    return cache_stats;
+  });
+  std::transform(std::begin(caches), std::end(caches), std::back_inserter(stats.roi_cache_stats), [](const CACHE& cache) { return cache.roi_stats; });
+
+  auto dram = env.dram_view();
+  std::transform(std::begin(dram.channels), std::end(dram.channels), std::back_inserter(stats.sim_dram_stats),
+                 [](const DRAM_CHANNEL& chan) { return chan.sim_stats; });
+  std::transform(std::begin(dram.channels), std::end(dram.channels), std::back_inserter(stats.roi_dram_stats),
+                 [](const DRAM_CHANNEL& chan) { return chan.roi_stats; });
+
+  return stats;
+}
+
+// Stream the statistics so far for each CPU that has passed its next heartbeat, and move its next heartbeat on by one period
+void stream_heartbeats(const phase_info& phase, environment& env, const std::vector<bool>& phase_complete, std::vector<uint64_t>& next_heartbeat,
+                       json_stream_printer& stream)
+{
+  for (O3_CPU& cpu : env.cpu_view()) {
+    if (!phase_complete.at(cpu.cpu) && cpu.sim_instr() >= next_heartbeat.at(cpu.cpu)) {
+      stream.print_heartbeat(get_phase_stats(phase, env, phase_complete), cpu.cpu, elapsed_time().count());
+      next_heartbeat.at(cpu.cpu) += O3_CPU::heartbeat_period();
+    }
+  }
+}
+
+phase_stats do_phase(phase_info phase, environment& env, std::vector<tracereader>& traces, json_stream_printer* stream)
 {
   auto [phase_name, is_warmup, length, trace_index, trace_names] = phase;
   auto operables = env.operable_view();
@@ -51,6 +115,7 @@ phase_stats do_phase(phase_info phase, environment& env, std::vector<tracereader
   // Perform phase
   int stalled_cycle{0};
   std::vector<bool> phase_complete(std::size(env.cpu_view()), false);
+  std::vector<uint64_t> next_heartbeat(std::size(env.cpu_view()), O3_CPU::heartbeat_period());
   while (!std::accumulate(std::begin(phase_complete), std::end(phase_complete), true, std::logical_and{})) {
     auto next_phase_complete = phase_complete;
 
@@ -102,6 +167,10 @@ phase_stats do_phase(phase_info phase, environment& env, std::vector<tracereader
     }
 
     phase_complete = next_phase_complete;
+
+    // Stream the statistics so far each time a CPU passes a heartbeat
+    if (stream != nullptr)
+      stream_heartbeats(phase, env, phase_complete, next_heartbeat, *stream);
   }
 
   for (O3_CPU& cpu : env.cpu_view()) {
@@ -109,40 +178,136 @@ phase_stats do_phase(phase_info phase, environment& env, std::vector<tracereader
                cpu.sim_instr(), cpu.sim_cycle(), std::ceil(cpu.sim_instr()) / std::ceil(cpu.sim_cycle()), elapsed_time());
   }
 
-  phase_stats stats;
-  stats.name = phase.name;
+  return get_phase_stats(phase, env, phase_complete);
+}
 
-  for (std::size_t i = 0; i < std::size(trace_index); ++i)
-    stats.trace_names.push_back(trace_names.at(trace_index.at(i)));
+// The sizes that the saved addresses depend on
+std::array<uint64_t, 3> checkpoint_constants() { return {PAGE_SIZE, BLOCK_SIZE, NUM_CPUS}; }
 
-  auto cpus = env.cpu_view();
-  std::transform(std::begin(cpus), std::end(cpus), std::back_inserter(stats.sim_cpu_stats), [](const O3_CPU& cpu) { return cpu.sim_stats; });
-  std::transform(std::begin(cpus), std::end(cpus), std::back_inserter(stats.roi_cpu_stats), [](const O3_CPU& cpu) { return cpu.roi_stats; });
+// The warmed state of the caches, tables, and page maps, with the position of each trace and the state kept by modules.
+// Instructions that are in flight are not saved: the next phase fetches them again.
+checkpoint::snapshot save_checkpoint(environment& env, const phase_info& phase)
+{
+  checkpoint::snapshot snap;
+  snap.put("constants", checkpoint_constants());
 
-  auto caches = env.cache_view();
-  std::transform(std::begin(caches), std::end(caches), std::back_inserter(stats.sim_cache_stats), [](const CACHE& cache) { return cache.sim_stats; });
-  std::transform(std::begin(caches), std::end(caches), std::back_inserter(stats.roi_cache_stats), [](const CACHE& cache) { return cache.roi_stats; });
+  for (O3_CPU& cpu : env.cpu_view()) {
+    auto name = checkpoint::owner_name(cpu);
+    const auto& trace_name = phase.trace_names.at(phase.trace_index.at(cpu.cpu));
+    snap.put(name + ".trace", trace_name);
+    snap.put(name + ".current_cycle", cpu.current_cycle);
+    snap.put(name + ".instructions",
+             std::array<uint64_t, 4>{cpu.num_retired, cpu.last_heartbeat_instr, cpu.last_heartbeat_cycle, cpu.next_print_instruction});
+    cpu.DIB.visit_state([&](const auto& blocks, auto access_count) {
+      snap.put(name + ".DIB", blocks);
+      snap.put(name + ".DIB.access_count", access_count);
+    });
+  }
 
-  auto dram = env.dram_view();
-  std::transform(std::begin(dram.channels), std::end(dram.channels), std::back_inserter(stats.sim_dram_stats),
-                 [](const DRAM_CHANNEL& chan) { return chan.sim_stats; });
-  std::transform(std::begin(dram.channels), std::end(dram.channels), std::back_inserter(stats.roi_dram_stats),
-                 [](const DRAM_CHANNEL& chan) { return chan.roi_stats; });
+  for (CACHE& cache : env.cache_view()) {
+    snap.put(cache.NAME + ".current_cycle", cache.current_cycle);
+    snap.put(cache.NAME + ".blocks", cache.block);
+  }
 
-  return stats;
+  for (PageTableWalker& ptw : env.ptw_view()) {
+    snap.put(ptw.NAME + ".current_cycle", ptw.current_cycle);
+    for (std::size_t level = 0; level < std::size(ptw.pscl); ++level) {
+      ptw.pscl.at(level).visit_state([&](const auto& blocks, auto access_count) {
+        snap.put(ptw.NAME + ".pscl" + std::to_string(level), blocks);
+        snap.put(ptw.NAME + ".pscl" + std::to_string(level) + ".access_count", access_count);
+      });
+    }
+  }
+
+  snap.put("DRAM.current_cycle", env.dram_view().current_cycle);
+  env.vmem_view().save(snap);
+  checkpoint::save_kept(snap);
+  return snap;
+}
+
+// Restores the warmed state, and moves each trace to the first instruction that was not retired when it was saved
+void restore_checkpoint(environment& env, const phase_info& phase, std::vector<tracereader>& traces, const checkpoint::snapshot& snap)
+{
+  std::array<uint64_t, 3> constants{};
+  snap.get("constants", constants);
+  if (constants != checkpoint_constants())
+    throw std::invalid_argument{"The page size, block size, or number of CPUs of the checkpoint does not match this simulator"};
+
+  for (O3_CPU& cpu : env.cpu_view()) {
+    auto name = checkpoint::owner_name(cpu);
+    const auto& trace_name = phase.trace_names.at(phase.trace_index.at(cpu.cpu));
+    std::string saved_trace_name;
+    snap.get(name + ".trace", saved_trace_name);
+    if (std::filesystem::path{saved_trace_name}.filename() != std::filesystem::path{trace_name}.filename())
+      throw std::invalid_argument{"The checkpoint of " + name + " was taken with the trace " + saved_trace_name + ", not " + trace_name};
+
+    snap.get(name + ".current_cycle", cpu.current_cycle);
+    std::array<uint64_t, 4> instructions{};
+    snap.get(name + ".instructions", instructions);
+    cpu.num_retired = instructions.at(0);
+    cpu.last_heartbeat_instr = instructions.at(1);
+    cpu.last_heartbeat_cycle = instructions.at(2);
+    cpu.next_print_instruction = instructions.at(3);
+    cpu.DIB.visit_state([&](auto& blocks, auto& access_count) {
+      snap.get(name + ".DIB", blocks);
+      snap.get(name + ".DIB.access_count", access_count);
+    });
+  }
+
+  for (CACHE& cache : env.cache_view()) {
+    snap.get(cache.NAME + ".current_cycle", cache.current_cycle);
+    snap.get(cache.NAME + ".blocks", cache.block);
+  }
+
+  for (PageTableWalker& ptw : env.ptw_view()) {
+    snap.get(ptw.NAME + ".current_cycle", ptw.current_cycle);
+    for (std::size_t level = 0; level < std::size(ptw.pscl); ++level) {
+      ptw.pscl.at(level).visit_state([&](auto& blocks, auto& access_count) {
+        snap.get(ptw.NAME + ".pscl" + std::to_string(level), blocks);
+        snap.get(ptw.NAME + ".pscl" + std::to_string(level) + ".access_count", access_count);
+      });
+    }
+  }
+
+  snap.get("DRAM.current_cycle", env.dram_view().current_cycle);
+  env.vmem_view().restore(snap);
+  checkpoint::restore_kept(snap);
+
+  // Each trace is read up to the position where the warmup left it
+  for (O3_CPU& cpu : env.cpu_view()) {
+    auto& trace = traces.at(phase.trace_index.at(cpu.cpu));
+    for (uint64_t i = 0; i < cpu.num_retired && !trace.eof(); ++i)
+      trace();
+  }
 }
 
 // simulation entry point
-std::vector<phase_stats> main(environment& env, std::vector<phase_info>& phases, std::vector<tracereader>& traces)
+// If a stream is given, the statistics are also written to it as the simulation runs, including those of the warmup phases.
+// If a checkpoint is given, the warmup phases are skipped and the simulation begins from its state. If a stream is given to save a checkpoint, the state at the
+// end of the warmup phases is written to it.
+std::vector<phase_stats> main(environment& env, std::vector<phase_info>& phases, std::vector<tracereader>& traces, json_stream_printer* stream,
+                              const checkpoint::snapshot* restore_from, std::ostream* save_to)
 {
   for (champsim::operable& op : env.operable_view())
     op.initialize();
 
+  auto first_detailed = std::find_if_not(std::begin(phases), std::end(phases), [](const phase_info& phase) { return phase.is_warmup; });
+  if (restore_from != nullptr && first_detailed != std::end(phases))
+    restore_checkpoint(env, *first_detailed, traces, *restore_from);
+
   std::vector<phase_stats> results;
-  for (auto phase : phases) {
-    auto stats = do_phase(phase, env, traces);
-    if (!phase.is_warmup)
+  for (auto it = std::begin(phases); it != std::end(phases); ++it) {
+    if (restore_from != nullptr && it->is_warmup)
+      continue;
+
+    auto stats = do_phase(*it, env, traces, stream);
+    if (stream != nullptr)
+      stream->print(stats, it->is_warmup);
+    if (!it->is_warmup)
       results.push_back(stats);
+
+    if (save_to != nullptr && first_detailed != std::end(phases) && std::next(it) == first_detailed)
+      save_checkpoint(env, *first_detailed).write(*save_to);
   }
 
   return results;
@@ -0,0 +1,143 @@
+/*
+ *    Copyright 2023 The ChampSim Contributors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#include "checkpoint.h"
+
+#include <algorithm>
+#include <array>
+#include <cstdint>
+#include <istream>
+#include <ostream>
+#include <stdexcept>
+
+#include "cache.h"
+#include "ooo_cpu.h"
+
+namespace
+{
+// A snapshot file begins with this, followed by the format version
+constexpr char snapshot_magic[8] = {'C', 'H', 'A', 'M', 'P', 'C', 'K', 'P'};
+constexpr uint32_t snapshot_version = 1;
+
+struct region {
+  void* data;
+  std::size_t size;
+};
+
+std::map<std::string, region>& kept_regions()
+{
+  static std::map<std::string, region> regions;
+  return regions;
+}
+
+template <typename T>
+void write_value(std::ostream& stream, T value)
+{
+  stream.write(reinterpret_cast<const char*>(&value), sizeof(T));
+}
+
+template <typename T>
+T read_value(std::istream& stream)
+{
+  T value{};
+  if (!stream.read(reinterpret_cast<char*>(&value), sizeof(T)))
+    throw std::runtime_error{"The checkpoint is cut short"};
+  return value;
+}
+} // namespace
+
+void champsim::checkpoint::snapshot::put(const std::string& name, const void* data, std::size_t size)
+{
+  auto bytes = static_cast<const char*>(data);
+  sections.insert_or_assign(name, std::vector<char>(bytes, bytes + size));
+}
+
+void champsim::checkpoint::snapshot::get(const std::string& name, void* data, std::size_t size) const
+{
+  auto found = sections.find(name);
+  if (found == std::end(sections))
+    throw std::invalid_argument{"The checkpoint does not hold " + name};
+  if (std::size(found->second) != size)
+    throw std::invalid_argument{"The size of " + name + " in the checkpoint (" + std::to_string(std::size(found->second))
+                                + " bytes) does not match this simulator (" + std::to_string(size) + " bytes)"};
+  std::copy(std::begin(found->second), std::end(found->second), static_cast<char*>(data));
+}
+
+void champsim::checkpoint::snapshot::put(const std::string& name, const std::string& value) { put(name, std::data(value), std::size(value)); }
+
+// Strings are read at the length they were saved with
+void champsim::checkpoint::snapshot::get(const std::string& name, std::string& value) const
+{
+  auto found = sections.find(name);
+  if (found == std::end(sections))
+    throw std::invalid_argument{"The checkpoint does not hold " + name};
+  value.assign(std::begin(found->second), std::end(found->second));
+}
+
+bool champsim::checkpoint::snapshot::contains(const std::string& name) const { return sections.count(name) > 0; }
+
+void champsim::checkpoint::snapshot::write(std::ostream& stream) const
+{
+  stream.write(std::data(snapshot_magic), std::size(snapshot_magic));
+  write_value(stream, snapshot_version);
+  write_value<uint64_t>(stream, std::size(sections));
+  for (const auto& [name, bytes] : sections) {
+    write_value<uint64_t>(stream, std::size(name));
+    stream.write(std::data(name), static_cast<std::streamsize>(std::size(name)));
+    write_value<uint64_t>(stream, std::size(bytes));
+    stream.write(std::data(bytes), static_cast<std::streamsize>(std::size(bytes)));
+  }
+}
+
+auto champsim::checkpoint::snapshot::read(std::istream& stream) -> snapshot
+{
+  std::array<char, std::size(snapshot_magic)> magic{};
+  stream.read(std::data(magic), std::size(magic));
+  if (!stream || !std::equal(std::begin(magic), std::end(magic), std::begin(snapshot_magic)))
+    throw std::invalid_argument{"The file is not a checkpoint"};
+  if (auto version = read_value<uint32_t>(stream); version != snapshot_version)
+    throw std::invalid_argument{"The checkpoint has version " + std::to_string(version) + ", but this simulator reads version "
+                                + std::to_string(snapshot_version)};
+
+  snapshot result;
+  for (auto count = read_value<uint64_t>(stream); count > 0; --count) {
+    std::string name(read_value<uint64_t>(stream), '\0');
+    stream.read(std::data(name), static_cast<std::streamsize>(std::size(name)));
+    std::vector<char> bytes(read_value<uint64_t>(stream));
+    stream.read(std::data(bytes), static_cast<std::streamsize>(std::size(bytes)));
+    if (!stream)
+      throw std::runtime_error{"The checkpoint is cut short"};
+    result.sections.insert_or_assign(std::move(name), std::move(bytes));
+  }
+  return result;
+}
+
+void champsim::checkpoint::keep(const std::string& name, void* data, std::size_t size) { kept_regions().insert_or_assign(name, region{data, size}); }
+
+std::string champsim::checkpoint::owner_name(const CACHE& cache) { return cache.NAME; }
+std::string champsim::checkpoint::owner_name(const O3_CPU& cpu) { return "cpu" + std::to_string(cpu.cpu); }
+
+void champsim::checkpoint::save_kept(snapshot& snap)
+{
+  for (const auto& [name, kept] : kept_regions())
+    snap.put(name, kept.data, kept.size);
+}
+
+void champsim::checkpoint::restore_kept(const snapshot& snap)
+{
+  for (const auto& [name, kept] : kept_regions())
+    snap.get(name, kept.data, kept.size);
+}
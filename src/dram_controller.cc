@@ -20,8 +20,9 @@
 #include <cfenv>
 #include <cmath>
 
-#include "champsim_constants.h"
+#include "address_constants.h"
 #include "deadlock.h"
+#include "dram_controller_constants.h"
 #include "instruction.h"
 #include "util/span.h"
 #include <fmt/core.h>
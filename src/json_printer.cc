@@ -69,27 +69,45 @@ void to_json(nlohmann::json& j, const DRAM_CHANNEL::stats_type stats)
                      {"AVG DBUS CONGESTED CYCLE", std::ceil(stats.dbus_cycle_congested) / std::ceil(stats.dbus_count_congested)}};
 }
 
+std::map<std::string, nlohmann::json> region_json(const std::vector<O3_CPU::stats_type>& cpu_stats, const std::vector<CACHE::stats_type>& cache_stats,
+                                                  const std::vector<DRAM_CHANNEL::stats_type>& dram_stats)
+{
+  std::map<std::string, nlohmann::json> region_stats;
+  region_stats.emplace("cores", cpu_stats);
+  region_stats.emplace("DRAM", dram_stats);
+  for (auto x : cache_stats)
+    region_stats.emplace(x.name, x);
+  return region_stats;
+}
+
 namespace champsim
 {
 void to_json(nlohmann::json& j, const champsim::phase_stats stats)
 {
-  std::map<std::string, nlohmann::json> roi_stats;
-  roi_stats.emplace("cores", stats.roi_cpu_stats);
-  roi_stats.emplace("DRAM", stats.roi_dram_stats);
-  for (auto x : stats.roi_cache_stats)
-    roi_stats.emplace(x.name, x);
-
-  std::map<std::string, nlohmann::json> sim_stats;
-  sim_stats.emplace("cores", stats.sim_cpu_stats);
-  sim_stats.emplace("DRAM", stats.sim_dram_stats);
-  for (auto x : stats.sim_cache_stats)
-    sim_stats.emplace(x.name, x);
-
   std::map<std::string, nlohmann::json> statsmap{{"name", stats.name}, {"traces", stats.trace_names}};
-  statsmap.emplace("roi", roi_stats);
-  statsmap.emplace("sim", sim_stats);
+  statsmap.emplace("roi", region_json(stats.roi_cpu_stats, stats.roi_cache_stats, stats.roi_dram_stats));
+  statsmap.emplace("sim", region_json(stats.sim_cpu_stats, stats.sim_cache_stats, stats.sim_dram_stats));
   j = statsmap;
 }
 } // namespace champsim
 
 void champsim::json_printer::print(std::vector<phase_stats>& stats) { stream << nlohmann::json::array_t{std::begin(stats), std::end(stats)}; }
+
+// The region of interest of a phase is only known when it completes, so a heartbeat has only the statistics of the phase so far
+void champsim::json_stream_printer::print_heartbeat(const phase_stats& stats, uint32_t cpu, long long elapsed_seconds)
+{
+  nlohmann::json line{{"type", "heartbeat"},
+                      {"phase", stats.name},
+                      {"cpu", cpu},
+                      {"elapsed seconds", elapsed_seconds},
+                      {"sim", region_json(stats.sim_cpu_stats, stats.sim_cache_stats, stats.sim_dram_stats)}};
+  stream << line.dump() << std::endl;
+}
+
+void champsim::json_stream_printer::print(const phase_stats& stats, bool is_warmup)
+{
+  nlohmann::json line = stats;
+  line["type"] = "phase";
+  line["warmup"] = is_warmup;
+  stream << line.dump() << std::endl;
+}
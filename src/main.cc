@@ -15,14 +15,19 @@
  */
 
 #include <algorithm>
+#include <cstdio>
+#include <filesystem>
 #include <fstream>
 #include <numeric>
+#include <optional>
 #include <string>
 #include <vector>
 
+#include "address_constants.h"
 #include "champsim.h"
-#include "champsim_constants.h"
+#include "checkpoint.h"
 #include "core_inst.inc"
+#include "cpu_constants.h"
 #include "phase_info.h"
 #include "stats_printer.h"
 #include "tracereader.h"
@@ -32,28 +37,40 @@
 
 namespace champsim
 {
-std::vector<phase_stats> main(environment& env, std::vector<phase_info>& phases, std::vector<tracereader>& traces);
+std::vector<phase_stats> main(environment& env, std::vector<phase_info>& phases, std::vector<tracereader>& traces, json_stream_printer* stream,
+                              const checkpoint::snapshot* restore_from, std::ostream* save_to);
 }
 
-int main(int argc, char** argv)
+namespace
 {
-  champsim::configured::generated_environment gen_environment{};
+// argv[0] does not name the executable if it was found through PATH or run through a symbolic link, so the kernel's link to the executable is read instead.
+// Executables that share a binary are hard links to it, which the kernel's link tells apart.
+[[maybe_unused]] std::string executable_path(const char* argv0)
+{
+  std::error_code ec;
+  auto path = std::filesystem::read_symlink("/proc/self/exe", ec);
+  if (ec)
+    return argv0;
+  return path.string();
+}
+} // namespace
 
+int main(int argc, char** argv)
+{
   CLI::App app{"A microarchitecture simulator for research and education"};
 
   bool knob_cloudsuite{false};
+  bool hide_heartbeat{false};
   uint64_t warmup_instructions = 0;
   uint64_t simulation_instructions = std::numeric_limits<uint64_t>::max();
   std::string json_file_name;
+  std::string json_stream_file_name;
+  std::string save_checkpoint_file_name;
+  std::string restore_checkpoint_file_name;
   std::vector<std::string> trace_names;
 
-  auto set_heartbeat_callback = [&](auto) {
-    for (O3_CPU& cpu : gen_environment.cpu_view())
-      cpu.show_heartbeat = false;
-  };
-
   app.add_flag("-c,--cloudsuite", knob_cloudsuite, "Read all traces using the cloudsuite format");
-  app.add_flag("--hide-heartbeat", set_heartbeat_callback, "Hide the heartbeat output");
+  app.add_flag("--hide-heartbeat", hide_heartbeat, "Hide the heartbeat output");
   auto warmup_instr_option = app.add_option("-w,--warmup-instructions", warmup_instructions, "The number of instructions in the warmup phase");
   auto deprec_warmup_instr_option =
       app.add_option("--warmup_instructions", warmup_instructions, "[deprecated] use --warmup-instructions instead")->excludes(warmup_instr_option);
@@ -64,11 +81,45 @@ int main(int argc, char** argv)
 
   auto json_option =
       app.add_option("--json", json_file_name, "The name of the file to receive JSON output. If no name is specified, stdout will be used")->expected(0, 1);
+  auto json_stream_option = app.add_option("--json-stream", json_stream_file_name,
+                                           "The name of the file to receive JSON lines as the simulation runs, one for each heartbeat and each completed phase. If "
+                                           "no name is specified, stdout will be used")
+                                ->expected(0, 1);
+
+  auto save_checkpoint_option = app.add_option("--save-checkpoint", save_checkpoint_file_name,
+                                               "The name of the file to receive the warmed state of the simulator at the end of the warmup");
+  app.add_option("--restore-checkpoint", restore_checkpoint_file_name,
+                 "The name of a file of warmed state, from which the simulation begins in place of the warmup")
+      ->check(CLI::ExistingFile)
+      ->excludes(save_checkpoint_option);
 
   app.add_option("traces", trace_names, "The paths to the traces")->required()->expected(NUM_CPUS)->check(CLI::ExistingFile);
 
+#ifdef CHAMPSIM_RUNTIME_PARAMETERS
+  // The parameters are read from a file beside the executable, unless another is given
+  std::string parameters_file_name = executable_path(argv[0]) + ".json";
+  app.add_option("--parameters", parameters_file_name, "The JSON file of cache, core, and memory parameters, as written by the configuration")
+      ->check(CLI::ExistingFile);
+#endif
+
   CLI11_PARSE(app, argc, argv);
 
+#ifdef CHAMPSIM_RUNTIME_PARAMETERS
+  std::ifstream parameters_file{parameters_file_name};
+  if (!parameters_file) {
+    fmt::print(stderr, "Could not open the parameters file {}. Give its location with --parameters.\n", parameters_file_name);
+    return 1;
+  }
+  champsim::configured::generated_environment gen_environment{nlohmann::json::parse(parameters_file)};
+#else
+  champsim::configured::generated_environment gen_environment{};
+#endif
+
+  if (hide_heartbeat) {
+    for (O3_CPU& cpu : gen_environment.cpu_view())
+      cpu.show_heartbeat = false;
+  }
+
   const bool warmup_given = (warmup_instr_option->count() > 0) || (deprec_warmup_instr_option->count() > 0);
   const bool simulation_given = (sim_instr_option->count() > 0) || (deprec_sim_instr_option->count() > 0);
 
@@ -96,7 +147,30 @@ int main(int argc, char** argv)
   fmt::print("\n*** ChampSim Multicore Out-of-Order Simulator ***\nWarmup Instructions: {}\nSimulation Instructions: {}\nNumber of CPUs: {}\nPage size: {}\n\n",
              phases.at(0).length, phases.at(1).length, std::size(gen_environment.cpu_view()), PAGE_SIZE);
 
-  auto phase_stats = champsim::main(gen_environment, phases, traces);
+  std::ofstream json_stream_file;
+  std::optional<champsim::json_stream_printer> json_stream;
+  if (json_stream_option->count() > 0) {
+    if (json_stream_file_name.empty()) {
+      json_stream.emplace(std::cout);
+    } else {
+      json_stream_file.open(json_stream_file_name);
+      json_stream.emplace(json_stream_file);
+    }
+  }
+
+  std::optional<champsim::checkpoint::snapshot> restore_checkpoint;
+  if (!restore_checkpoint_file_name.empty()) {
+    std::ifstream restore_checkpoint_file{restore_checkpoint_file_name, std::ios::binary};
+    restore_checkpoint = champsim::checkpoint::snapshot::read(restore_checkpoint_file);
+  }
+
+  std::ofstream save_checkpoint_file;
+  if (!save_checkpoint_file_name.empty())
+    save_checkpoint_file.open(save_checkpoint_file_name, std::ios::binary);
+
+  auto phase_stats = champsim::main(gen_environment, phases, traces, json_stream.has_value() ? &json_stream.value() : nullptr,
+                                    restore_checkpoint.has_value() ? &restore_checkpoint.value() : nullptr,
+                                    save_checkpoint_file.is_open() ? &save_checkpoint_file : nullptr);
 
   fmt::print("\nChampSim completed all CPUs\n\n");
 
@@ -0,0 +1,196 @@
+/*
+ *    Copyright 2023 The ChampSim Contributors
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#include "module_plugin.h"
+
+#include <cstdlib>
+#include <dlfcn.h>
+#include <fstream>
+#include <sstream>
+#include <stdexcept>
+
+champsim::plugin::loader::loader(std::map<std::string, std::string> paths) : m_paths(std::move(paths))
+{
+  if (const char* search_path = std::getenv("CHAMPSIM_PLUGIN_PATH"); search_path != nullptr) {
+    std::istringstream stream{search_path};
+    for (std::string dir; std::getline(stream, dir, ':');) {
+      if (!dir.empty())
+        m_search_path.push_back(dir);
+    }
+  }
+}
+
+const void* champsim::plugin::loader::entry(const std::string& name, const char* symbol)
+{
+  auto handle = m_handles.find(name);
+  if (handle == std::end(m_handles)) {
+    std::string path;
+    for (const auto& dir : m_search_path) {
+      if (std::ifstream{dir + "/" + name + ".so"}.good()) {
+        path = dir + "/" + name + ".so";
+        break;
+      }
+    }
+    if (path.empty() && m_paths.count(name) > 0)
+      path = m_paths.at(name);
+    if (path.empty())
+      throw std::invalid_argument{"No plug-in was found for module " + name};
+
+    void* opened = dlopen(path.c_str(), RTLD_NOW | RTLD_LOCAL);
+    if (opened == nullptr)
+      throw std::runtime_error{"Could not open plug-in " + path + ": " + dlerror()};
+    handle = m_handles.emplace(name, opened).first;
+  }
+
+  void* found = dlsym(handle->second, symbol);
+  if (found == nullptr)
+    throw std::invalid_argument{"Module " + name + " is not a plug-in of this kind (" + symbol + " was not found)"};
+
+  // The entry point returns the module's table of functions
+  auto entry_point = reinterpret_cast<const void* (*)()>(found);
+  return entry_point();
+}
+
+auto champsim::plugin::loader::prefetcher(const std::string& name) -> const prefetcher_functions*
+{
+  return static_cast<const prefetcher_functions*>(entry(name, "champsim_prefetcher_plugin"));
+}
+
+auto champsim::plugin::loader::replacement(const std::string& name) -> const replacement_functions*
+{
+  return static_cast<const replacement_functions*>(entry(name, "champsim_replacement_plugin"));
+}
+
+auto champsim::plugin::loader::branch_predictor(const std::string& name) -> const branch_predictor_functions*
+{
+  return static_cast<const branch_predictor_functions*>(entry(name, "champsim_branch_predictor_plugin"));
+}
+
+auto champsim::plugin::loader::btb(const std::string& name) -> const btb_functions*
+{
+  return static_cast<const btb_functions*>(entry(name, "champsim_btb_plugin"));
+}
+
+// The results of the modules are joined as they are for modules that are compiled in. See config/modules.py
+void CACHE::plugin_model::impl_prefetcher_initialize()
+{
+  for (auto module : prefetchers)
+    (intern_->*(module->initialize))();
+}
+
+uint32_t CACHE::plugin_model::impl_prefetcher_cache_operate(uint64_t addr, uint64_t ip, uint8_t cache_hit, bool useful_prefetch, uint8_t type,
+                                                            uint32_t metadata_in)
+{
+  uint32_t result{};
+  for (auto module : prefetchers)
+    result ^= (intern_->*(module->cache_operate))(addr, ip, cache_hit, useful_prefetch, type, metadata_in);
+  return result;
+}
+
+uint32_t CACHE::plugin_model::impl_prefetcher_cache_fill(uint64_t addr, uint32_t set, uint32_t way, uint8_t prefetch, uint64_t evicted_addr,
+                                                         uint32_t metadata_in)
+{
+  uint32_t result{};
+  for (auto module : prefetchers)
+    result ^= (intern_->*(module->cache_fill))(addr, set, way, prefetch, evicted_addr, metadata_in);
+  return result;
+}
+
+void CACHE::plugin_model::impl_prefetcher_cycle_operate()
+{
+  for (auto module : prefetchers)
+    (intern_->*(module->cycle_operate))();
+}
+
+void CACHE::plugin_model::impl_prefetcher_final_stats()
+{
+  for (auto module : prefetchers)
+    (intern_->*(module->final_stats))();
+}
+
+void CACHE::plugin_model::impl_prefetcher_branch_operate(uint64_t ip, uint8_t branch_type, uint64_t branch_target)
+{
+  for (auto module : prefetchers)
+    (intern_->*(module->branch_operate))(ip, branch_type, branch_target);
+}
+
+void CACHE::plugin_model::impl_initialize_replacement()
+{
+  for (auto module : replacements)
+    (intern_->*(module->initialize))();
+}
+
+uint32_t CACHE::plugin_model::impl_find_victim(uint32_t triggering_cpu, uint64_t instr_id, uint32_t set, const BLOCK* current_set, uint64_t ip,
+                                               uint64_t full_addr, uint32_t type)
+{
+  uint32_t result{};
+  for (auto module : replacements)
+    result = (intern_->*(module->find_victim))(triggering_cpu, instr_id, set, current_set, ip, full_addr, type);
+  return result;
+}
+
+void CACHE::plugin_model::impl_update_replacement_state(uint32_t triggering_cpu, uint32_t set, uint32_t way, uint64_t full_addr, uint64_t ip,
+                                                        uint64_t victim_addr, uint32_t type, uint8_t hit)
+{
+  for (auto module : replacements)
+    (intern_->*(module->update_replacement_state))(triggering_cpu, set, way, full_addr, ip, victim_addr, type, hit);
+}
+
+void CACHE::plugin_model::impl_replacement_final_stats()
+{
+  for (auto module : replacements)
+    (intern_->*(module->final_stats))();
+}
+
+void O3_CPU::plugin_model::impl_initialize_branch_predictor()
+{
+  for (auto module : branch_predictors)
+    (intern_->*(module->initialize))();
+}
+
+void O3_CPU::plugin_model::impl_last_branch_result(uint64_t ip, uint64_t target, uint8_t taken, uint8_t branch_type)
+{
+  for (auto module : branch_predictors)
+    (intern_->*(module->last_branch_result))(ip, target, taken, branch_type);
+}
+
+uint8_t O3_CPU::plugin_model::impl_predict_branch(uint64_t ip)
+{
+  uint8_t result{};
+  for (auto module : branch_predictors)
+    result |= (intern_->*(module->predict_branch))(ip);
+  return result;
+}
+
+void O3_CPU::plugin_model::impl_initialize_btb()
+{
+  for (auto module : btbs)
+    (intern_->*(module->initialize))();
+}
+
+void O3_CPU::plugin_model::impl_update_btb(uint64_t ip, uint64_t predicted_target, uint8_t taken, uint8_t branch_type)
+{
+  for (auto module : btbs)
+    (intern_->*(module->update_btb))(ip, predicted_target, taken, branch_type);
+}
+
+std::pair<uint64_t, uint8_t> O3_CPU::plugin_model::impl_btb_prediction(uint64_t ip)
+{
+  std::pair<uint64_t, uint8_t> result{};
+  for (auto module : btbs)
+    result = (intern_->*(module->btb_prediction))(ip);
+  return result;
+}
@@ -25,6 +25,7 @@
 #include "champsim.h"
 #include "deadlock.h"
 #include "instruction.h"
+#include "stat_constants.h"
 #include "util/span.h"
 #include <fmt/chrono.h>
 #include <fmt/core.h>
@@ -32,6 +33,8 @@
 
 std::chrono::seconds elapsed_time();
 
+uint64_t O3_CPU::heartbeat_period() { return STAT_PRINTING_PERIOD; }
+
 long O3_CPU::operate()
 {
   long progress{0};
@@ -61,7 +64,7 @@ long O3_CPU::operate()
 
     fmt::print("Heartbeat CPU {} instructions: {} cycles: {} heartbeat IPC: {:.4g} cumulative IPC: {:.4g} (Simulation time: {:%H hr %M min %S sec})\n", cpu,
                num_retired, current_cycle, heartbeat_instr / heartbeat_cycle, phase_instr / phase_cycle, elapsed_time());
-    next_print_instruction += STAT_PRINTING_PERIOD;
+    next_print_instruction += heartbeat_period();
 
     last_heartbeat_instr = num_retired;
     last_heartbeat_cycle = current_cycle;
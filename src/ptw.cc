@@ -18,8 +18,8 @@
 
 #include <numeric>
 
+#include "address_constants.h"
 #include "champsim.h"
-#include "champsim_constants.h"
 #include "deadlock.h"
 #include "instruction.h"
 #include "util/span.h"
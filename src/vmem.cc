@@ -16,13 +16,34 @@
 
 #include "vmem.h"
 
+#include <array>
 #include <cassert>
+#include <stdexcept>
+#include <vector>
 
+#include "address_constants.h"
 #include "champsim.h"
-#include "champsim_constants.h"
+#include "checkpoint.h"
 #include "dram_controller.h"
 #include <fmt/core.h>
 
+namespace
+{
+// The entries of the page maps, as they are saved in a checkpoint
+struct saved_page {
+  uint64_t cpu;
+  uint64_t vpage;
+  uint64_t ppage;
+};
+
+struct saved_pte {
+  uint64_t cpu;
+  uint64_t vaddr_prefix;
+  uint64_t level;
+  uint64_t ppage;
+};
+} // namespace
+
 VirtualMemory::VirtualMemory(uint64_t page_table_page_size, std::size_t page_table_levels, uint64_t minor_penalty, MEMORY_CONTROLLER& dram)
     : next_ppage(VMEM_RESERVE_CAPACITY), last_ppage(1ull << (LOG2_PAGE_SIZE + champsim::lg2(page_table_page_size / PTE_BYTES) * page_table_levels)),
       minor_fault_penalty(minor_penalty), pt_levels(page_table_levels), pte_page_size(page_table_page_size)
@@ -98,3 +119,52 @@ std::pair<uint64_t, uint64_t> VirtualMemory::get_pte_pa(uint32_t cpu_num, uint64
 
   return {paddr, fault ? minor_fault_penalty : 0};
 }
+
+void VirtualMemory::save(champsim::checkpoint::snapshot& snap) const
+{
+  std::vector<saved_page> pages;
+  for (const auto& [key, ppage] : vpage_to_ppage_map)
+    pages.push_back({key.first, key.second, ppage});
+
+  std::vector<saved_pte> ptes;
+  for (const auto& [key, ppage] : page_table)
+    ptes.push_back({std::get<0>(key), std::get<1>(key), std::get<2>(key), ppage});
+
+  snap.put("vmem.layout", std::array<uint64_t, 3>{pte_page_size, pt_levels, last_ppage});
+  snap.put("vmem.page_count", std::size(pages));
+  snap.put("vmem.pages", pages);
+  snap.put("vmem.pte_count", std::size(ptes));
+  snap.put("vmem.ptes", ptes);
+  snap.put("vmem.next_pte_page", next_pte_page);
+  snap.put("vmem.next_ppage", next_ppage);
+}
+
+void VirtualMemory::restore(const champsim::checkpoint::snapshot& snap)
+{
+  // The pages were placed for a page table of this shape, and would not be found in another
+  std::array<uint64_t, 3> layout{};
+  snap.get("vmem.layout", layout);
+  if (layout != std::array<uint64_t, 3>{pte_page_size, pt_levels, last_ppage})
+    throw std::invalid_argument{"The virtual memory of the checkpoint does not match this simulator"};
+
+  std::size_t page_count{};
+  snap.get("vmem.page_count", page_count);
+  std::vector<saved_page> pages(page_count);
+  snap.get("vmem.pages", pages);
+
+  std::size_t pte_count{};
+  snap.get("vmem.pte_count", pte_count);
+  std::vector<saved_pte> ptes(pte_count);
+  snap.get("vmem.ptes", ptes);
+
+  vpage_to_ppage_map.clear();
+  for (auto [cpu, vpage, ppage] : pages)
+    vpage_to_ppage_map.insert({{static_cast<uint32_t>(cpu), vpage}, ppage});
+
+  page_table.clear();
+  for (auto [cpu, vaddr_prefix, level, ppage] : ptes)
+    page_table.insert({{static_cast<uint32_t>(cpu), vaddr_prefix, static_cast<uint32_t>(level)}, ppage});
+
+  snap.get("vmem.next_pte_page", next_pte_page);
+  snap.get("vmem.next_ppage", next_ppage);
+}
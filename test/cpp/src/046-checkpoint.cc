@@ -0,0 +1,139 @@
+#include <catch.hpp>
+#include "checkpoint.h"
+
+#include <sstream>
+#include <stdexcept>
+
+#include "dram_controller.h"
+#include "util/lru_table.h"
+#include "vmem.h"
+
+namespace {
+  struct type_with_getters
+  {
+    unsigned int value;
+
+    auto index() const
+    {
+      return value;
+    }
+
+    auto tag() const
+    {
+      return value;
+    }
+  };
+}
+
+SCENARIO("A snapshot can be written and read back") {
+  GIVEN("A snapshot with a value, a vector, and a string") {
+    champsim::checkpoint::snapshot uut;
+    uut.put("value", 0xcafebabeull);
+    uut.put("vector", std::vector<int>{1, 2, 3});
+    uut.put("string", std::string{"trace.xz"});
+
+    WHEN("The snapshot is written and read") {
+      std::stringstream stream;
+      uut.write(stream);
+      auto result = champsim::checkpoint::snapshot::read(stream);
+
+      THEN("The sections are restored") {
+        unsigned long long value{};
+        std::vector<int> vector(3);
+        std::string string;
+        result.get("value", value);
+        result.get("vector", vector);
+        result.get("string", string);
+
+        REQUIRE(value == 0xcafebabeull);
+        REQUIRE(vector == std::vector<int>{1, 2, 3});
+        REQUIRE(string == "trace.xz");
+      }
+    }
+
+    THEN("A section of another size cannot be restored") {
+      std::vector<int> vector(4);
+      REQUIRE_THROWS_AS(uut.get("vector", vector), std::invalid_argument);
+    }
+
+    THEN("A missing section cannot be restored") {
+      int value{};
+      REQUIRE_THROWS_AS(uut.get("missing", value), std::invalid_argument);
+    }
+  }
+
+  GIVEN("A stream that does not hold a snapshot") {
+    std::stringstream stream{"not a checkpoint"};
+
+    THEN("The stream cannot be read") {
+      REQUIRE_THROWS_AS(champsim::checkpoint::snapshot::read(stream), std::invalid_argument);
+    }
+  }
+}
+
+SCENARIO("The state of an lru_table can be restored into another") {
+  GIVEN("A lru_table with one element") {
+    constexpr unsigned int data = 0xcafebabe;
+    champsim::lru_table<::type_with_getters> first{1, 1};
+    first.fill({data});
+
+    WHEN("Its state is saved and restored into an empty table") {
+      champsim::checkpoint::snapshot snap;
+      first.visit_state([&](const auto& blocks, auto access_count) {
+        snap.put("blocks", blocks);
+        snap.put("access_count", access_count);
+      });
+
+      champsim::lru_table<::type_with_getters> second{1, 1};
+      second.visit_state([&](auto& blocks, auto& access_count) {
+        snap.get("blocks", blocks);
+        snap.get("access_count", access_count);
+      });
+
+      THEN("The restored table hits") {
+        auto result = second.check_hit({data});
+        REQUIRE(result.has_value());
+        REQUIRE(result.value().value == data);
+      }
+    }
+  }
+}
+
+SCENARIO("The page maps of a virtual memory can be restored") {
+  GIVEN("A virtual memory that has mapped a page") {
+    constexpr unsigned levels = 5;
+    constexpr uint64_t pte_page_size = 1ull << 12;
+    MEMORY_CONTROLLER dram{1, 3200, 12.5, 12.5, 12.5, 7.5, {}};
+    VirtualMemory first{pte_page_size, levels, 200, dram};
+    auto [paddr, first_delay] = first.va_to_pa(0, 0xdeadbeef);
+    auto [pte_paddr, first_pte_delay] = first.get_pte_pa(0, 0xdeadbeef, 1);
+
+    WHEN("Its maps are restored into another virtual memory") {
+      champsim::checkpoint::snapshot snap;
+      first.save(snap);
+
+      VirtualMemory second{pte_page_size, levels, 200, dram};
+      second.restore(snap);
+
+      THEN("The page and the PTE are found without a fault") {
+        REQUIRE(second.va_to_pa(0, 0xdeadbeef) == std::pair{paddr, uint64_t{0}});
+        REQUIRE(second.get_pte_pa(0, 0xdeadbeef, 1) == std::pair{pte_paddr, uint64_t{0}});
+      }
+
+      THEN("New pages are not placed over the restored ones") {
+        REQUIRE(second.available_ppages() == first.available_ppages());
+      }
+    }
+
+    WHEN("Its maps are restored into a virtual memory of another shape") {
+      champsim::checkpoint::snapshot snap;
+      first.save(snap);
+
+      VirtualMemory second{pte_page_size, levels - 1, 200, dram};
+
+      THEN("The maps are not restored") {
+        REQUIRE_THROWS_AS(second.restore(snap), std::invalid_argument);
+      }
+    }
+  }
+}
@@ -0,0 +1,192 @@
+#include <catch.hpp>
+#include "mocks.hpp"
+#include "defaults.hpp"
+#include "environment.h"
+#include "phase_info.h"
+#include "stats_printer.h"
+
+#include <nlohmann/json.hpp>
+#include <sstream>
+
+namespace champsim
+{
+phase_stats get_phase_stats(const phase_info& phase, environment& env, const std::vector<bool>& phase_complete);
+void stream_heartbeats(const phase_info& phase, environment& env, const std::vector<bool>& phase_complete, std::vector<uint64_t>& next_heartbeat,
+                       json_stream_printer& stream);
+}
+
+namespace {
+  // Two cores and a memory controller, with no caches
+  struct two_core_environment : champsim::environment
+  {
+    do_nothing_MRC mock_L1I, mock_L1D;
+    std::array<O3_CPU, 2> cpus{{
+      O3_CPU{O3_CPU::Builder{champsim::defaults::default_core}.index(0).fetch_queues(&mock_L1I.queues).data_queues(&mock_L1D.queues)},
+      O3_CPU{O3_CPU::Builder{champsim::defaults::default_core}.index(1).fetch_queues(&mock_L1I.queues).data_queues(&mock_L1D.queues)}
+    }};
+    MEMORY_CONTROLLER dram{1, 3200, 12.5, 12.5, 12.5, 7.5, {}};
+    VirtualMemory vmem{1 << 12, 5, 200, dram};
+
+    std::vector<std::reference_wrapper<O3_CPU>> cpu_view() override { return {std::begin(cpus), std::end(cpus)}; }
+    std::vector<std::reference_wrapper<CACHE>> cache_view() override { return {}; }
+    std::vector<std::reference_wrapper<PageTableWalker>> ptw_view() override { return {}; }
+    MEMORY_CONTROLLER& dram_view() override { return dram; }
+    VirtualMemory& vmem_view() override { return vmem; }
+    std::vector<std::reference_wrapper<champsim::operable>> operable_view() override { return {std::begin(cpus), std::end(cpus)}; }
+  };
+
+  std::vector<nlohmann::json> read_lines(std::istream& stream)
+  {
+    std::vector<nlohmann::json> lines;
+    for (std::string line; std::getline(stream, line);)
+      lines.push_back(nlohmann::json::parse(line));
+    return lines;
+  }
+}
+
+SCENARIO("A streamed phase matches the phase in the JSON statistics") {
+  GIVEN("The statistics of a phase") {
+    champsim::phase_stats stats;
+    stats.name = "Simulation";
+    stats.trace_names = {"a.champsimtrace.xz"};
+
+    O3_CPU::stats_type cpu_stats;
+    cpu_stats.name = "cpu0";
+    cpu_stats.begin_instrs = 10;
+    cpu_stats.end_instrs = 110;
+    cpu_stats.begin_cycles = 20;
+    cpu_stats.end_cycles = 220;
+    stats.roi_cpu_stats = {cpu_stats};
+    stats.sim_cpu_stats = {cpu_stats};
+
+    CACHE::stats_type cache_stats;
+    cache_stats.name = "LLC";
+    cache_stats.pf_requested = 3;
+    cache_stats.avg_miss_latency = 40;
+    stats.roi_cache_stats = {cache_stats};
+    stats.sim_cache_stats = {cache_stats};
+
+    DRAM_CHANNEL::stats_type dram_stats;
+    dram_stats.dbus_cycle_congested = 5;
+    dram_stats.dbus_count_congested = 1;
+    stats.roi_dram_stats = {dram_stats};
+    stats.sim_dram_stats = {dram_stats};
+
+    WHEN("The phase is streamed") {
+      std::stringstream json_output, stream_output;
+      std::vector<champsim::phase_stats> all_stats{stats};
+      champsim::json_printer{json_output}.print(all_stats);
+      champsim::json_stream_printer{stream_output}.print(stats, true);
+
+      THEN("The line is the element of the JSON statistics, with its type and whether it is a warmup") {
+        auto expected = nlohmann::json::parse(json_output.str()).at(0);
+        expected["type"] = "phase";
+        expected["warmup"] = true;
+
+        auto lines = read_lines(stream_output);
+        REQUIRE(std::size(lines) == 1);
+        REQUIRE(lines.at(0) == expected);
+      }
+    }
+  }
+}
+
+SCENARIO("Heartbeats are streamed for each core as it passes each heartbeat") {
+  GIVEN("Two cores at the beginning of a phase") {
+    two_core_environment env;
+    for (O3_CPU& cpu : env.cpu_view())
+      cpu.begin_phase();
+
+    champsim::phase_info phase{"Simulation", false, 10 * O3_CPU::heartbeat_period(), {0, 0}, {"a.champsimtrace.xz"}};
+    std::vector<bool> phase_complete{false, false};
+    std::vector<uint64_t> next_heartbeat(2, O3_CPU::heartbeat_period());
+    std::stringstream output;
+    champsim::json_stream_printer stream{output};
+
+    WHEN("One core passes its heartbeat") {
+      env.cpus[0].num_retired = O3_CPU::heartbeat_period();
+      env.cpus[1].num_retired = O3_CPU::heartbeat_period() - 1;
+      champsim::stream_heartbeats(phase, env, phase_complete, next_heartbeat, stream);
+
+      THEN("One heartbeat is streamed, for that core") {
+        auto lines = read_lines(output);
+        REQUIRE(std::size(lines) == 1);
+        REQUIRE(lines.at(0).at("type") == "heartbeat");
+        REQUIRE(lines.at(0).at("cpu") == 0);
+        REQUIRE(lines.at(0).at("phase") == "Simulation");
+      }
+
+      THEN("The next heartbeat of that core is one period later") {
+        REQUIRE(next_heartbeat == std::vector<uint64_t>{2 * O3_CPU::heartbeat_period(), O3_CPU::heartbeat_period()});
+      }
+
+      AND_WHEN("Neither core passes another heartbeat") {
+        output.str("");
+        champsim::stream_heartbeats(phase, env, phase_complete, next_heartbeat, stream);
+
+        THEN("No heartbeat is streamed") {
+          REQUIRE(read_lines(output).empty());
+        }
+      }
+
+      AND_WHEN("The other core passes its heartbeat") {
+        output.str("");
+        env.cpus[1].num_retired = O3_CPU::heartbeat_period();
+        champsim::stream_heartbeats(phase, env, phase_complete, next_heartbeat, stream);
+
+        THEN("One heartbeat is streamed, for the other core") {
+          auto lines = read_lines(output);
+          REQUIRE(std::size(lines) == 1);
+          REQUIRE(lines.at(0).at("cpu") == 1);
+        }
+      }
+    }
+
+    WHEN("A core that has completed the phase passes its heartbeat") {
+      phase_complete = {false, true};
+      env.cpus[1].num_retired = O3_CPU::heartbeat_period();
+      champsim::stream_heartbeats(phase, env, phase_complete, next_heartbeat, stream);
+
+      THEN("No heartbeat is streamed") {
+        REQUIRE(read_lines(output).empty());
+      }
+    }
+  }
+}
+
+SCENARIO("The statistics of a phase in progress are taken to the current cycle") {
+  GIVEN("Two cores, one of which has completed the phase") {
+    two_core_environment env;
+    for (O3_CPU& cpu : env.cpu_view()) {
+      cpu.num_retired = 100;
+      cpu.current_cycle = 200;
+      cpu.begin_phase();
+    }
+
+    env.cpus[1].num_retired = 150;
+    env.cpus[1].current_cycle = 300;
+    env.cpus[1].end_phase(1);
+
+    env.cpus[0].num_retired = 170;
+    env.cpus[0].current_cycle = 400;
+    env.cpus[1].num_retired = 190;
+    env.cpus[1].current_cycle = 500;
+
+    champsim::phase_info phase{"Simulation", false, 1000, {0, 0}, {"a.champsimtrace.xz"}};
+
+    WHEN("The statistics are taken") {
+      auto stats = champsim::get_phase_stats(phase, env, {false, true});
+
+      THEN("The core in progress ends at its current instruction and cycle") {
+        REQUIRE(stats.sim_cpu_stats.at(0).begin_instrs == 100);
+        REQUIRE(stats.sim_cpu_stats.at(0).end_instrs == 170);
+        REQUIRE(stats.sim_cpu_stats.at(0).end_cycles == 400);
+      }
+
+      THEN("The completed core ends where it completed the phase") {
+        REQUIRE(stats.sim_cpu_stats.at(1).end_instrs == 150);
+        REQUIRE(stats.sim_cpu_stats.at(1).end_cycles == 300);
+      }
+    }
+  }
+}
@@ -1,7 +1,15 @@
 import unittest
+import unittest.mock
+import json
 import operator
+import os
+import tempfile
 
 import config.filewrite
+import config.includes
+import config.parse
+import config.telemetry
+import config.util
 
 class FilesAreDifferentTests(unittest.TestCase):
     def test_identical(self):
@@ -41,3 +49,415 @@ class FilesAreDifferentTests(unittest.TestCase):
         '''
 
         self.assertTrue(config.filewrite.files_are_different(a.splitlines(),b.splitlines()))
+
+# Generated files are written into a temporary directory, and the files shared between builds are moved there too
+class GeneratedFilesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.bindir = os.path.join(self.tempdir.name, 'bin')
+        self.objdir = os.path.join(self.tempdir.name, 'obj')
+        self.makefile_name = os.path.join(self.tempdir.name, '_configuration.mk')
+        self.ninja_name = os.path.join(self.tempdir.name, 'build.ninja')
+        for name, value in (('makefile_file_name', self.makefile_name), ('ninja_file_name', self.ninja_name), ('shared_file_names', (self.makefile_name, self.ninja_name))):
+            patch = unittest.mock.patch.object(config.filewrite, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+class StreamingWriterTests(GeneratedFilesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parsed_configs = [config.parse.parse_config({'executable_name': 'a'}), config.parse.parse_config({'executable_name': 'b', 'rob_size': 27})]
+
+    def read_tree(self, root):
+        retval = {}
+        for base, _, files in os.walk(root):
+            for f in files:
+                if f == config.filewrite.manifest_file_name:
+                    continue
+                with open(os.path.join(base, f)) as rfp:
+                    retval[os.path.relpath(os.path.join(base, f), root)] = rfp.read()
+        return retval
+
+    def test_private_files_are_written_immediately(self):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True) as wr:
+            wr.write_files(self.parsed_configs[0])
+            self.assertTrue(any(f.endswith('core_inst.inc') for f in self.read_tree(self.objdir)))
+            self.assertFalse(os.path.exists(self.makefile_name))
+        self.assertTrue(os.path.exists(self.makefile_name))
+        self.assertFalse(os.path.exists(self.makefile_name + '.spool'))
+
+    def test_streaming_matches_batch(self):
+        results = []
+        for streaming in (False, True):
+            objdir = os.path.join(self.tempdir.name, str(streaming))
+            with config.filewrite.writer(self.bindir, objdir, streaming=streaming) as wr:
+                for c in self.parsed_configs:
+                    wr.write_files(c)
+            with open(self.makefile_name) as rfp:
+                makefile_contents = rfp.read().replace(objdir, '')
+            os.remove(self.makefile_name)
+            results.append((self.read_tree(objdir), makefile_contents))
+
+        self.assertEqual(results[0], results[1])
+
+    def test_separate_makefile(self):
+        test_makefile_name = os.path.join(self.tempdir.name, '_test_configuration.mk')
+        with unittest.mock.patch.object(config.filewrite, 'shared_file_names', (self.makefile_name, test_makefile_name)):
+            with config.filewrite.writer(self.bindir, self.objdir, streaming=True, makefile_name=test_makefile_name) as wr:
+                wr.write_files(self.parsed_configs[0])
+        self.assertTrue(os.path.exists(test_makefile_name))
+        self.assertFalse(os.path.exists(self.makefile_name))
+
+    def test_duplicate_executable_is_an_error(self):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True) as wr:
+            wr.write_files(self.parsed_configs[0])
+            with self.assertRaises(ValueError):
+                wr.write_files(config.parse.parse_config({'executable_name': 'a', 'rob_size': 27}))
+
+class ConfigureInputTests(GeneratedFilesTestCase):
+    def write(self, configure_inputs):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True, configure_inputs=configure_inputs) as wr:
+            wr.write_files(config.parse.parse_config({'executable_name': 'a'}))
+            wr.write_files(config.parse.parse_config({'executable_name': 'b', 'rob_size': 27}))
+        with open(self.makefile_name) as rfp:
+            return rfp.read().splitlines()
+
+    def test_disabled_by_default(self):
+        self.assertFalse(any(l.startswith('configure_inputs += ') for l in self.write(False)))
+
+    def test_scanned_sources_are_inputs(self):
+        lines = self.write(True)
+        inputs = [v for l in lines if l.startswith('configure_inputs += ') for v in l.split(' += ')[1].split()]
+        digests = [l.split(' += ')[1] for l in lines if l.startswith('configure_digests += ')]
+        writer = config.filewrite.FileWriter()
+        self.assertIn(os.path.join(writer.core_sources, 'cache.cc'), inputs)
+        self.assertIn(os.path.join(writer.core_includes, 'cache.h'), inputs)
+        self.assertEqual(len(digests), len(set(digests)))
+        self.assertTrue(config.includes.check(digests))
+
+class WriteIfDifferentTests(GeneratedFilesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fname = os.path.join(self.tempdir.name, 'test.inc')
+        self.manifest = config.filewrite.Manifest(os.path.join(self.tempdir.name, 'manifest.json'))
+
+    def test_unchanged_file_keeps_mtime(self):
+        config.filewrite.write_if_different(self.fname, 'a\nb', self.manifest)
+        os.utime(self.fname, ns=(0,0))
+        config.filewrite.write_if_different(self.fname, 'a\nb', config.filewrite.Manifest())
+        self.assertEqual(os.stat(self.fname).st_mtime_ns, 0)
+
+    def test_changed_file_is_written(self):
+        config.filewrite.write_if_different(self.fname, 'a\nb', self.manifest)
+        config.filewrite.write_if_different(self.fname, 'a\nc', self.manifest)
+        with open(self.fname) as rfp:
+            self.assertEqual(rfp.read(), 'a\nc')
+
+    def test_manifest_is_current_after_write(self):
+        config.filewrite.write_if_different(self.fname, 'a\nb', self.manifest)
+        self.assertTrue(self.manifest.is_current(self.fname, config.filewrite.content_digest(['a','b'])))
+        self.assertFalse(self.manifest.is_current(self.fname, config.filewrite.content_digest(['a','c'])))
+
+    def test_manifest_survives_reload(self):
+        config.filewrite.write_if_different(self.fname, 'a\nb', self.manifest)
+        self.manifest.save()
+        reloaded = config.filewrite.Manifest(self.manifest.fname)
+        self.assertTrue(reloaded.is_current(self.fname, config.filewrite.content_digest(['a','b'])))
+
+    def test_external_edit_invalidates_manifest(self):
+        config.filewrite.write_if_different(self.fname, 'a\nb', self.manifest)
+        with open(self.fname, 'wt') as wfp:
+            wfp.write('a\nbbbbbb')
+        self.assertFalse(self.manifest.is_current(self.fname, config.filewrite.content_digest(['a','b'])))
+
+        config.filewrite.write_if_different(self.fname, 'a\nb', self.manifest)
+        with open(self.fname) as rfp:
+            self.assertEqual(rfp.read(), 'a\nb')
+
+class BuildIdTests(unittest.TestCase):
+    def setUp(self):
+        self.base = config.parse.parse_config({'executable_name': 'a', 'L1D': {'sets': 64, 'ways': 12}})
+
+    def test_executable_name_is_ignored(self):
+        other = config.parse.parse_config({'executable_name': 'b', 'L1D': {'sets': 64, 'ways': 12}})
+        self.assertEqual(config.filewrite.get_build_id(self.base), config.filewrite.get_build_id(other))
+
+    def test_key_order_is_ignored(self):
+        other = config.parse.parse_config({'L1D': {'ways': 12, 'sets': 64}, 'executable_name': 'a'})
+        self.assertEqual(config.filewrite.get_build_id(self.base), config.filewrite.get_build_id(other))
+
+    def test_relative_module_paths_are_ignored(self):
+        executable, elements, modules_to_compile, module_info, config_file, env = self.base
+        absolute_info = {k: {n: {**m, 'fname': os.path.abspath(m['fname'])} for n,m in v.items()} for k,v in module_info.items()}
+        other = (executable, elements, modules_to_compile, absolute_info, config_file, env)
+        self.assertEqual(config.filewrite.get_build_id(self.base), config.filewrite.get_build_id(other))
+
+    def test_parameters_are_significant(self):
+        other = config.parse.parse_config({'executable_name': 'a', 'L1D': {'sets': 128, 'ways': 12}})
+        self.assertNotEqual(config.filewrite.get_build_id(self.base), config.filewrite.get_build_id(other))
+
+class SharedBuildTests(GeneratedFilesTestCase):
+    def test_equivalent_configs_share_objects(self):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True) as wr:
+            wr.write_files(config.parse.parse_config({'executable_name': 'a'}))
+            wr.write_files(config.parse.parse_config({'executable_name': 'b'}))
+
+        self.assertEqual(len(os.listdir(self.objdir)), 3) # the build, the shared objects, and the manifest
+        with open(self.makefile_name) as rfp:
+            lines = rfp.read().splitlines()
+        self.assertEqual(len([l for l in lines if '_all_objs = ' in l]), 1)
+        self.assertEqual(len([l for l in lines if l.startswith('executable_name += ')]), 2)
+
+    def shared_keys(self, parsed_config):
+        writer = config.filewrite.FileWriter(self.bindir, self.objdir)
+        return {key[-1]: [fname for fname,_ in parts] for key, parts in writer.get_fileparts(parsed_config)[:-2]}
+
+    def test_core_change_shares_most_objects(self):
+        base_units = self.shared_keys(config.parse.parse_config({'executable_name': 'a'}))
+        other_units = self.shared_keys(config.parse.parse_config({'executable_name': 'b', 'rob_size': 27}))
+        changed = [fnames for key, fnames in other_units.items() if key not in base_units]
+        self.assertEqual(len(base_units), len(other_units))
+        self.assertEqual(len(changed), 1)
+        self.assertIn(config.filewrite.instantiation_file_name, [os.path.basename(f) for f in changed[0]])
+
+    def test_heartbeat_change_shares_most_objects(self):
+        base_units = self.shared_keys(config.parse.parse_config({'executable_name': 'a'}))
+        other_units = self.shared_keys(config.parse.parse_config({'executable_name': 'b', 'heartbeat_frequency': 1000}))
+        changed = [fnames for key, fnames in other_units.items() if key not in base_units]
+        self.assertEqual(len(changed), 1)
+        self.assertIn(config.filewrite.stat_constants_file_name, [os.path.basename(f) for f in changed[0]])
+
+    def test_shared_objects_are_excluded_from_build(self):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True) as wr:
+            wr.write_files(config.parse.parse_config({'executable_name': 'a'}))
+        with open(self.makefile_name) as rfp:
+            contents = rfp.read()
+        self.assertIn('$(filter-out ', contents)
+        self.assertIn(os.path.join(self.objdir, config.filewrite.shared_dir_name), contents)
+
+    def test_cache_change_shares_module_objects(self):
+        base_units = self.shared_keys(config.parse.parse_config({'executable_name': 'a', 'L2C': {'sets': 512, 'prefetcher': 'no'}}))
+        other_units = self.shared_keys(config.parse.parse_config({'executable_name': 'b', 'L2C': {'sets': 1024, 'prefetcher': 'no'}}))
+        module_units = [fnames for fnames in base_units.values() if any(f.endswith('.inc') and 'prefetcherDno' in f for f in fnames)]
+        self.assertTrue(module_units)
+        changed = [fnames for key, fnames in other_units.items() if key not in base_units]
+        self.assertEqual(len(changed), 1)
+        self.assertIn(config.filewrite.instantiation_file_name, [os.path.basename(f) for f in changed[0]])
+
+class NinjaWriterTests(GeneratedFilesTestCase):
+    def test_each_object_is_built_once(self):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True, generator='ninja') as wr:
+            wr.write_files(config.parse.parse_config({'executable_name': 'a'}))
+            wr.write_files(config.parse.parse_config({'executable_name': 'b', 'rob_size': 27}))
+        with open(self.ninja_name) as rfp:
+            lines = rfp.read().splitlines()
+
+        outputs = [l.split(':')[0] for l in lines if l.startswith('build ')]
+        self.assertEqual(len(outputs), len(set(outputs)))
+        rules = [l for l in lines if l.startswith('rule ')]
+        self.assertEqual(len(rules), len(set(rules)))
+        self.assertEqual(len([l for l in lines if ': link ' in l]), 2)
+
+    def test_executable_links_every_object(self):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True, generator='ninja') as wr:
+            wr.write_files(config.parse.parse_config({'executable_name': 'a'}))
+        with open(self.ninja_name) as rfp:
+            lines = rfp.read().splitlines()
+
+        objects = [l.split(':')[0][len('build '):] for l in lines if ': cxx ' in l]
+        link = next(l for l in lines if ': link ' in l)
+        self.assertEqual(sorted(link.split(': link ')[1].split()), sorted(objects))
+
+class PrecompiledHeaderTests(GeneratedFilesTestCase):
+    def shared_units(self, parsed_config, precompiled_headers=True):
+        writer = config.filewrite.FileWriter(self.bindir, self.objdir, precompiled_headers=precompiled_headers)
+        executable, elements, modules_to_compile, module_info, config_file, env = parsed_config
+        joined_module_info = config.util.subdict(config.util.chain(*module_info.values()), modules_to_compile)
+        headers = {
+            **writer.get_generated_headers(parsed_config),
+            **{m['name'] + '.inc': list(config.filewrite.get_map_lines(config.util.chain(m['func_map'], m.get('deprecated_func_map', {})))) for m in joined_module_info.values()}
+        }
+        return list(writer.get_shared_units(headers, (writer.core_sources,), joined_module_info, env))
+
+    def test_disabled_by_default(self):
+        units = self.shared_units(config.parse.parse_config({'executable_name': 'a'}), precompiled_headers=False)
+        self.assertTrue(all(u['pch'] is None for u in units))
+
+    def test_modules_use_precompiled_headers(self):
+        units = self.shared_units(config.parse.parse_config({'executable_name': 'a'}))
+        self.assertTrue(all(u['pch'] is not None for u in units if u['module_name'] is not None))
+
+    def test_precompiled_header_adds_no_generated_dependencies(self):
+        units = self.shared_units(config.parse.parse_config({'executable_name': 'a'}))
+        for u in units:
+            if u['pch'] is not None:
+                with self.subTest(key=u['key']):
+                    self.assertLessEqual(set(u['pch']['headers']), set(u['headers']))
+
+    def test_precompiled_headers_are_shared_between_builds(self):
+        base_units = self.shared_units(config.parse.parse_config({'executable_name': 'a'}))
+        other_units = self.shared_units(config.parse.parse_config({'executable_name': 'b', 'rob_size': 27}))
+        self.assertEqual({u['pch']['key'] for u in base_units if u['pch']}, {u['pch']['key'] for u in other_units if u['pch']})
+
+    def test_object_flags_are_private(self):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True, precompiled_headers=True) as wr:
+            wr.write_files(config.parse.parse_config({'executable_name': 'a'}))
+        with open(self.makefile_name) as rfp:
+            lines = rfp.read().splitlines()
+        self.assertTrue(any(l.startswith('pch_files += ') for l in lines))
+        self.assertFalse(any('-include {}'.format(config.filewrite.precompiled_header_file_name) in l for l in lines if ': CPPFLAGS += ' in l))
+
+class ProfileTests(GeneratedFilesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.profile = {'traces': ['/tmp/a.champsimtrace.xz'], 'warmup_instructions': 10, 'simulation_instructions': 20}
+
+    def fileparts(self, parsed_config, profile):
+        writer = config.filewrite.FileWriter(self.bindir, self.objdir, profile=profile)
+        return writer.get_fileparts(parsed_config)
+
+    def test_profile_is_shared_between_builds(self):
+        base = config.parse.parse_config({'executable_name': 'a'})
+        other = config.parse.parse_config({'executable_name': 'b', 'rob_size': 27})
+        self.assertEqual(config.filewrite.get_profile_id(base, self.profile), config.filewrite.get_profile_id(other, self.profile))
+
+    def test_profile_depends_on_training(self):
+        parsed_config = config.parse.parse_config({'executable_name': 'a'})
+        other_profile = {**self.profile, 'simulation_instructions': 30}
+        self.assertNotEqual(config.filewrite.get_profile_id(parsed_config, self.profile), config.filewrite.get_profile_id(parsed_config, other_profile))
+
+    def test_instrumented_and_optimized_objects_differ(self):
+        with_profile = {k for k,_ in self.fileparts(config.parse.parse_config({'executable_name': 'a'}), self.profile)}
+        without_profile = {k for k,_ in self.fileparts(config.parse.parse_config({'executable_name': 'a'}), None)}
+        self.assertTrue(any(k is not None and config.filewrite.profile_dir_name in k for k in with_profile))
+        self.assertGreater(len(with_profile), len(without_profile))
+
+    def test_profile_data_name_is_unique(self):
+        names = ('src/cache.cc', 'test/cpp/src/cache.cc', 'src/ooo_cpu.cc')
+        self.assertEqual(len({config.filewrite.get_profile_data_name(n) for n in names}), len(names))
+        self.assertTrue(all(os.sep not in config.filewrite.get_profile_data_name(n) for n in names))
+
+    def test_makefile_trains_before_optimizing(self):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True, profile=self.profile) as wr:
+            wr.write_files(config.parse.parse_config({'executable_name': 'a'}))
+        with open(self.makefile_name) as rfp:
+            lines = rfp.read().splitlines()
+        self.assertTrue(any(l.startswith('pgo_profiles += ') for l in lines))
+        self.assertTrue(any(l.startswith('pgo_executables += ') for l in lines))
+        self.assertTrue(any('-fprofile-generate' in l for l in lines))
+        self.assertTrue(any('-fprofile-use' in l for l in lines))
+        self.assertTrue(all(l.startswith('private ') or ': private ' in l for l in lines if '-dumpbase' in l))
+
+class TelemetryTests(GeneratedFilesTestCase):
+    def write(self, telemetry):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True, telemetry=telemetry) as wr:
+            wr.write_files(config.parse.parse_config({'executable_name': 'a'}))
+        with open(self.makefile_name) as rfp:
+            return rfp.read().splitlines()
+
+    def test_disabled_by_default(self):
+        lines = self.write(False)
+        self.assertFalse(any(l.startswith('telemetry_log = ') for l in lines))
+        self.assertEqual(config.telemetry.load_index(self.objdir), ({}, {}))
+
+    def test_index_covers_each_build(self):
+        lines = self.write(True)
+        self.assertIn('telemetry_log = ' + os.path.join(self.objdir, config.telemetry.log_file_name), lines)
+        units, builds = config.telemetry.load_index(self.objdir)
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(set(next(iter(builds.values()))['units']), set(units))
+        self.assertTrue(any(u['module'] is not None for u in units.values()))
+
+class RuntimeParameterTests(GeneratedFilesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.configs = [config.parse.parse_config({'executable_name': 'rob{}'.format(r), 'ooo_cpu': [{'rob_size': r}], 'LLC': {'sets': 4*r}}) for r in (128, 256)]
+
+    def test_sweep_shares_build(self):
+        self.assertEqual(*(config.filewrite.get_build_id(c, runtime_parameters=True) for c in self.configs))
+        self.assertNotEqual(*(config.filewrite.get_build_id(c) for c in self.configs))
+
+    def test_structure_is_significant(self):
+        other = config.parse.parse_config({'executable_name': 'rob128', 'ooo_cpu': [{'rob_size': 128}], 'LLC': {'sets': 512, 'latency': 40}})
+        self.assertNotEqual(config.filewrite.get_build_id(self.configs[0], runtime_parameters=True), config.filewrite.get_build_id(other, runtime_parameters=True))
+
+    def test_executables_link_one_binary(self):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True, runtime_parameters=True) as wr:
+            for c in self.configs:
+                wr.write_files(c)
+        with open(self.makefile_name) as rfp:
+            lines = rfp.read().splitlines()
+        self.assertEqual(len([l for l in lines if l.startswith('linked_executables += ')]), 2)
+        self.assertEqual(len([l for l in lines if l.startswith('# Binary: ')]), 2)
+        self.assertEqual(len({l for l in lines if l.startswith('# Binary: ')}), 1)
+        for c, rob_size in zip(self.configs, (128, 256)):
+            with open(config.filewrite.get_parameters_file_name(os.path.join(self.bindir, c[0]))) as rfp:
+                self.assertEqual(json.load(rfp)['cores']['cpu0']['rob_size'], rob_size)
+
+class BuildInfoTests(GeneratedFilesTestCase):
+    def test_parameters_are_named_by_element(self):
+        parsed_config = config.parse.parse_config({'executable_name': 'x', 'ooo_cpu': [{'rob_size': 256}], 'LLC': {'sets': 4096}})
+        parameters = config.filewrite.get_flat_parameters(parsed_config[1], parsed_config[4])
+        self.assertEqual(parameters['LLC.sets'], 4096)
+        self.assertEqual(parameters['cpu0.rob_size'], 256)
+        self.assertEqual(parameters['num_cores'], 1)
+        self.assertIn('virtual_memory.num_levels', parameters)
+        self.assertFalse(any(k.split('.')[-1].startswith('_') for k in parameters))
+
+    def test_written_beside_executable(self):
+        parsed_config = config.parse.parse_config({'executable_name': 'x'})
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True) as wr:
+            wr.write_files(parsed_config)
+        with open(config.filewrite.get_build_info_file_name(os.path.join(self.bindir, 'x'))) as rfp:
+            build_info = json.load(rfp)
+        self.assertEqual(build_info['build_id'], config.filewrite.get_build_id(parsed_config))
+        self.assertEqual(build_info['parameters']['LLC.sets'], 2048)
+
+class PluginTests(GeneratedFilesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.configs = [config.parse.parse_config({'executable_name': p, 'L2C': {'prefetcher': p}}) for p in ('no', 'next_line')]
+
+    def write(self, parsed_configs, generator='make'):
+        with config.filewrite.writer(self.bindir, self.objdir, streaming=True, makefile_name=self.makefile_name, generator=generator, plugins=True) as wr:
+            for c in parsed_configs:
+                wr.write_files(c)
+        with open(self.makefile_name) as rfp:
+            return rfp.read().splitlines()
+
+    def shared_keys(self, parsed_config):
+        writer = config.filewrite.FileWriter(self.bindir, self.objdir, plugins=True)
+        return {key[-1] for key, parts in writer.get_fileparts(parsed_config)[:-2]}
+
+    def test_module_change_shares_plugins(self):
+        base_keys, other_keys = (self.shared_keys(c) for c in self.configs)
+        self.assertEqual(len(base_keys), len(other_keys))
+        self.assertEqual(len(other_keys - base_keys), 1)
+
+    def test_each_module_is_a_plugin(self):
+        lines = self.write(self.configs[:1])
+        num_modules = sum(len(v) for v in self.configs[0][3].values())
+        plugins = [l[len('plugin_libraries += '):] for l in lines if l.startswith('plugin_libraries += ')]
+        self.assertEqual(len(plugins), num_modules)
+        plugin_objs = {v for l in lines if l.split(':')[0] in plugins for v in l.split(' | ')[0].split()[1:]}
+        build_objs = {v for l in lines if '_all_objs = ' in l for v in l.split(' = ')[1].split()}
+        self.assertTrue(plugin_objs)
+        self.assertFalse(plugin_objs & build_objs)
+
+        executable = os.path.join(self.bindir, 'no')
+        link = next(l for l in lines if l.startswith(executable + ': $('))
+        self.assertEqual(sorted(link.split(' | ')[1].split()[1:]), sorted(plugins))
+        self.assertIn(executable + ': LDFLAGS += -rdynamic', lines)
+
+    def test_plugin_objects_are_position_independent(self):
+        lines = self.write(self.configs[:1])
+        self.assertTrue(any(l.endswith('CXXFLAGS += -fPIC') for l in lines))
+        self.assertFalse(any(l.endswith('CXXFLAGS += -fPIC') and '_all_objs' in l for l in lines))
+
+    def test_ninja_executable_does_not_link_plugins(self):
+        lines = self.write(self.configs[:1], generator='ninja')
+        link = next(l for l in lines if ': link ' in l)
+        inputs, plugins = link.split(' || ')
+        self.assertFalse(any(p.endswith('.so') for p in inputs.split()))
+        self.assertEqual(len(plugins.split()), len([l for l in lines if ': link_plugin ' in l]))
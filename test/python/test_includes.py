@@ -0,0 +1,96 @@
+import unittest
+import json
+import os
+import tempfile
+
+import config.includes
+
+class IncludedNamesTests(unittest.TestCase):
+    def test_quoted_and_angled(self):
+        lines = ['#include "a.h"', '#  include <b.h>', '// #include "c.h"', 'int x;']
+        self.assertEqual(list(config.includes.included_names(lines)), ['a.h', 'b.h'])
+
+class IncludeScannerTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.inc_dir = os.path.join(self.tempdir.name, 'inc')
+        self.src_dir = os.path.join(self.tempdir.name, 'src')
+        os.makedirs(self.inc_dir)
+        os.makedirs(self.src_dir)
+        self.write(os.path.join(self.inc_dir, 'direct.h'), '#include "gen_a.h"\n#include <vector>\n')
+        self.write(os.path.join(self.inc_dir, 'indirect.h'), '#include "direct.h"\n#include "indirect.h"\n')
+        self.scanner = config.includes.IncludeScanner((self.inc_dir,))
+        self.generated = {'gen_a.h': [], 'gen_b.h': ['direct.h'], 'gen_c.h': []}
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def write(self, fname, contents):
+        with open(fname, 'wt') as wfp:
+            wfp.write(contents)
+
+    def test_direct_generated_include(self):
+        fname = os.path.join(self.src_dir, 'a.cc')
+        self.write(fname, '#include "gen_c.h"\n')
+        self.assertEqual(self.scanner.generated_dependencies(fname, self.generated), {'gen_c.h'})
+
+    def test_transitive_generated_include(self):
+        fname = os.path.join(self.src_dir, 'a.cc')
+        self.write(fname, '#include "indirect.h"\n')
+        self.assertEqual(self.scanner.generated_dependencies(fname, self.generated), {'gen_a.h'})
+
+    def test_includes_in_generated_headers_are_followed(self):
+        fname = os.path.join(self.src_dir, 'a.cc')
+        self.write(fname, '#include "gen_b.h"\n')
+        self.assertEqual(self.scanner.generated_dependencies(fname, self.generated), {'gen_a.h', 'gen_b.h'})
+
+    def test_no_generated_includes(self):
+        fname = os.path.join(self.src_dir, 'a.cc')
+        self.write(fname, '#include <string>\n#include "missing.h"\n')
+        self.assertEqual(self.scanner.generated_dependencies(fname, self.generated), set())
+
+    def test_relative_include(self):
+        fname = os.path.join(self.src_dir, 'a.cc')
+        self.write(os.path.join(self.src_dir, 'local.h'), '#include "gen_c.h"\n')
+        self.write(fname, '#include "local.h"\n')
+        self.assertEqual(self.scanner.generated_dependencies(fname, self.generated), {'gen_c.h'})
+
+    def test_reachable_headers(self):
+        fname = os.path.join(self.src_dir, 'a.cc')
+        self.write(fname, '#include "indirect.h"\n#include <string>\n')
+        self.assertEqual(self.scanner.reachable_headers(fname, self.generated), {'indirect.h', 'direct.h', 'gen_a.h', 'vector', 'string'})
+
+class IncludeDigestTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tempdir.name, 'a.cc')
+        self.write(self.fname, '#include "a.h"\nint x;\n')
+        self.digest_fname = os.path.join(self.tempdir.name, 'digests.json')
+        with open(self.digest_fname, 'wt') as wfp:
+            json.dump({'dir': self.tempdir.name, 'digests': config.includes.include_digests(self.tempdir.name)}, wfp)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def write(self, fname, contents):
+        with open(fname, 'wt') as wfp:
+            wfp.write(contents)
+
+    def test_unchanged(self):
+        self.assertTrue(config.includes.check([self.digest_fname]))
+
+    def test_other_changes_are_ignored(self):
+        self.write(self.fname, '#include "a.h"\nint y;\n')
+        self.write(os.path.join(self.tempdir.name, 'a.o'), '')
+        self.assertTrue(config.includes.check([self.digest_fname]))
+
+    def test_changed_include(self):
+        self.write(self.fname, '#include "b.h"\nint x;\n')
+        self.assertFalse(config.includes.check([self.digest_fname]))
+
+    def test_added_source(self):
+        self.write(os.path.join(self.tempdir.name, 'b.cc'), 'int y;\n')
+        self.assertFalse(config.includes.check([self.digest_fname]))
+
+    def test_missing_digests(self):
+        self.assertFalse(config.includes.check([os.path.join(self.tempdir.name, 'missing.json')]))
@@ -13,3 +13,101 @@ class VectorStringgTest(unittest.TestCase):
     def test_list_with_two(self):
         self.assertEqual(config.instantiation_file.vector_string(['a','b']), '{a, b}');
 
+
+class RuntimeParameterTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = {'name': 'LLC', 'sets': 2048, 'frequency': 1.0, '_offset_bits': 'champsim::lg2(64)', 'prefetch_as_load': True}
+        self.pmem = {'name': 'DRAM', 'frequency': 1.25, 'io_freq': 3200, 'rq_size': 64}
+
+    def test_only_numbers_are_read_at_run_time(self):
+        self.assertEqual(config.instantiation_file.runtime_values(self.cache, 'caches'), {'sets': 2048, 'frequency': 1.0})
+
+    def test_constants_are_compiled_in(self):
+        self.assertEqual(config.instantiation_file.runtime_values(self.pmem, 'pmem'), {'frequency': 1.25})
+
+    def test_references(self):
+        references = config.instantiation_file.get_parameter_references([], [self.cache], [], self.pmem, {})
+        self.assertEqual(references['caches'][0]['sets'], 'parameters.at("caches").at("LLC").at("sets")')
+        self.assertEqual(references['caches'][0]['_offset_bits'], 'champsim::lg2(64)')
+        self.assertEqual(references['pmem']['io_freq'], 3200)
+
+    def test_parameters_layout(self):
+        parameters = config.instantiation_file.get_runtime_parameters([], [self.cache], [], self.pmem, {'pte_page_size': 4096})
+        self.assertEqual(parameters, {'cores': {}, 'caches': {'LLC': {'sets': 2048, 'frequency': 1.0}}, 'ptws': {}, 'pmem': {'frequency': 1.25}, 'vmem': {'pte_page_size': 4096}})
+
+class PerCpuTests(unittest.TestCase):
+    @staticmethod
+    def make_cores(count, **kwargs):
+        queue = {'rq_size': 32, 'pq_size': 32, 'wq_size': 32, '_offset_bits': 'champsim::lg2(64)', '_queue_check_full_addr': False}
+        cores = [{'name': 'cpu{}'.format(i), '_index': i, 'L1I': 'cpu{}_L1I'.format(i), 'L1D': 'cpu{}_L1D'.format(i), 'frequency': 4000, **kwargs} for i in range(count)]
+        caches = [
+            *({'name': 'cpu{}_L1I'.format(i), 'lower_level': 'LLC', 'sets': 64, **queue} for i in range(count)),
+            *({'name': 'cpu{}_L1D'.format(i), 'lower_level': 'LLC', 'sets': 64, **queue} for i in range(count)),
+            {'name': 'LLC', 'lower_level': 'DRAM', 'sets': 2048, **queue}
+        ]
+        pmem = {'name': 'DRAM', 'frequency': 3200, 'io_freq': 3200, 'tRP': 12.5, 'tRCD': 12.5, 'tCAS': 12.5, 'turn_around_time': 7.5}
+        vmem = {'pte_page_size': 4096, 'num_levels': 5, 'minor_fault_penalty': 200}
+        return cores, caches, [], pmem, vmem
+
+    def test_identical_cores_are_built_in_loops(self):
+        cores, caches, ptws, pmem, vmem = self.make_cores(4)
+        self.assertEqual(config.instantiation_file.get_per_cpu_names(cores, caches, ptws, pmem), [['cpu{}_L1I'.format(i), 'cpu{}_L1D'.format(i)] for i in range(4)])
+
+        lines = list(config.instantiation_file.get_instantiation_lines(cores, caches, ptws, pmem, vmem))
+        self.assertIn('std::deque<CACHE> per_cpu_L1I = make_per_cpu<CACHE>([&](std::size_t i) {', lines)
+        self.assertIn('.l1i(&per_cpu_L1I[i])', lines)
+        self.assertIn('.upper_levels({{&per_cpu_L1I_to_LLC_queues[0], &per_cpu_L1I_to_LLC_queues[1], &per_cpu_L1I_to_LLC_queues[2], &per_cpu_L1I_to_LLC_queues[3], &per_cpu_L1D_to_LLC_queues[0], &per_cpu_L1D_to_LLC_queues[1], &per_cpu_L1D_to_LLC_queues[2], &per_cpu_L1D_to_LLC_queues[3]}})', lines)
+        self.assertIn('    std::ref(per_cpu_core[0]), std::ref(per_cpu_core[1]), std::ref(per_cpu_core[2]), std::ref(per_cpu_core[3])', lines)
+        self.assertFalse(any(l.startswith('CACHE cpu') for l in lines))
+        self.assertIn('VirtualMemory& vmem_view() override { return vmem; }', lines)
+
+    def test_cores_are_indexed_in_order(self):
+        cores, caches, ptws, pmem, vmem = self.make_cores(12)
+        cores.sort(key=lambda c: c['name'])
+        names = config.instantiation_file.get_per_cpu_names(cores, caches, ptws, pmem)
+        self.assertEqual([n[0] for n in names], ['cpu{}_L1I'.format(i) for i in range(12)])
+
+        lines = list(config.instantiation_file.get_instantiation_lines(cores, caches, ptws, pmem, vmem))
+        self.assertIn('    ' + ', '.join('std::ref(per_cpu_core[{}])'.format(c['_index']) for c in cores), lines)
+
+    def test_different_cores_are_unrolled(self):
+        cores, caches, ptws, pmem, vmem = self.make_cores(2)
+        cores[1]['frequency'] = 2000
+        self.assertIsNone(config.instantiation_file.get_per_cpu_names(cores, caches, ptws, pmem))
+        self.assertEqual(config.instantiation_file.get_per_cpu_names(cores, caches, ptws, pmem, runtime_parameters=True), [['cpu0_L1I', 'cpu0_L1D'], ['cpu1_L1I', 'cpu1_L1D']])
+
+        lines = list(config.instantiation_file.get_instantiation_lines(cores, caches, ptws, pmem, vmem))
+        self.assertIn('O3_CPU cpu1{O3_CPU::Builder{ champsim::defaults::default_core }', lines)
+        self.assertIn('VirtualMemory& vmem_view() override { return vmem; }', lines)
+
+    def test_single_core_is_unrolled(self):
+        self.assertIsNone(config.instantiation_file.get_per_cpu_names(*self.make_cores(1)[:4]))
+
+    def test_runtime_parameters_are_read_by_name(self):
+        cores, caches, ptws, pmem, vmem = self.make_cores(2)
+        lines = list(config.instantiation_file.get_instantiation_lines(cores, caches, ptws, pmem, vmem, runtime_parameters=True))
+        self.assertIn('.sets(parameters.at("caches").at(per_cpu_L1D_names[i]).at("sets"))', lines)
+        self.assertIn('.sets(parameters.at("caches").at("LLC").at("sets"))', lines)
+
+class PluginTests(unittest.TestCase):
+    def setUp(self):
+        cores, caches, ptws, pmem, vmem = PerCpuTests.make_cores(2, _branch_predictor_data=[{'name': 'branchDbimodal'}])
+        caches[-1]['_prefetcher_data'] = [{'name': 'prefetcherDnext_line'}, {'name': 'prefetcherDip_stride'}]
+        caches[-1]['_replacement_data'] = [{'name': 'replacementDlru'}]
+        self.elements = {'cores': cores, 'caches': caches, 'ptws': ptws, 'pmem': pmem, 'vmem': vmem}
+        self.plugins = {'branchDbimodal': '/obj/branchDbimodal.so', 'prefetcherDnext_line': '/obj/prefetcherDnext_line.so'}
+
+    def test_modules_are_loaded_by_name(self):
+        lines = list(config.instantiation_file.get_instantiation_lines(**self.elements, plugins=self.plugins))
+        self.assertIn('#include "module_plugin.h"', lines)
+        self.assertIn('  {"branchDbimodal", "/obj/branchDbimodal.so"},', lines)
+        self.assertIn('.prefetcher_plugins({{plugins.prefetcher("prefetcherDnext_line"), plugins.prefetcher("prefetcherDip_stride")}})', lines)
+        self.assertIn('.replacement_plugins({plugins.replacement("replacementDlru")})', lines)
+        self.assertIn('.branch_predictor_plugins({plugins.branch_predictor("branchDbimodal")})', lines)
+        self.assertFalse(any(l.startswith('.prefetcher<') and l != '.prefetcher<0>()' for l in lines))
+
+    def test_default_modules_are_cleared(self):
+        lines = list(config.instantiation_file.get_instantiation_lines(**self.elements, plugins=self.plugins))
+        self.assertEqual(lines.count('.btb<0>()'), 1)
+        self.assertEqual(lines.count('.prefetcher<0>()'), 3)
+        self.assertFalse(any('_plugins(' in l for l in config.instantiation_file.get_instantiation_lines(**self.elements)))
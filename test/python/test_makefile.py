@@ -1,4 +1,5 @@
 import unittest
+import os
 
 import config.makefile
 
@@ -19,3 +20,16 @@ class EachInDictListTests(unittest.TestCase):
             }
         self.assertEqual(list(config.makefile.each_in_dict_list(a)), [ ('a',1), ('a',2), ('b',3), ('b',4) ])
 
+
+    def test_string(self):
+        a = { 'a': 'flag' }
+        self.assertEqual(list(config.makefile.each_in_dict_list(a)), [ ('a','flag') ])
+
+class ConfigureTests(unittest.TestCase):
+
+    def test_prefix_is_absolute(self):
+        self.assertIn('configured_prefix = ' + os.path.abspath('out'), list(config.makefile.get_configure_lines('out', ['./config.sh'])))
+
+    def test_command_is_escaped(self):
+        lines = list(config.makefile.get_configure_lines('out', ['./config.sh', 'a b.json', '$HOME.json']))
+        self.assertIn("configure_command = cd {} && ./config.sh 'a b.json' '$$HOME.json'".format(os.getcwd()), lines)
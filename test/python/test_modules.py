@@ -0,0 +1,98 @@
+import unittest
+import os
+import tempfile
+
+import config.modules
+
+class ModuleRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.search_dir = os.path.join(self.tempdir.name, 'prefetcher')
+        os.makedirs(os.path.join(self.search_dir, 'a'))
+        os.makedirs(os.path.join(self.search_dir, 'b'))
+        with open(os.path.join(self.search_dir, 'README'), 'wt') as wfp:
+            wfp.write('not a module')
+        self.registry_fname = os.path.join(self.tempdir.name, 'registry.json')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_subdirectories_match_walk(self):
+        registry = config.modules.ModuleRegistry()
+        self.assertEqual(registry.subdirectories(self.search_dir), next(os.walk(self.search_dir))[1])
+
+    def test_exists_matches_os(self):
+        registry = config.modules.ModuleRegistry()
+        registry.listing(self.search_dir)
+        for name in ('a', 'b', 'README', 'c', '.', '..', 'a/x'):
+            with self.subTest(name=name):
+                path = os.path.join(self.search_dir, name)
+                self.assertEqual(registry.exists(path), os.path.exists(path))
+
+    def test_missing_directory(self):
+        registry = config.modules.ModuleRegistry()
+        self.assertFalse(registry.isdir(os.path.join(self.tempdir.name, 'nonexistent')))
+        self.assertFalse(registry.isdir(os.path.join(self.search_dir, 'README')))
+
+    def test_persisted_listing_is_reused(self):
+        registry = config.modules.ModuleRegistry()
+        registry.listing(self.search_dir)
+        registry.save(self.registry_fname)
+
+        reloaded = config.modules.ModuleRegistry(self.registry_fname)
+        reloaded.listing(self.search_dir)
+        self.assertFalse(reloaded.dirty)
+
+    def test_modified_directory_is_rescanned(self):
+        registry = config.modules.ModuleRegistry()
+        registry.listing(self.search_dir)
+        registry.save(self.registry_fname)
+
+        os.makedirs(os.path.join(self.search_dir, 'c'))
+        os.utime(self.search_dir, ns=(0,0)) # Guarantee that the modification time changes
+
+        reloaded = config.modules.ModuleRegistry(self.registry_fname)
+        self.assertIn('c', reloaded.subdirectories(self.search_dir))
+
+    def test_invalidate_rescans(self):
+        registry = config.modules.ModuleRegistry()
+        registry.listing(self.search_dir)
+        os.makedirs(os.path.join(self.search_dir, 'c'))
+        os.utime(self.search_dir, ns=(0,0))
+        self.assertNotIn('c', registry.subdirectories(self.search_dir))
+
+        registry.invalidate()
+        self.assertIn('c', registry.subdirectories(self.search_dir))
+
+class ModuleSearchContextTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        for d in ('first/a', 'second/a', 'second/b'):
+            os.makedirs(os.path.join(self.tempdir.name, d))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_find_prefers_earlier_paths(self):
+        context = config.modules.ModuleSearchContext([os.path.join(self.tempdir.name, d) for d in ('first', 'second')], registry=config.modules.ModuleRegistry())
+        self.assertEqual(os.path.abspath(context.find('a')['fname']), os.path.join(self.tempdir.name, 'first', 'a'))
+        self.assertEqual(os.path.abspath(context.find('b')['fname']), os.path.join(self.tempdir.name, 'second', 'b'))
+
+    def test_find_is_shared_between_contexts(self):
+        registry = config.modules.ModuleRegistry()
+        paths = [os.path.join(self.tempdir.name, d) for d in ('first', 'second')]
+        found = config.modules.ModuleSearchContext(paths, registry=registry).find('b')
+        os.rmdir(os.path.join(self.tempdir.name, 'second', 'b'))
+        self.assertEqual(config.modules.ModuleSearchContext(paths, registry=registry).find('b'), found)
+
+    def test_find_after_invalidate(self):
+        registry = config.modules.ModuleRegistry()
+        paths = [os.path.join(self.tempdir.name, d) for d in ('first', 'second')]
+        config.modules.ModuleSearchContext(paths, registry=registry).find('b')
+        os.makedirs(os.path.join(self.tempdir.name, 'first', 'b'))
+        registry.invalidate()
+        self.assertEqual(os.path.abspath(config.modules.ModuleSearchContext(paths, registry=registry).find('b')['fname']), os.path.join(self.tempdir.name, 'first', 'b'))
+
+    def test_find_all(self):
+        context = config.modules.ModuleSearchContext([os.path.join(self.tempdir.name, d) for d in ('first', 'second', 'nonexistent')], registry=config.modules.ModuleRegistry())
+        self.assertEqual(sorted(os.path.relpath(m['fname'], self.tempdir.name) for m in context.find_all()), ['first/a', 'second/a', 'second/b'])
@@ -0,0 +1,45 @@
+import unittest
+import os
+
+import config.ninja
+
+class EscapePathTests(unittest.TestCase):
+    def test_plain(self):
+        self.assertEqual(config.ninja.escape_path('/a/b.o'), '/a/b.o')
+
+    def test_special_characters(self):
+        self.assertEqual(config.ninja.escape_path('/a b/c:d$e'), '/a$ b/c$:d$$e')
+
+class BuildTests(unittest.TestCase):
+    def test_edge(self):
+        self.assertEqual(list(config.ninja.build(('a.o',), 'cxx', ('a.cc',))), ['build a.o: cxx a.cc'])
+
+    def test_edge_variables(self):
+        self.assertEqual(list(config.ninja.build(('a',), 'link', ('a.o', 'b.o'), variables={'ldlibs': '${ldlibs} -lm'})), ['build a: link a.o b.o', '  ldlibs = ${ldlibs} -lm'])
+
+class PreludeTests(unittest.TestCase):
+    def variables(self, environ):
+        lines = config.ninja.get_prelude_lines('obj', environ=environ, root_dir='/nonexistent')
+        return dict(l.split(' = ', 1) for l in lines if ' = ' in l and not l.startswith(' '))
+
+    def test_default_compiler(self):
+        self.assertEqual(self.variables({})['cxx'], 'g++')
+
+    def test_environment_is_read(self):
+        prelude = self.variables({'CXX': 'clang++', 'CXXFLAGS': '-g'})
+        self.assertEqual(prelude['cxx'], 'clang++')
+        self.assertTrue(prelude['cxxflags'].startswith('-g '))
+
+class SharedOptsTests(unittest.TestCase):
+    def test_one_edge_per_source(self):
+        lines = list(config.ninja.shared_opts('/obj', 'abcd', '/src', '/src', ['a', 'b'], {}))
+        self.assertEqual([l for l in lines if l.startswith('build ')], ['build /obj/abcd/obj/a.o: cxx /src/a.cc', 'build /obj/abcd/obj/b.o: cxx /src/b.cc'])
+
+    def test_module_flags(self):
+        lines = list(config.ninja.shared_opts('/obj', 'abcd', '/mod', '/mod', ['a'], {'CPPFLAGS': '-DX'}, module_name='mod', opts={'CPPFLAGS': ('-DCHAMPSIM_MODULE',)}))
+        cppflags = next(l for l in lines if l.startswith('abcd_cppflags = '))
+        self.assertEqual(cppflags, 'abcd_cppflags = ${cppflags} -I/mod -DCHAMPSIM_MODULE -I/obj/abcd/inc -include mod.inc -DX')
+
+    def test_compiler_override(self):
+        lines = list(config.ninja.shared_opts('/obj', 'abcd', '/src', '/src', ['a'], {'CXX': 'clang++'}))
+        self.assertIn('  cxx = clang++', lines)
@@ -0,0 +1,88 @@
+import unittest
+import operator
+import os
+import pickle
+import shutil
+import tempfile
+import unittest.mock
+
+import config.filewrite
+import config.parallel
+import config.parse
+
+class OrderedMapTests(unittest.TestCase):
+
+    def test_results_are_in_order(self):
+        self.assertEqual(list(config.parallel.ordered_map(operator.neg, range(100), jobs=4)), [-x for x in range(100)])
+
+    def test_window_smaller_than_input(self):
+        self.assertEqual(list(config.parallel.ordered_map(operator.neg, range(10), jobs=2, window=1)), [-x for x in range(10)])
+
+    def test_empty(self):
+        self.assertEqual(list(config.parallel.ordered_map(operator.neg, [], jobs=2)), [])
+
+class WriterPickleTests(unittest.TestCase):
+
+    def test_collected_file_parts_are_not_sent(self):
+        wr = config.filewrite.FileWriter(bindir_name='bin', objdir_name='obj')
+        wr.write_fileparts([('a.mk', ['x'])])
+        copy = pickle.loads(pickle.dumps(wr))
+        self.assertEqual(copy.fileparts, [])
+        self.assertEqual((copy.bindir_name, copy.objdir_name), ('bin', 'obj'))
+
+    def test_streaming_writer_can_be_sent(self):
+        with tempfile.TemporaryDirectory() as dtemp:
+            wr = config.filewrite.FileWriter(bindir_name='bin', objdir_name=dtemp, streaming=True)
+            wr.spool(os.path.join(dtemp, 'shared.mk'), ['x'])
+            wr.write_fileparts([(os.path.join(dtemp, 'private.h'), ['y'])])
+            copy = pickle.loads(pickle.dumps(wr))
+            wr.finish()
+        self.assertEqual(copy.spool_files, {})
+        self.assertEqual(copy.manifest.entries, {})
+        self.assertTrue(copy.streaming)
+
+class RenderConfigsTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.makefile_name = os.path.join(self.tempdir.name, '_configuration.mk')
+        self.patches = (
+            unittest.mock.patch.object(config.filewrite, 'makefile_file_name', self.makefile_name),
+            unittest.mock.patch.object(config.filewrite, 'shared_file_names', (self.makefile_name,))
+        )
+        for p in self.patches:
+            p.start()
+        self.configs = [{'executable_name': 'a'}, {'executable_name': 'b', 'rob_size': 27}, {'executable_name': 'c', 'rob_size': 27}, {'executable_name': 'd', 'num_cores': 2}]
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tempdir.cleanup()
+
+    def read_tree(self, root):
+        retval = {}
+        for base, _, files in os.walk(root):
+            for f in files:
+                if f == config.filewrite.manifest_file_name:
+                    continue
+                with open(os.path.join(base, f), 'rb') as rfp:
+                    retval[os.path.relpath(os.path.join(base, f), root)] = rfp.read()
+        return retval
+
+    def configure(self, objdir, jobs):
+        with config.filewrite.writer(os.path.join(self.tempdir.name, 'bin'), objdir, streaming=True) as wr:
+            if jobs > 1:
+                for rendered in config.parallel.render_configs(wr, [(c,) for c in self.configs], jobs):
+                    wr.write_build(*rendered)
+            else:
+                for c in self.configs:
+                    wr.write_files(config.parse.parse_config(c))
+        with open(self.makefile_name, 'rb') as rfp:
+            makefile_contents = rfp.read()
+        os.remove(self.makefile_name)
+        return self.read_tree(objdir), makefile_contents
+
+    def test_parallel_matches_serial(self):
+        objdir = os.path.join(self.tempdir.name, 'obj')
+        serial = self.configure(objdir, jobs=1)
+        shutil.rmtree(objdir)
+        self.assertEqual(self.configure(objdir, jobs=2), serial)
@@ -0,0 +1,229 @@
+import unittest
+import unittest.mock
+import json
+import multiprocessing
+import os
+import stat
+import sys
+import tempfile
+
+import config.runner
+
+# Stands in for a simulator: writes the arguments it was given as its statistics, and fails on a trace named "bad".
+# Each execution is also recorded in the file named by FAKE_SIMULATOR_LOG, if it is set.
+fake_simulator = '''#!{}
+import json, os, sys
+args = sys.argv[1:]
+json_name = args[args.index('--json')+1]
+if 'FAKE_SIMULATOR_LOG' in os.environ:
+    with open(os.environ['FAKE_SIMULATOR_LOG'], 'at') as wfp:
+        wfp.write(args[-1] + '\\n')
+if any(os.path.basename(a) == 'bad' for a in args):
+    sys.exit(2)
+with open(json_name, 'wt') as wfp:
+    json.dump({{'args': args, 'cores': sorted(os.sched_getaffinity(0))}}, wfp)
+'''.format(sys.executable)
+
+class RunIdTests(unittest.TestCase):
+    def test_ids_are_stable(self):
+        first = list(config.runner.get_runs(['/bin/a'], [['x']], [1, 2], [10]))
+        second = list(config.runner.get_runs(['/bin/a'], [['x']], [1, 2], [10]))
+        self.assertEqual([r['id'] for r in first], [r['id'] for r in second])
+        self.assertEqual(len({r['id'] for r in first}), 2)
+
+    def test_every_combination_is_run(self):
+        runs = list(config.runner.get_runs(['/bin/a', '/bin/b'], [['x'], ['y', 'z']], [1, 2], [10]))
+        self.assertEqual(len(runs), 8)
+        self.assertIn([os.path.abspath('y'), os.path.abspath('z')], [r['traces'] for r in runs])
+
+    def test_command(self):
+        run = next(config.runner.get_runs(['/bin/a'], [['x', 'y']], [1], [None]))
+        self.assertEqual(config.runner.get_command(run, 'r.json', ['--hide-heartbeat']), ['/bin/a', '--warmup-instructions', '1', '--json', 'r.json', '--hide-heartbeat', os.path.abspath('x'), os.path.abspath('y')])
+
+    def test_trace_groups(self):
+        self.assertEqual(config.runner.parse_trace_group('a,b'), ['a', 'b'])
+        with tempfile.NamedTemporaryFile('wt', suffix='.txt', delete=False) as wfp:
+            wfp.write('# traces\na\n\nb,c\n')
+        try:
+            self.assertEqual(config.runner.read_trace_groups(wfp.name), [['a'], ['b', 'c']])
+        finally:
+            os.remove(wfp.name)
+
+class RunAllTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.bindir = os.path.join(self.tempdir.name, 'bin')
+        self.results = os.path.join(self.tempdir.name, 'results')
+        os.makedirs(self.bindir)
+        self.executable = os.path.join(self.bindir, 'champsim')
+        with open(self.executable, 'wt') as wfp:
+            wfp.write(fake_simulator)
+        os.chmod(self.executable, stat.S_IRWXU)
+        with open(self.executable + config.runner.parameters_file_suffix, 'wt') as wfp:
+            wfp.write('{}')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_executables_are_found(self):
+        self.assertEqual(config.runner.find_executables(self.bindir), [self.executable])
+
+    def test_statistics_are_collected(self):
+        runs = list(config.runner.get_runs([self.executable], [['a'], ['b']], [5]))
+        entries = list(config.runner.run_all(runs, self.results, jobs=2))
+        self.assertEqual(sorted(e['id'] for e in entries), sorted(r['id'] for r in runs))
+        self.assertTrue(all(e['status'] == 0 for e in entries))
+
+        results = list(config.runner.collect(self.results))
+        self.assertEqual(len(results), 2)
+        for r in results:
+            self.assertEqual(r['stats']['args'][:2], ['--warmup-instructions', '5'])
+            self.assertEqual(len(r['stats']['cores']), 1)
+
+    def test_build_is_recorded(self):
+        with open(self.executable + config.runner.build_info_file_suffix, 'wt') as wfp:
+            json.dump({'build_id': 'abcd', 'parameters': {}}, wfp)
+        runs = list(config.runner.get_runs([self.executable], [['a']]))
+        self.assertEqual([e['build_id'] for e in config.runner.run_all(runs, self.results, jobs=1)], ['abcd'])
+
+    def test_completed_runs_are_not_repeated(self):
+        runs = list(config.runner.get_runs([self.executable], [['a'], ['bad']]))
+        first = list(config.runner.run_all(runs, self.results, jobs=1))
+        self.assertEqual(sorted(e['status'] for e in first), [0, 2])
+
+        second = list(config.runner.run_all(runs, self.results, jobs=1))
+        self.assertEqual([e['traces'] for e in second], [[os.path.abspath('bad')]])
+        self.assertEqual(len(config.runner.load_journal(self.results)), 2)
+
+    def test_cut_short_entry_is_skipped(self):
+        os.makedirs(self.results)
+        with open(os.path.join(self.results, config.runner.journal_file_name), 'wt') as wfp:
+            wfp.write(json.dumps({'id': 'aaaa', 'status': 0}) + '\n')
+            wfp.write('{"id": "bbbb", "sta')
+        self.assertEqual(list(config.runner.load_journal(self.results)), ['aaaa'])
+
+# The statistics of a phase, as they are written by the simulator
+def get_phase_stats(name, instructions, llc_misses):
+    region = {
+        'cores': [{'instructions': instructions, 'cycles': 2*instructions, 'mispredict': {'BRANCH_CONDITIONAL': 3}}],
+        'DRAM': [{'RQ ROW_BUFFER_HIT': 1, 'AVG DBUS CONGESTED CYCLE': None}],
+        'LLC': {'LOAD': {'hit': 10, 'miss': llc_misses}, 'miss latency': 12.5}
+    }
+    return {'name': name, 'traces': ['a'], 'roi': region, 'sim': region}
+
+class IngestTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.results = os.path.join(self.tempdir.name, 'results')
+        self.store = os.path.join(self.tempdir.name, 'results.db')
+        self.executable = os.path.join(self.tempdir.name, 'champsim')
+        with open(self.executable + config.runner.build_info_file_suffix, 'wt') as wfp:
+            json.dump({'build_id': 'abcd', 'parameters': {'LLC.sets': 2048, 'LLC.replacement': 'lru'}}, wfp)
+        os.makedirs(self.results)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def add_result(self, traces, llc_misses, build_id='abcd', status=0):
+        run = next(config.runner.get_runs([self.executable], [traces], [10], [1000]))
+        json_name, _ = config.runner.get_result_names(self.results, run['id'])
+        with open(json_name, 'wt') as wfp:
+            json.dump([get_phase_stats('Simulation', 1000, llc_misses)], wfp)
+        config.runner.append_journal(self.results, {**run, 'status': status, 'build_id': build_id})
+        return run
+
+    def test_statistics_are_named_by_path(self):
+        self.add_result(['a'], 5)
+        self.add_result(['b'], 7)
+        self.assertEqual(config.runner.ingest(self.results, self.store), 2)
+
+        rows = list(config.runner.query(self.store, '''
+            SELECT t.trace, p.value, 1000.0 * m.value / i.value FROM stats m
+            JOIN stats i ON i.run = m.run AND i.phase = m.phase AND i.name = 'roi.cores.0.instructions'
+            JOIN parameters p ON p.run = m.run AND p.name = 'LLC.sets'
+            JOIN traces t ON t.run = m.run
+            WHERE m.name = 'roi.LLC.LOAD.miss' AND m.phase = 'Simulation' ORDER BY t.trace'''))
+        self.assertEqual(rows[1:], [(os.path.abspath('a'), 2048, 5.0), (os.path.abspath('b'), 2048, 7.0)])
+
+        names = {r[0] for r in config.runner.query(self.store, 'SELECT name FROM stat_names')}
+        self.assertIn('sim.cores.0.mispredict.BRANCH_CONDITIONAL', names)
+        self.assertIn('roi.DRAM.0.RQ ROW_BUFFER_HIT', names)
+        self.assertNotIn('roi.DRAM.0.AVG DBUS CONGESTED CYCLE', names)
+
+    def test_runs_are_ingested_once(self):
+        self.add_result(['a'], 5)
+        self.add_result(['bad'], 5, status=1)
+        self.assertEqual(config.runner.ingest(self.results, self.store), 1)
+        self.add_result(['b'], 7)
+        self.assertEqual(config.runner.ingest(self.results, self.store), 1)
+        self.assertEqual(list(config.runner.query(self.store, 'SELECT COUNT(*) FROM stats WHERE name = ?', ('roi.LLC.LOAD.miss',)))[1:], [(2,)])
+
+    def test_parameters_of_another_build_are_not_used(self):
+        run = self.add_result(['a'], 5, build_id='ef01')
+        config.runner.ingest(self.results, self.store)
+        self.assertEqual(list(config.runner.query(self.store, 'SELECT build_id FROM runs WHERE id = ?', (run['id'],)))[1:], [('ef01',)])
+        self.assertEqual(list(config.runner.query(self.store, 'SELECT COUNT(*) FROM parameters'))[1:], [(0,)])
+
+def hold_claim(lock_name, claimed, release):
+    fd = config.runner.try_claim(lock_name)
+    claimed.set()
+    release.wait()
+    config.runner.release(fd)
+
+class QueueTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.queue = os.path.join(self.tempdir.name, 'queue')
+        self.executable = os.path.join(self.tempdir.name, 'champsim')
+        with open(self.executable, 'wt') as wfp:
+            wfp.write(fake_simulator)
+        os.chmod(self.executable, stat.S_IRWXU)
+        self.executions = os.path.join(self.tempdir.name, 'executions')
+        self.patch = unittest.mock.patch.dict(os.environ, {'FAKE_SIMULATOR_LOG': self.executions})
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tempdir.cleanup()
+
+    def read_executions(self):
+        with open(self.executions) as rfp:
+            return rfp.read().splitlines()
+
+    def test_each_run_is_executed_once(self):
+        runs = list(config.runner.get_runs([self.executable], [['t{}'.format(i)] for i in range(12)]))
+        self.assertEqual(config.runner.enqueue(runs, self.queue), 12)
+        self.assertEqual(config.runner.enqueue(runs, self.queue), 0)
+
+        workers = [multiprocessing.Process(target=config.runner.work_and_print, args=(self.queue, (), False, 0.1)) for _ in range(4)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+        self.assertEqual(sorted(self.read_executions()), sorted(r['traces'][0] for r in runs))
+        self.assertEqual(len(list(config.runner.collect(self.queue))), 12)
+        self.assertFalse(any(n.endswith('.part') for _, _, files in os.walk(self.queue) for n in files))
+
+    def test_claimed_runs_are_left_to_their_worker(self):
+        runs = list(config.runner.get_runs([self.executable], [['a'], ['b']]))
+        config.runner.enqueue(runs, self.queue)
+        _, lock_name, _ = config.runner.get_queue_names(self.queue, runs[0]['id'])
+        claimed, release = multiprocessing.Event(), multiprocessing.Event()
+        holder = multiprocessing.Process(target=hold_claim, args=(lock_name, claimed, release))
+        holder.start()
+        claimed.wait()
+
+        self.assertEqual([e['id'] for e in config.runner.work(self.queue)], [runs[1]['id']])
+
+        # The claim is released when its worker exits, and the run is taken over
+        release.set()
+        holder.join()
+        self.assertEqual([e['id'] for e in config.runner.work(self.queue)], [runs[0]['id']])
+
+    def test_failed_runs_are_retried(self):
+        runs = list(config.runner.get_runs([self.executable], [['a'], ['bad']]))
+        config.runner.enqueue(runs, self.queue)
+        self.assertEqual(sorted(e['status'] for e in config.runner.work(self.queue)), [0, 2])
+        self.assertEqual(config.runner.enqueue(runs, self.queue), 1)
+        self.assertEqual([e['traces'] for e in config.runner.work(self.queue)], [[os.path.abspath('bad')]])
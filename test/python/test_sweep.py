@@ -0,0 +1,86 @@
+import unittest
+import itertools
+
+import config.parse
+import config.sweep
+import config.util
+
+class SweepValuesTests(unittest.TestCase):
+    def test_list(self):
+        self.assertEqual(config.sweep.sweep_values({'sweep': [1,2,3]}), [1,2,3])
+
+    def test_step(self):
+        self.assertEqual(config.sweep.sweep_values({'sweep': {'start': 1, 'stop': 7, 'step': 3}}), [1,4,7])
+
+    def test_default_step(self):
+        self.assertEqual(config.sweep.sweep_values({'sweep': {'start': 1, 'stop': 3}}), [1,2,3])
+
+    def test_factor(self):
+        self.assertEqual(config.sweep.sweep_values({'sweep': {'start': 1024, 'stop': 8192, 'factor': 2}}), [1024, 2048, 4096, 8192])
+
+    def test_invalid(self):
+        for spec in ({'start': 1}, {'start': 1, 'stop': 2, 'step': 0}, {'start': 1, 'stop': 2, 'factor': 1}, {'start': 1, 'stop': 2, 'step': 1, 'factor': 2}, 5):
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    config.sweep.sweep_values({'sweep': spec})
+
+class ExpandTests(unittest.TestCase):
+    def test_no_sweep_is_unchanged(self):
+        a = {'name': 'a', 'rob_size': 12}
+        self.assertEqual(list(config.sweep.expand(a)), [a])
+
+    def test_single_sweep(self):
+        a = {'name': 'a', 'rob_size': {'sweep': [128, 256]}}
+        result = list(config.sweep.expand(a))
+        self.assertEqual([r['rob_size'] for r in result], [128, 256])
+
+    def test_nested_sweep(self):
+        a = {'LLC': {'sets': {'sweep': [1024, 2048]}, 'ways': 16}}
+        result = list(config.sweep.expand(a))
+        self.assertEqual(result[0]['LLC'], {'sets': 1024, 'ways': 16})
+        self.assertEqual(result[1]['LLC'], {'sets': 2048, 'ways': 16})
+
+    def test_sweep_in_list(self):
+        a = {'ooo_cpu': [{'rob_size': {'sweep': [1, 2]}}, {'rob_size': 3}]}
+        result = list(config.sweep.expand(a))
+        self.assertEqual([r['ooo_cpu'] for r in result], [[{'rob_size': 1}, {'rob_size': 3}], [{'rob_size': 2}, {'rob_size': 3}]])
+
+    def test_product_of_sweeps(self):
+        a = {'rob_size': {'sweep': [1, 2]}, 'lq_size': {'sweep': [3, 4, 5]}}
+        result = list(config.sweep.expand(a))
+        self.assertEqual([(r['rob_size'], r['lq_size']) for r in result], list(itertools.product([1,2], [3,4,5])))
+
+    def test_names_are_distinct(self):
+        for a in ({'name': 'a', 'rob_size': {'sweep': [1, 2]}}, {'rob_size': {'sweep': [1, 2]}}, {'executable_name': 'a', 'rob_size': {'sweep': [1, 2]}}):
+            with self.subTest(config=a):
+                names = [(r.get('name'), r.get('executable_name')) for r in config.sweep.expand(a)]
+                self.assertEqual(len(set(names)), 2)
+
+    def test_original_is_not_modified(self):
+        a = {'LLC': {'sets': {'sweep': [1024, 2048]}}}
+        list(config.sweep.expand(a))
+        self.assertEqual(a, {'LLC': {'sets': {'sweep': [1024, 2048]}}})
+
+class ExpandProductTests(unittest.TestCase):
+    def test_matches_product_without_sweeps(self):
+        a = [{'name': 'a'}, {'name': 'b'}]
+        b = [{'name': 'c'}, {'name': 'd'}]
+        self.assertEqual(list(config.sweep.expand_product(a, b, ({},))), list(itertools.product(a, b, ({},))))
+
+    def test_is_lazy(self):
+        a = [{'rob_size': {'sweep': {'start': 1, 'stop': 100000}}}]
+        b = [{'lq_size': {'sweep': {'start': 1, 'stop': 100000}}}]
+        first = next(config.sweep.expand_product(a, b))
+        self.assertEqual((first[0]['rob_size'], first[1]['lq_size']), (1, 1))
+
+    def test_names_are_distinct_when_another_file_names_the_executable(self):
+        a = [{'rob_size': {'sweep': [128, 256, 512]}}]
+        b = [{'executable_name': 'bin/champsim', 'rob_size': 64}]
+        names = [config.parse.executable_name(*c) for c in config.sweep.expand_product(a, b, ({},))]
+        self.assertEqual(len(set(names)), 3)
+        self.assertTrue(all(n.startswith('bin/champsim_') for n in names))
+
+    def test_sweep_values_take_precedence(self):
+        a = [{'rob_size': {'sweep': [128, 256]}}]
+        b = [{'executable_name': 'champsim', 'rob_size': 64}]
+        self.assertEqual([config.util.chain(*c)['rob_size'] for c in config.sweep.expand_product(a, b)], [128, 256])
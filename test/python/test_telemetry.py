@@ -0,0 +1,67 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+import config.telemetry
+
+class RecordTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.log_name = os.path.join(self.tempdir.name, 'log', config.telemetry.log_file_name)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_status_is_returned(self):
+        self.assertEqual(config.telemetry.record(self.log_name, 'a.o', [sys.executable, '-c', 'raise SystemExit(3)']), 3)
+
+    def test_entry_is_appended(self):
+        config.telemetry.record(self.log_name, 'a.o', [sys.executable, '-c', 'pass'])
+        config.telemetry.record(self.log_name, 'b', [sys.executable, '-c', 'pass'], build_id='abcd')
+        with open(self.log_name) as rfp:
+            entries = [json.loads(l) for l in rfp]
+        self.assertEqual([e['target'] for e in entries], [os.path.abspath('a.o'), os.path.abspath('b')])
+        self.assertNotIn('build_id', entries[0])
+        self.assertEqual(entries[1]['build_id'], 'abcd')
+
+    def test_latest_successful_entry_is_loaded(self):
+        os.makedirs(os.path.dirname(self.log_name))
+        with open(self.log_name, 'wt') as wfp:
+            wfp.write(json.dumps({'target': '/a.o', 'seconds': 1, 'status': 0}) + '\n')
+            wfp.write(json.dumps({'target': '/a.o', 'seconds': 2, 'status': 0}) + '\n')
+            wfp.write(json.dumps({'target': '/a.o', 'seconds': 3, 'status': 1}) + '\n')
+            wfp.write('{"target": "/b.o", "sec')
+        self.assertEqual(config.telemetry.load_log(self.log_name), {'/a.o': {'target': '/a.o', 'seconds': 2, 'status': 0}})
+
+class SummarizeTests(unittest.TestCase):
+    def setUp(self):
+        self.units = {
+            'aaaa': {'module': None},
+            'bbbb': {'module': 'replacementDlru', 'path': '/champsim/replacement/lru'},
+            'cccc': {'module': None, 'includes': ['cache.h']}
+        }
+        self.builds = {'1111': {'units': ['aaaa', 'bbbb', 'cccc']}, '2222': {'units': ['aaaa']}}
+        self.entries = {
+            '/obj/shared/aaaa/obj/cache.o': {'target': '/obj/shared/aaaa/obj/cache.o', 'seconds': 4.0},
+            '/obj/shared/bbbb/obj/lru.o': {'target': '/obj/shared/bbbb/obj/lru.o', 'seconds': 1.0},
+            '/obj/shared/cccc/pch/champsim_pch.h.gch': {'target': '/obj/shared/cccc/pch/champsim_pch.h.gch', 'seconds': 2.0},
+            '/bin/champsim': {'target': '/bin/champsim', 'seconds': 0.5, 'build_id': '1111'}
+        }
+        self.summary = config.telemetry.summarize(self.entries, self.units, self.builds, '/obj')
+
+    def test_targets_are_sorted(self):
+        self.assertEqual([t['seconds'] for t in self.summary['targets']], [4.0, 2.0, 1.0, 0.5])
+        self.assertEqual([t['kind'] for t in self.summary['targets']], ['compile', 'pch', 'compile', 'link'])
+
+    def test_modules(self):
+        self.assertEqual(self.summary['modules'], {'(core)': 4.0, '(precompiled headers)': 2.0, os.path.join('replacement', 'lru'): 1.0})
+
+    def test_shared_objects_count_in_each_build(self):
+        self.assertEqual(self.summary['builds']['1111'], {'compile': 7.0, 'link': 0.5, 'units': 3})
+        self.assertEqual(self.summary['builds']['2222'], {'compile': 4.0, 'link': 0.0, 'units': 1})
+
+    def test_links_have_no_unit(self):
+        self.assertIsNone(config.telemetry.get_unit_key('/bin/champsim', '/obj'))
+        self.assertEqual(config.telemetry.get_unit_key('/obj/shared/aaaa/obj/src/cache.o', '/obj'), 'aaaa')
@@ -29,6 +29,23 @@ class ChainTests(unittest.TestCase):
         self.assertEqual(config.util.chain(a,b), {'a': {'a.a': 2}, 'b': 'test'});
         self.assertEqual(config.util.chain(b,a), {'a': {'a.a': 3}, 'b': 'test'});
 
+    def test_chain_many_lists(self):
+        a = {'a': [1]}
+        b = {'a': [2]}
+        c = {'a': [3]}
+        self.assertEqual(config.util.chain(a,b,c), {'a': [1,2,3]});
+
+    def test_chain_dict_merges_past_nondict(self):
+        a = {'a': {'a.a': 1}}
+        b = {'a': 2}
+        c = {'a': {'a.b': 3}}
+        self.assertEqual(config.util.chain(a,b,c), {'a': {'a.a': 1, 'a.b': 3}});
+
+    def test_chain_key_order(self):
+        a = {'a': 1, 'c': 1}
+        b = {'b': 2, 'a': 2}
+        self.assertEqual(list(config.util.chain(a,b)), ['b', 'a', 'c']);
+
 class SubdictTests(unittest.TestCase):
     def test_subdict_removes_keys(self):
         self.assertEqual(config.util.subdict({'a':1, 'b':2, 'c':3}, ('a','b')), {'a':1, 'b':2})
@@ -42,6 +59,10 @@ class CombineNamedTests(unittest.TestCase):
         b = [{'name': 'a', 'k': 2}, {'name': 'b', 'k': 2}]
         self.assertEqual(config.util.combine_named(a,b), {'a': {'name': 'a', 'k': 1}, 'b': {'name': 'b', 'k': 2}})
 
+    def test_combine_named_sorted(self):
+        a = [{'name': 'b', 'k': 1}, {'name': 'a', 'k': 1}]
+        self.assertEqual(list(config.util.combine_named(a)), ['a', 'b'])
+
 class IterSystemTests(unittest.TestCase):
     def test_iter_system_all(self):
         system = {
@@ -106,3 +127,32 @@ class UpperLevelsForTests(unittest.TestCase):
                 }
         self.assertEqual( list(map(operator.itemgetter('id'), config.util.upper_levels_for(system.values(), 'c', key='next'))), [1,2])
 
+
+class SystemIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.system = {
+                'a': {'name': 'a', 'next': 'b', 'id': 1},
+                'b': {'name': 'b', 'next': 'c', 'id': 2},
+                'c': {'name': 'c', 'next': 'a', 'id': 3},
+                'd': {'name': 'd', 'next': 'c', 'id': 4}
+                }
+        self.index = config.util.SystemIndex(self.system.values(), keys=('next',))
+
+    def test_iter_system_matches_unindexed(self):
+        for name in self.system:
+            with self.subTest(name=name):
+                self.assertEqual(list(self.index.iter_system(self.system, name, key='next')), list(config.util.iter_system(self.system, name, key='next')))
+
+    def test_iter_system_stops_outside_system(self):
+        subsystem = config.util.subdict(self.system, ('a', 'b'))
+        self.assertEqual(list(map(operator.itemgetter('id'), self.index.iter_system(subsystem, 'a', key='next'))), [1,2])
+
+    def test_upper_levels(self):
+        self.assertEqual(list(map(operator.itemgetter('id'), self.index.upper_levels_for('c', key='next'))), [2,4])
+
+    def test_no_upper_levels(self):
+        self.assertEqual(self.index.upper_levels_for('d', key='next'), [])
+
+    def test_unnamed_elements_have_upper_levels(self):
+        index = config.util.SystemIndex(({'L1I': 'a'}, {'L1I': 'a'}), keys=('L1I',))
+        self.assertEqual(len(index.upper_levels_for('a', key='L1I')), 2)
@@ -0,0 +1,93 @@
+import unittest
+import itertools
+import os
+import tempfile
+
+import config.watch
+
+class CountingWriter:
+    def __init__(self):
+        self.rendered = []
+
+    def render_files(self, parsed_config):
+        self.rendered.append(parsed_config[0])
+        return parsed_config[0], [], []
+
+class ConfigureSessionTests(unittest.TestCase):
+    def setUp(self):
+        self.writer = CountingWriter()
+
+    def render(self, session, configs):
+        return [r[0] for r in session.render_all(self.writer, [(c,) for c in configs], {})]
+
+    def test_unchanged_configurations_are_not_parsed_again(self):
+        session = config.watch.ConfigureSession(keep_state=True)
+        first = self.render(session, [{'executable_name': 'a'}, {'executable_name': 'b'}])
+        second = self.render(session, [{'executable_name': 'a'}, {'executable_name': 'c'}])
+        self.assertEqual(first, ['a', 'b'])
+        self.assertEqual(second, ['a', 'c'])
+        self.assertEqual(self.writer.rendered, ['a', 'b', 'c'])
+
+    def test_duplicate_configurations_are_parsed_once(self):
+        session = config.watch.ConfigureSession(keep_state=True)
+        self.assertEqual(self.render(session, [{'executable_name': 'a'}, {'executable_name': 'a'}, {'executable_name': 'b'}]), ['a', 'a', 'b'])
+        self.assertEqual(self.writer.rendered, ['a', 'b'])
+
+    def test_prune_forgets_unused(self):
+        session = config.watch.ConfigureSession(keep_state=True)
+        self.render(session, [{'executable_name': 'a'}, {'executable_name': 'b'}])
+        session.prune()
+        self.render(session, [{'executable_name': 'a'}])
+        session.prune()
+        self.render(session, [{'executable_name': 'b'}])
+        self.assertEqual(self.writer.rendered, ['a', 'b', 'b'])
+
+    def test_clear_forgets_all(self):
+        session = config.watch.ConfigureSession(keep_state=True)
+        self.render(session, [{'executable_name': 'a'}])
+        session.clear()
+        self.render(session, [{'executable_name': 'a'}])
+        self.assertEqual(self.writer.rendered, ['a', 'a'])
+
+    def test_configurations_are_read_lazily(self):
+        session = config.watch.ConfigureSession(keep_state=True)
+        self.render(session, [{'executable_name': 'a'}])
+        configs = ({'executable_name': n} for n in itertools.chain(['a'], map(str, itertools.count())))
+        result = [r[0] for r in itertools.islice(session.render_all(self.writer, ((c,) for c in configs), {}), 3)]
+        self.assertEqual(result, ['a', '0', '1'])
+        self.assertEqual(self.writer.rendered, ['a', '0', '1'])
+
+class WatchTests(unittest.TestCase):
+    def test_snapshot_of_missing_file(self):
+        with tempfile.TemporaryDirectory() as dtemp:
+            fname = os.path.join(dtemp, 'missing.json')
+            self.assertEqual(config.watch.snapshot([fname]), {fname: None})
+
+    def test_watch_yields_changed_paths(self):
+        with tempfile.TemporaryDirectory() as dtemp:
+            fname = os.path.join(dtemp, 'a.json')
+            other_fname = os.path.join(dtemp, 'b.json')
+            with open(fname, 'wt') as wfp:
+                wfp.write('{}')
+            with open(other_fname, 'wt') as wfp:
+                wfp.write('{}')
+
+            watcher = config.watch.watch([fname, other_fname], interval=0.01)
+            stat = os.stat(fname)
+            os.utime(fname, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+            self.assertEqual(next(watcher), [fname])
+
+    def test_watch_finds_new_paths(self):
+        with tempfile.TemporaryDirectory() as dtemp:
+            watcher = config.watch.watch(lambda: list(config.watch.tree([dtemp])), interval=0.01)
+            fname = os.path.join(dtemp, 'a.h')
+            with open(fname, 'wt') as wfp:
+                wfp.write('')
+            self.assertIn(fname, next(watcher))
+
+    def test_tree_lists_directories_and_files(self):
+        with tempfile.TemporaryDirectory() as dtemp:
+            os.makedirs(os.path.join(dtemp, 'sub'))
+            with open(os.path.join(dtemp, 'sub', 'a.h'), 'wt') as wfp:
+                wfp.write('')
+            self.assertEqual(sorted(config.watch.tree([dtemp])), [dtemp, os.path.join(dtemp, 'sub'), os.path.join(dtemp, 'sub', 'a.h')])